@@ -4,110 +4,260 @@
 """
 
 import asyncio
-from datetime import datetime, time as dt_time
+import time
+from typing import NamedTuple, Optional
 from aiogram import Bot
-from database import DatabaseManager
-from bot_utils import load_adhkars_from_file, is_in_time_range, format_adhkar_message
+from aiogram.types import FSInputFile
+from bot_pool import get_bot_pool
+from bot_session import BULK, bulk_lane, get_api_server
+from bot_utils import load_adhkars_from_file, format_adhkar_message
+from channel_scheduler import ChannelScheduler
+from config import PerformanceConfig
+from delivery_ledger import DeliveryLedger
+from logging_setup import log_aggregated, log_throttled
+from media_cache import MediaCache, MediaEntry, MediaPost, extract_file_id, parse_media_entry, send_content
+from metrics import POSTER_RUN_DURATION, POSTER_SENDS
+from reachability import get_reachability_tracker
 from loguru import logger
 
 
+class SendOutcome(NamedTuple):
+    """نتيجة الإرسال لقناة واحدة (قابلة للنقل بين العمليات)"""
+    channel_id: str
+    ok: bool
+    message_id: Optional[int] = None
+    latency_ms: float = 0.0
+    error: Optional[str] = None
+
+
+async def _send(bot: Bot, channel_id: str, content) -> tuple:
+    """إرسال لقناة واحدة: (النتيجة، الرسالة المرسلة أو None)"""
+    started = time.perf_counter()
+    try:
+        message = await send_content(bot, int(channel_id), content)
+        return SendOutcome(channel_id, True, message.message_id, (time.perf_counter() - started) * 1000), message
+    except Exception as e:
+        # الأخطاء تُسجل مجمعة في نهاية دورة النشر (سجل واحد لكل دورة)
+        return SendOutcome(channel_id, False, None, (time.perf_counter() - started) * 1000, str(e)), None
+
+
+async def send_to_channel(bot: Bot, channel_id: str, content) -> SendOutcome:
+    """إرسال رسالة لقناة واحدة (نص HTML أو MediaPost)"""
+    outcome, _ = await _send(bot, channel_id, content)
+    return outcome
+
+
+async def deliver_to_channels(bot: Bot, channel_ids: list, content) -> list:
+    """إرسال رسالة لمجموعة قنوات بشكل متزامن (داخل العملية الحالية)"""
+    return await asyncio.gather(*(send_to_channel(bot, channel_id, content) for channel_id in channel_ids))
+
+
 class AutoPoster:
-    """نظام النشر التلقائي للأذكار"""
+    """نظام النشر التلقائي للأذكار (جدول مستقل لكل قناة)"""
     
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, worker_count: int = None):
         self.bot = bot
         self.is_running = False
+        self.worker_count = PerformanceConfig.WORKER_COUNT if worker_count is None else worker_count
+        self.worker_pool = None
+        self.scheduler = ChannelScheduler()
+        self.ledger = DeliveryLedger()
+        self.bots = get_bot_pool(bot)
+        self.media = MediaCache()
+        self._media = {0: self.media}
+        self.reachability = get_reachability_tracker()
+        # مهام الإرسال الجارية -> (الفئة، القنوات) لتأجيلها إن لم تكتمل عند الإيقاف
+        self._sends = {}
+        self._loop_task = None
     
     async def start(self):
         """بدء نظام النشر التلقائي"""
         self.is_running = True
+        self._loop_task = asyncio.current_task()
         logger.info("✅ تم بدء نظام النشر التلقائي")
         
         while self.is_running:
             try:
+                started = time.perf_counter()
                 await self._check_and_post()
-                await asyncio.sleep(30)  # التحقق كل 30 ثانية
+                POSTER_RUN_DURATION.observe(time.perf_counter() - started)
+                await asyncio.sleep(self.scheduler.tick)
             except Exception as e:
                 logger.error(f"❌ خطأ في نظام النشر التلقائي: {e}")
                 await asyncio.sleep(60)
     
-    async def stop(self):
-        """إيقاف نظام النشر التلقائي"""
+    async def stop(self, timeout: float = None) -> int:
+        """إيقاف نظام النشر التلقائي (إيقاف الجدولة، انتظار الإرسال الجاري، ثم كتابة الطوابير)"""
+        await self.stop_intake()
+        deferred = await self.drain(timeout)
+        await self.close()
+        return deferred
+    
+    async def stop_intake(self):
+        """إيقاف الجدولة: لا منشورات جديدة بعد الآن"""
         self.is_running = False
+        task, self._loop_task = self._loop_task, None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    
+    async def drain(self, timeout: float = None) -> int:
+        """
+        انتظار الإرسال الجاري حتى timeout، ثم إلغاء ما لم يكتمل وإعادة جدولته لما بعد إعادة التشغيل
+        يُرجع عدد المنشورات المؤجلة (قد يتكرر منشور اكتمل جزء من قنواته قبل الإلغاء)
+        """
+        if not self._sends:
+            return 0
+        _, pending = await asyncio.wait(list(self._sends), timeout=timeout)
+        if not pending:
+            return 0
+        batches = [self._sends[task] for task in pending]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        deferred = sum(self.scheduler.defer(category, channel_ids) for category, channel_ids in batches)
+        logger.warning(f"⏳ تأجيل {deferred} منشور لم يكتمل إرساله إلى ما بعد إعادة التشغيل")
+        return deferred
+    
+    async def close(self):
+        """كتابة أوقات النشر وسجل الإرسال وإيقاف عمال النشر"""
+        await self.scheduler.close()
+        await self.ledger.close()
+        if self.worker_pool:
+            await self.worker_pool.stop()
+            self.worker_pool = None
         logger.info("⏸️ تم إيقاف نظام النشر التلقائي")
     
     async def _check_and_post(self):
-        """التحقق من الفئات وإرسال الأذكار"""
-        current_time = datetime.now()
-        
-        categories = ["sabah", "masaa", "aam"]
+        """إرسال المنشورات المستحقة في هذه النبضة"""
+        if self.scheduler.dirty:
+            await asyncio.to_thread(self.scheduler.reload)
         
-        for category_name in categories:
-            category = DatabaseManager.get_category(category_name)
-            
-            if not category or not category.is_enabled:
-                continue
-            
-            # التحقق من أن الوقت الحالي ضمن النطاق المحدد
-            if category_name != "aam":
-                if not is_in_time_range(category.start_time, category.end_time):
-                    continue
-            
-            # التحقق من أن الفترة الزمنية قد مضت
-            if category.last_posted_at:
-                time_diff = (current_time - category.last_posted_at).total_seconds() / 60
-                if time_diff < category.interval_minutes:
-                    continue
-            
-            # الحصول على ذكر عشوائي
-            adhkars = load_adhkars_from_file(category.file_path)
+        for category_name, channel_ids in self.scheduler.pop_due().items():
+            file_path = self.scheduler.categories.get(category_name)
+            adhkars = load_adhkars_from_file(file_path) if file_path else []
             if not adhkars:
-                logger.warning(f"⚠️ لا توجد أذكار في {category.file_path}")
+                logger.warning(f"⚠️ لا توجد أذكار في {file_path}")
                 continue
             
-            import random
-            adhkar = random.choice(adhkars)
-            
-            # الحصول على القنوات النشطة
-            channels = DatabaseManager.get_active_channels()
-            if not channels:
-                logger.warning("⚠️ لا توجد قنوات نشطة")
-                continue
-            
-            # إرسال الذكر لجميع القنوات
-            await self._post_to_channels(adhkar, channels)
-            
-            # تحديث آخر وقت نشر
-            DatabaseManager.update_category(category_name, last_posted_at=current_time)
+            # الاختيار (نافذة عدم التكرار) والإرسال في مهمة منفصلة حتى لا تتأخر النبضات التالية
+            task = asyncio.create_task(self._pick_and_post(adhkars, channel_ids, category_name))
+            self._sends[task] = (category_name, channel_ids)
+            task.add_done_callback(self._forget_send)
     
-    async def _post_to_channels(self, adhkar: str, channels: list):
-        """إرسال الذكر لجميع القنوات"""
-        formatted_text = format_adhkar_message(adhkar)
+    async def _pick_and_post(self, adhkars: list, channel_ids: list, category_name: str):
+        """اختيار ذكر لم يُرسل لهذه القنوات مؤخراً ثم إرساله"""
+        adhkar = await self.ledger.pick(adhkars, channel_ids)
+        return await self._post_to_channels(adhkar, channel_ids, category_name)
+    
+    async def _post_to_channels(self, adhkar: str, channel_ids: list, category_name: str = None):
+        """إرسال الذكر لمجموعة قنوات وتسجيل النتائج في سجل الإرسال (عبر المسار الجماعي)"""
+        with bulk_lane():
+            return await self._fan_out(adhkar, channel_ids, category_name)
+    
+    async def _fan_out(self, adhkar: str, channel_ids: list, category_name: str = None):
+        """توزيع القنوات على بوتاتها والإرسال بالتوازي (كل بوت بجلسته وحده) ثم تسجيل النتائج"""
+        total = len(channel_ids)
+        groups = await self.bots.partition(channel_ids)
+        results = await asyncio.gather(*(self._deliver(index, adhkar, ids) for index, ids in groups.items()))
+        outcomes = [outcome for result in results for outcome in result]
+        self.ledger.record(outcomes, category_name, adhkar)
+        # تعطيل القنوات التي طُرد منها البوت فوراً (بدلاً من انتظار الفحص الدوري)
+        self.reachability.observe("channel", outcomes)
         
-        tasks = []
-        for channel in channels:
-            task = self._send_to_channel(int(channel.channel_id), formatted_text)
-            tasks.append(task)
+        # حساب عدد الرسائل المرسلة بنجاح
+        success_count = sum(1 for outcome in outcomes if outcome.ok)
+        POSTER_SENDS.inc("ok", amount=success_count)
+        POSTER_SENDS.inc("failed", amount=len(outcomes) - success_count)
+        logger.debug(f"✅ تم إرسال الذكر لـ {success_count}/{total} قناة")
+        log_aggregated(
+            "ERROR", "❌ فشل إرسال الذكر",
+            [(outcome.channel_id, outcome.error) for outcome in outcomes if not outcome.ok],
+            len(outcomes)
+        )
+        return outcomes
+    
+    async def _deliver(self, index: int, adhkar: str, channel_ids: list) -> list:
+        """الإرسال لقنوات بوت واحد من المجمع (البوت الرئيسي يوزع على عمال النشر عند كثرة القنوات)"""
+        bot = self.bots.get(index)
+        outcomes = []
+        media = parse_media_entry(adhkar)
+        if media is None:
+            content = format_adhkar_message(adhkar)
+        else:
+            # أول إرسال يرفع الملف (عند الحاجة)، وبقية القنوات تستخدم معرفه
+            content, outcomes = await self._prepare_media(media, channel_ids, index)
+            channel_ids = channel_ids[len(outcomes):]
         
-        # إرسال جميع الرسائل بشكل متزامن
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        if content is None:
+            outcomes.extend(SendOutcome(channel_id, False, error="media_unavailable") for channel_id in channel_ids)
+        elif index == 0 and self.worker_count > 1 and len(channel_ids) >= PerformanceConfig.SHARDING_MIN_CHANNELS:
+            # توزيع القنوات على عمليات النشر عند كثرتها، وإلا الإرسال محلياً
+            outcomes.extend(await self._get_worker_pool().fan_out(content, channel_ids))
+        elif channel_ids:
+            outcomes.extend(await deliver_to_channels(bot, channel_ids, content))
+        return outcomes
+    
+    def _forget_send(self, task: asyncio.Task):
+        self._sends.pop(task, None)
+    
+    def _media_cache(self, index: int) -> MediaCache:
+        """ذاكرة معرفات الوسائط لبوت من المجمع (المعرفات لا تصلح لبوت آخر)"""
+        if index not in self._media:
+            self._media[index] = MediaCache(index)
+        return self._media[index]
+    
+    async def _prepare_media(self, entry: MediaEntry, channel_ids: list, index: int = 0) -> tuple:
+        """
+        تجهيز ذكر وسائط للإرسال بالمعرف: (MediaPost أو None، نتائج القنوات التي استُخدمت للرفع)
+        إذا لم يكن المعرف محفوظاً يُرفع الملف لأول قناة تقبله ويُحفظ معرفه
+        """
+        bot = self.bots.get(index)
+        media = self._media_cache(index)
+        caption = format_adhkar_message(entry.caption)
+        # الملف يُرفع مرة واحدة: من يطلبه أثناء رفعه ينتظر معرفه
+        file_id = await media.get(entry) or await media.wait_upload(entry)
+        if file_id:
+            return MediaPost(entry.kind, file_id, caption), []
+        if media.fingerprint(entry.path) is None:
+            log_throttled("WARNING", f"media_missing:{entry.path}", f"⚠️ ملف الوسائط غير موجود: {entry.path}")
+            return None, []
         
-        # حساب عدد الرسائل المرسلة بنجاح
-        success_count = sum(1 for r in results if r is True)
-        logger.info(f"✅ تم إرسال الذكر لـ {success_count}/{len(channels)} قناة")
+        upload = MediaPost(entry.kind, FSInputFile(entry.path), caption)
+        outcomes = []
+        async with media.uploading(entry):
+            for channel_id in channel_ids[:PerformanceConfig.MEDIA_UPLOAD_ATTEMPTS]:
+                outcome, message = await _send(bot, channel_id, upload)
+                outcomes.append(outcome)
+                if message is None:
+                    continue
+                file_id = extract_file_id(message, entry.kind)
+                if not file_id:
+                    break
+                await media.remember(entry, file_id)
+                return MediaPost(entry.kind, file_id, caption), outcomes
+        return None, outcomes
     
-    async def _send_to_channel(self, channel_id: int, text: str) -> bool:
-        """إرسال رسالة لقناة واحدة"""
-        try:
-            await self.bot.send_message(
-                channel_id,
-                text,
-                parse_mode="HTML"
+    def _get_worker_pool(self):
+        """تشغيل عمال النشر عند أول حاجة لهم"""
+        if self.worker_pool is None:
+            from posting_workers import PostingWorkerPool
+            # العمال يتقاسمون حصة المسار الجماعي لجلسة البوت الرئيسية
+            limiter = getattr(self.bot.session, "limiter", None)
+            self.worker_pool = PostingWorkerPool(
+                self.worker_count,
+                self.bot.token,
+                get_api_server(self.bot),
+                job_timeout=PerformanceConfig.WORKER_JOB_TIMEOUT,
+                rate_limit=limiter.buckets[BULK].rate if limiter else 0.0
             )
-            return True
-        except Exception as e:
-            logger.error(f"❌ خطأ في إرسال الرسالة للقناة {channel_id}: {e}")
-            return False
+            self.worker_pool.start()
+        return self.worker_pool
+    
+    async def _send_to_channel(self, channel_id: int, text) -> bool:
+        """إرسال رسالة لقناة واحدة"""
+        outcome = await send_to_channel(self.bot, str(channel_id), text)
+        return outcome.ok
 
 
 # إنشاء مثيل من النظام
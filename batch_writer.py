@@ -0,0 +1,132 @@
+"""
+كاتب دفعات غير متزامن (Async Batch Writer)
+يجمع عمليات الكتابة في الذاكرة ويكتبها لقاعدة البيانات على دفعات في خيط منفصل،
+حتى لا تضيف أي عملية commit متزامنة لزمن المعالجات.
+"""
+
+import asyncio
+import weakref
+from typing import Any, Callable, Hashable
+from loguru import logger
+
+
+class BatchWriter:
+    """
+    تجميع العناصر وكتابتها على دفعات
+    - put(key, item): آخر قيمة لكل مفتاح هي التي تُكتب (دمج التحديثات المتتالية)
+    - add(item): إضافة عنصر جديد (للسجلات التراكمية)
+    """
+    
+    # كل الكُتّاب الأحياء (لتقرير ما لم يُكتب عند الإيقاف)
+    _instances = weakref.WeakSet()
+    
+    # أقصى مضاعف لفترة الانتظار بعد فشل الكتابة
+    MAX_BACKOFF = 32
+    
+    def __init__(
+        self,
+        flush_fn: Callable[[list], Any],
+        name: str,
+        flush_interval: float = 1.0,
+        max_batch: int = 500
+    ):
+        self.flush_fn = flush_fn
+        self.name = name
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._keyed = {}
+        self._flushing = {}
+        self._items = []
+        self._wakeup = None
+        self._task = None
+        self._closed = False
+        # كتابة واحدة في كل لحظة حتى لا تُكتب دفعة أقدم بعد أحدث منها لنفس المفتاح
+        self._lock = asyncio.Lock()
+        self._failures = 0
+        BatchWriter._instances.add(self)
+    
+    @classmethod
+    def live(cls) -> list:
+        """الكُتّاب الموجودون حالياً"""
+        return list(cls._instances)
+    
+    @property
+    def pending(self) -> int:
+        """عدد العناصر التي لم تُكتب بعد"""
+        return len(self._keyed) + len(self._items)
+    
+    def put(self, key: Hashable, item: Any):
+        """إضافة/استبدال عنصر بمفتاح"""
+        self._keyed[key] = item
+        self._after_write()
+    
+    def peek(self, key: Hashable) -> Any:
+        """قراءة عنصر معلق لم يُكتب بعد (أو None)"""
+        item = self._keyed.get(key)
+        return item if item is not None else self._flushing.get(key)
+    
+    def add(self, item: Any):
+        """إضافة عنصر تراكمي"""
+        self._items.append(item)
+        self._after_write()
+    
+    def _after_write(self):
+        if self._task is None and not self._closed:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        if self._wakeup is not None and self.pending >= self.max_batch:
+            self._wakeup.set()
+    
+    async def _run(self):
+        while True:
+            if self._failures:
+                # إعادة المحاولة بعد فشل الكتابة بانتظار متزايد (بدون الاستيقاظ عند امتلاء الدفعة)
+                await asyncio.sleep(self.flush_interval * min(2 ** self._failures, self.MAX_BACKOFF))
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            await self.flush()
+    
+    async def flush(self):
+        """
+        كتابة كل العناصر المعلقة الآن
+        الكتابة لا تُلغى بإلغاء المستدعي (الخيط لا يتوقف على أي حال)، والكتابة التالية تنتظر انتهاءها
+        """
+        await asyncio.shield(self._flush())
+    
+    async def _flush(self):
+        async with self._lock:
+            if not self.pending:
+                return
+            # العناصر قيد الكتابة تبقى مقروءة عبر peek حتى تنتهي المعاملة
+            self._flushing, self._keyed = self._keyed, {}
+            items, self._items = self._items, []
+            batch = list(self._flushing.values()) + items
+            try:
+                await asyncio.to_thread(self.flush_fn, batch)
+                self._failures = 0
+            except Exception as e:
+                # إعادة الدفعة للطابور لتُكتب لاحقاً (القيمة الأحدث لنفس المفتاح هي التي تبقى)
+                self._keyed = {**self._flushing, **self._keyed}
+                self._items = items + self._items
+                self._failures += 1
+                logger.error(
+                    f"❌ خطأ في كتابة دفعة {self.name} ({len(batch)} عنصر، المحاولة {self._failures}): {e}"
+                )
+            finally:
+                self._flushing = {}
+    
+    async def close(self):
+        """إيقاف الكتابة الدورية ثم انتظار الكتابة الجارية وكتابة ما تبقى"""
+        self._closed = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
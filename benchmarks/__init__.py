@@ -0,0 +1,3 @@
+"""
+مجموعة قياسات الأداء (Benchmarks) للمسارات الحساسة في البوت
+"""
@@ -0,0 +1,137 @@
+"""
+قياس معدل معالجة الأزرار (Callback Queries) عبر Dispatcher حقيقي وخادم Bot API الوهمي
+
+يقارن بين:
+- cold: إعادة بناء كل اللوحات في كل ضغطة (تفريغ الذاكرة المؤقتة قبل كل تحديث)
+- warm: اللوحات المبنية مسبقاً والمخزنة
+
+الاستخدام:
+    python -m benchmarks.bench_callbacks --updates 2000 --channels 10000
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import (
+    OWNER_ID, BenchResults, _summarize, build_channels, build_users, compare, prepare_environment
+)
+from benchmarks.fake_bot_api import FakeTelegramAPI, start_server
+
+CALLBACKS = [
+    "main_menu", "settings_menu", "set_sabah", "menu_channels", "delete_channel",
+    "channels_page_1", "menu_broadcast", "menu_admins", "menu_upload",
+]
+
+
+def clear_keyboard_caches():
+    """تفريغ كل اللوحات المخزنة (لمحاكاة إعادة البناء في كل ضغطة)"""
+    import keyboards
+    for value in vars(keyboards).values():
+        if hasattr(value, "cache_clear"):
+            value.cache_clear()
+
+
+def make_update(update_id: int, user_id: int, data: str) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": "Bench"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "chat_instance": "bench",
+            "data": data,
+            "message": {
+                "message_id": 1,
+                "date": 1700000000,
+                "chat": {"id": user_id, "type": "private", "first_name": "Bench"},
+                "text": "menu",
+            },
+        },
+    }
+
+
+async def run(args, results: BenchResults):
+    from aiogram import Dispatcher
+    from aiogram.types import Update
+    from bot_session import create_bot
+    from user_context import UserContextMiddleware
+    import callback_handlers
+    
+    api = FakeTelegramAPI(latency_ms=args.api_latency_ms)
+    runner, url = await start_server(api)
+    bot = create_bot("123456:FAKE", api_server=url, rate_limit=0)
+    dp = Dispatcher()
+    user_context = UserContextMiddleware()
+    dp.callback_query.outer_middleware(user_context)
+    dp.include_router(callback_handlers.router)
+    
+    async def feed(i: int, data: str) -> float:
+        update = Update.model_validate(make_update(i, OWNER_ID, data), context={"bot": bot})
+        t0 = time.perf_counter()
+        await dp.feed_update(bot, update)
+        return time.perf_counter() - t0
+    
+    try:
+        for mode in ("cold", "warm"):
+            clear_keyboard_caches()
+            for data in CALLBACKS:
+                await feed(0, data)
+            
+            for data in CALLBACKS:
+                samples = []
+                for i in range(args.updates):
+                    if mode == "cold":
+                        clear_keyboard_caches()
+                    samples.append(await feed(i + 1, data))
+                results.add(f"callback[{mode}]", _summarize(samples), data=data, channels=args.channels)
+            
+            # خليط من الأزرار بتوازي محدود (معدل المعالجة الإجمالي)
+            semaphore = asyncio.Semaphore(args.concurrency)
+            
+            async def one(i):
+                async with semaphore:
+                    if mode == "cold":
+                        clear_keyboard_caches()
+                    return await feed(i + 1, CALLBACKS[i % len(CALLBACKS)])
+            
+            t0 = time.perf_counter()
+            samples = await asyncio.gather(*(one(i) for i in range(args.updates)))
+            elapsed = time.perf_counter() - t0
+            results.add(f"callback_mix[{mode}]", {
+                **_summarize(samples),
+                "updates_per_second": args.updates / elapsed,
+            }, concurrency=args.concurrency, channels=args.channels)
+    finally:
+        await user_context.close()
+        await bot.session.close()
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Callback query handling throughput")
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--channels", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--api-latency-ms", type=float, default=0.0)
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--output", default="bench_results_callbacks.json")
+    parser.add_argument("--compare", default=None)
+    args = parser.parse_args()
+    
+    prepare_environment(args.workdir)
+    build_users(args.users)
+    build_channels(args.channels)
+    from database import DatabaseManager
+    DatabaseManager.bootstrap([OWNER_ID])
+    
+    results = BenchResults("callbacks")
+    asyncio.run(run(args, results))
+    results.write(args.output)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
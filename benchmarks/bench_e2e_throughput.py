@@ -0,0 +1,142 @@
+"""
+قياس معدل الإرسال من طرف إلى طرف (رسالة/ثانية) عبر خادم Bot API الوهمي
+
+- poster_fanout: دورة نشر كاملة
+- health_check_probe: فحص عضوية البوت في كل القنوات (طلبات متزامنة في المسار التفاعلي)
+- mixed_lanes: بوت جديد يبدأ نشراً جماعياً ثم دفعة طلبات تفاعلية متزامنة، ويفشل القياس إذا لم تكتمل كلها
+
+الاستخدام:
+    python -m benchmarks.bench_e2e_throughput --channels 10000 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import BenchResults, build_channels, compare, prepare_environment
+from benchmarks.fake_bot_api import FakeTelegramAPI, start_server
+
+
+async def run(args, results: BenchResults):
+    api = FakeTelegramAPI(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_limit=args.rate_limit,
+        forbidden_ratio=args.forbidden, not_found_ratio=args.not_found, left_ratio=args.left,
+    )
+    runner, url = await start_server(api)
+    
+    from auto_poster import AutoPoster
+    from bot_session import create_bot
+    from database import DatabaseManager
+    
+    bot = create_bot("123456:FAKE", api_server=url, rate_limit=args.api_rate_limit)
+    try:
+        channels = DatabaseManager.get_active_channels()
+        params = dict(channels=len(channels), latency_ms=args.latency_ms,
+                      rate_limit=args.rate_limit, workers=args.workers)
+        
+        # --- دورة نشر كاملة ---
+        poster = AutoPoster(bot, worker_count=args.workers)
+        if args.workers > 1:
+            # تشغيل العمال مسبقاً حتى لا يُحسب زمن إقلاعهم
+            poster._get_worker_pool()
+            await poster.worker_pool.fan_out("تهيئة", [c.channel_id for c in channels[:args.workers * 4]])
+        for _ in range(args.repeat):
+            api.reset()
+            t0 = time.perf_counter()
+            await poster._post_to_channels("سبحان الله وبحمده", [c.channel_id for c in channels])
+            elapsed = time.perf_counter() - t0
+            stats = api.stats()
+            results.add("poster_fanout", {
+                "mean_ms": elapsed * 1000,
+                "messages_per_second": stats["delivered"] / elapsed,
+                "delivered": stats["delivered"],
+                "errors": stats["errors"],
+            }, **params)
+        await poster.stop()
+        
+        # --- فحص عضوية البوت في القنوات ---
+        api.reset()
+        t0 = time.perf_counter()
+        await asyncio.gather(
+            *(bot.get_chat_member(c.channel_id, bot.id) for c in channels),
+            return_exceptions=True
+        )
+        elapsed = time.perf_counter() - t0
+        results.add("health_check_probe", {
+            "mean_ms": elapsed * 1000,
+            "calls_per_second": len(channels) / elapsed,
+        }, **params)
+        
+        await run_mixed_lanes(args, results, api, url, channels, params)
+    finally:
+        await bot.session.close()
+        await runner.cleanup()
+
+
+async def run_mixed_lanes(args, results: BenchResults, api, url: str, channels: list, params: dict):
+    """طلبات تفاعلية متزامنة هي الأولى في مسارها على بوت بدأ للتو نشراً جماعياً"""
+    from aiogram.exceptions import TelegramNetworkError
+    from auto_poster import deliver_to_channels
+    from bot_session import bulk_lane, create_bot
+    
+    bot = create_bot("123456:FAKE", api_server=url, rate_limit=args.api_rate_limit)
+    channel_ids = [c.channel_id for c in channels]
+    try:
+        api.reset()
+        t0 = time.perf_counter()
+        with bulk_lane():
+            fanout = asyncio.ensure_future(deliver_to_channels(bot, channel_ids, "سبحان الله"))
+        # الطلبات التفاعلية تبدأ بعد أن يفتح المسار الجماعي اتصالاته ويصل أول طلباته للخادم
+        while not api.calls and not fanout.done():
+            await asyncio.sleep(0.001)
+        interactive = await asyncio.wait_for(asyncio.gather(
+            *(bot.get_chat_member(channel_id, bot.id) for channel_id in channel_ids[:args.interactive]),
+            return_exceptions=True
+        ), timeout=args.mixed_timeout)
+        await asyncio.wait_for(fanout, timeout=args.mixed_timeout)
+        elapsed = time.perf_counter() - t0
+    finally:
+        await bot.session.close()
+    
+    network_errors = sum(isinstance(result, TelegramNetworkError) for result in interactive)
+    results.add("mixed_lanes", {
+        "mean_ms": elapsed * 1000,
+        "interactive": len(interactive),
+        "network_errors": network_errors,
+        "delivered": api.stats()["delivered"],
+    }, **params)
+    if network_errors:
+        raise RuntimeError(f"mixed_lanes: {network_errors}/{len(interactive)} interactive requests failed with a network error")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end send throughput against the fake Bot API")
+    parser.add_argument("--channels", type=int, default=10_000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--api-rate-limit", type=float, default=0.0, help="حد جلسة البوت (0 = بلا حد)")
+    parser.add_argument("--forbidden", type=float, default=0.01)
+    parser.add_argument("--not-found", type=float, default=0.005)
+    parser.add_argument("--left", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1, help="عدد عمليات النشر")
+    parser.add_argument("--interactive", type=int, default=500, help="عدد الطلبات التفاعلية أثناء النشر في mixed_lanes")
+    parser.add_argument("--mixed-timeout", type=float, default=30.0, help="مهلة اكتمال mixed_lanes بالثواني")
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--output", default="bench_results_e2e.json")
+    parser.add_argument("--compare", default=None)
+    args = parser.parse_args()
+    
+    prepare_environment(args.workdir)
+    build_channels(args.channels)
+    
+    results = BenchResults("e2e_throughput")
+    asyncio.run(run(args, results))
+    results.write(args.output)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
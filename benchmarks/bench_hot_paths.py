@@ -0,0 +1,175 @@
+"""
+قياس أداء المسارات الحساسة في البوت على بيانات اصطناعية كبيرة
+
+الاستخدام:
+    python -m benchmarks.bench_hot_paths
+    python -m benchmarks.bench_hot_paths --scale 0.01 --output bench_results.json
+    python -m benchmarks.bench_hot_paths --compare old_results.json
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from benchmarks.common import (
+    OWNER_ID, BenchResults, FakeBot, ameasure, build_channels, build_corpus,
+    build_users, compare, measure, prepare_environment
+)
+
+CORPUS_SIZES = [6_000, 50_000, 500_000]
+USERS = 1_000_000
+CHANNELS = 100_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the bot hot paths")
+    parser.add_argument("--scale", type=float, default=1.0, help="معامل تصغير أحجام البيانات")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", default=None, help="ملف نتائج سابق للمقارنة")
+    args = parser.parse_args()
+    
+    users_count = max(10, int(USERS * args.scale))
+    channels_count = max(10, int(CHANNELS * args.scale))
+    corpus_sizes = sorted({max(10, int(n * args.scale)) for n in CORPUS_SIZES})
+    
+    workdir = prepare_environment(args.workdir)
+    results = BenchResults("hot_paths")
+    
+    t0 = time.perf_counter()
+    build_users(users_count)
+    build_channels(channels_count)
+    corpora = {
+        n: build_corpus(os.path.join(workdir, f"corpus_{n}.txt"), n)
+        for n in corpus_sizes
+    }
+    print(f"🧱 تم بناء البيانات خلال {time.perf_counter() - t0:.1f} ثانية "
+          f"({users_count} مستخدم، {channels_count} قناة)")
+    
+    import bot_utils
+    from bot_utils import format_adhkar_message, load_adhkars_from_file
+    from database import DatabaseManager
+    from keyboards import get_delete_channels_keyboard
+    from user_context import UserContext
+    
+    # --- تحميل ملفات الأذكار ---
+    for n, path in corpora.items():
+        results.add(
+            "load_adhkars_from_file[cold]",
+            measure(lambda: load_adhkars_from_file(path), repeat=args.repeat,
+                    setup=bot_utils._corpus_cache.clear),
+            entries=n
+        )
+        results.add(
+            "load_adhkars_from_file[warm]",
+            measure(lambda: load_adhkars_from_file(path), repeat=args.repeat),
+            entries=n
+        )
+    
+    # --- تنسيق الرسائل ---
+    sample = load_adhkars_from_file(corpora[corpus_sizes[0]])
+    batch = [random.choice(sample) for _ in range(10_000)]
+    results.add(
+        "format_adhkar_message",
+        measure(lambda: [format_adhkar_message(a) for a in batch], repeat=args.repeat),
+        messages=len(batch)
+    )
+    
+    # --- لوحة حذف القنوات ---
+    results.add(
+        "get_delete_channels_keyboard[owner]",
+        measure(lambda: get_delete_channels_keyboard(UserContext(OWNER_ID, "Owner", None, "owner"), page=0),
+                repeat=args.repeat),
+        channels=channels_count
+    )
+    results.add(
+        "get_delete_channels_keyboard[user]",
+        measure(lambda: get_delete_channels_keyboard(UserContext(OWNER_ID + 1, "User", None, "user"), page=0),
+                repeat=args.repeat),
+        channels=channels_count
+    )
+    
+    # --- أدوار المستخدمين ---
+    ids = [OWNER_ID + random.randrange(users_count) for _ in range(1_000)]
+    results.add(
+        "get_user_role",
+        measure(lambda: [DatabaseManager.get_user_role(i) for i in ids], repeat=args.repeat),
+        calls=len(ids), users=users_count
+    )
+    
+    # --- إضافة المستخدمين ---
+    results.add(
+        "add_user[existing]",
+        measure(lambda: [DatabaseManager.add_user(i, "x") for i in ids], repeat=args.repeat),
+        calls=len(ids), users=users_count
+    )
+    next_id = [OWNER_ID + users_count + 1]
+    
+    def add_new_users():
+        for _ in range(1_000):
+            DatabaseManager.add_user(next_id[0], "new")
+            next_id[0] += 1
+    
+    results.add(
+        "add_user[new]",
+        measure(add_new_users, repeat=args.repeat),
+        calls=1_000, users=users_count
+    )
+    
+    # --- حساب الإحصائيات (كما في معالج stats) ---
+    DatabaseManager.update_category("aam", file_path=corpora[corpus_sizes[0]])
+    
+    def compute_stats():
+        total_adhkars = 0
+        for category_name in ["sabah", "masaa", "aam"]:
+            category = DatabaseManager.get_category(category_name)
+            if category:
+                total_adhkars += len(load_adhkars_from_file(category.file_path))
+        channels = DatabaseManager.count_active_channels()
+        users = DatabaseManager.count_users()
+        return total_adhkars, channels, users
+    
+    results.add(
+        "stats",
+        measure(compute_stats, repeat=args.repeat),
+        users=users_count, channels=channels_count
+    )
+    
+    # --- بناء جدول النشر لكل القنوات ---
+    from auto_poster import AutoPoster
+    
+    DatabaseManager.init_categories()
+    for name in ("sabah", "masaa", "aam"):
+        DatabaseManager.update_category(name, is_enabled=True, interval_minutes=60)
+    poster = AutoPoster(FakeBot(), worker_count=1)
+    
+    def reload_schedule():
+        poster.scheduler.entries = {}
+        poster.scheduler.reload()
+    
+    results.add(
+        "ChannelScheduler.reload",
+        measure(reload_schedule, repeat=max(1, args.repeat // 2)),
+        channels=channels_count
+    )
+    
+    # --- إرسال ذكر لكل القنوات ---
+    channel_ids = [key[0] for key in poster.scheduler.entries if key[1] == "aam"]
+    results.add(
+        "AutoPoster._post_to_channels",
+        asyncio.run(ameasure(
+            lambda: poster._post_to_channels(sample[0], channel_ids, "aam"), repeat=max(1, args.repeat // 2)
+        )),
+        channels=channels_count
+    )
+    
+    results.write(args.output)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
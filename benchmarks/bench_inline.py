@@ -0,0 +1,94 @@
+"""
+قياس زمن البحث المضمن (search_index) على ملف أذكار كامل
+
+- build: بناء الفهرس مع الحساب المسبق
+- typing: استعلامات بادئة متزايدة حرفاً حرفاً كما يكتبها المستخدم (بدون ذاكرة LRU، البادئات القصيرة محسوبة مسبقاً)
+- phrase: عبارات من عدة كلمات مأخوذة من النص
+- typo: كلمات بحرف محذوف (المقاطع الثلاثية)
+- cached: نفس الاستعلامات من ذاكرة النتائج
+- scan: البحث الخطي في النصوص (بدون فهرس) للمقارنة
+
+الاستخدام:
+    python -m benchmarks.bench_inline --file azkar_aam.txt --queries 300
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.common import BenchResults, _summarize, compare, prepare_environment
+
+
+def timed(fn, queries: list) -> dict:
+    samples = []
+    for query in queries:
+        t0 = time.perf_counter()
+        fn(query)
+        samples.append(time.perf_counter() - t0)
+    stats = _summarize(samples)
+    stats["p99_ms"] = sorted(samples)[int(len(samples) * 0.99)] * 1000
+    return stats
+
+
+def run(args, results: BenchResults):
+    from search_index import build_index, normalize_text
+    
+    t0 = time.perf_counter()
+    index = build_index([args.file])
+    results.add("build", {"mean_ms": (time.perf_counter() - t0) * 1000}, entries=len(index.texts))
+    
+    rng = random.Random(args.seed)
+    words = [word for word in index.vocabulary if len(word) >= 4]
+    typing = []
+    for word in rng.sample(words, args.queries // 5):
+        typing.extend(word[:n] for n in range(1, min(len(word), 5) + 1))
+    phrases = []
+    for text in rng.sample(index.normalized, args.queries):
+        tokens = text.split()
+        start = rng.randrange(max(1, len(tokens) - 3))
+        phrases.append(" ".join(tokens[start:start + 3]))
+    typos = []
+    for word in rng.sample(words, args.queries):
+        cut = rng.randrange(1, len(word) - 1)
+        typos.append(word[:cut] + word[cut + 1:])
+    
+    def handler(query):
+        # عمل المعالج كاملاً عدا إرسال الرد: تطبيع الاستعلام وبناء صفحة النتائج
+        return index.page(normalize_text(query), 0)
+    
+    def cold(query):
+        index._cached_page.cache_clear()
+        return handler(query)
+    
+    def scan(query):
+        query = normalize_text(query)
+        return [i for i, text in enumerate(index.normalized) if query in text][:20]
+    
+    for name, queries in (("typing", typing), ("phrase", phrases), ("typo", typos)):
+        results.add(f"{name}.indexed", timed(cold, queries), queries=len(queries))
+        for query in queries:
+            handler(query)
+        results.add(f"{name}.cached", timed(handler, queries), queries=len(queries))
+        results.add(f"{name}.scan", timed(scan, queries[:args.scan_queries]), queries=args.scan_queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inline query search latency")
+    parser.add_argument("--file", default="azkar_aam.txt")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--scan-queries", type=int, default=50, help="عدد استعلامات البحث الخطي (أبطأ)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results_inline.json")
+    parser.add_argument("--compare", default=None)
+    args = parser.parse_args()
+    
+    prepare_environment()
+    results = BenchResults("inline")
+    run(args, results)
+    results.write(args.output)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+قياس زمن الطلبات التفاعلية أثناء نشر جماعي كبير (مسارا الطلبات في bot_session)
+
+يرسل N رسالة عبر المسار الجماعي، ويقيس أثناءها زمن طلبات تفاعلية (answerCallbackQuery) متتالية:
+- lanes: الطلبات التفاعلية في مسارها (مجمع اتصالات وحصة طلبات خاصة)
+- shared: الطلبات التفاعلية في نفس مسار النشر (مثل الجلسة الواحدة القديمة)
+
+الاستخدام:
+    python -m benchmarks.bench_lanes --messages 3000 --rate 300 --latency-ms 30
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import BenchResults, _summarize, compare
+from benchmarks.fake_bot_api import FakeTelegramAPI, start_server
+
+
+async def run_mode(args, results: BenchResults, url: str, mode: str):
+    from auto_poster import deliver_to_channels
+    from bot_session import bulk_lane, create_bot
+    
+    bot = create_bot("123456:FAKE", api_server=url, rate_limit=args.rate)
+    channel_ids = [str(-1_000_000_000_000 - i) for i in range(args.messages)]
+    try:
+        with bulk_lane():
+            fanout = asyncio.create_task(deliver_to_channels(bot, channel_ids, "سبحان الله"))
+        started = time.perf_counter()
+        samples = []
+        while not fanout.done():
+            t0 = time.perf_counter()
+            if mode == "shared":
+                with bulk_lane():
+                    await bot.answer_callback_query(str(len(samples)))
+            else:
+                await bot.answer_callback_query(str(len(samples)))
+            samples.append(time.perf_counter() - t0)
+            await asyncio.sleep(args.interval_ms / 1000)
+        await fanout
+        elapsed = time.perf_counter() - started
+    finally:
+        await bot.session.close()
+    
+    stats = _summarize(samples)
+    stats["p99_ms"] = sorted(samples)[int(len(samples) * 0.99)] * 1000
+    stats["bulk_messages_per_second"] = args.messages / elapsed
+    results.add(f"interactive_during_fanout[{mode}]", stats, messages=args.messages, rate=args.rate)
+
+
+async def run(args, results: BenchResults):
+    api = FakeTelegramAPI(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    runner, url = await start_server(api)
+    try:
+        for mode in ("shared", "lanes"):
+            await run_mode(args, results, url, mode)
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interactive latency under bulk fan-out")
+    parser.add_argument("--messages", type=int, default=3000)
+    parser.add_argument("--rate", type=float, default=300, help="حد طلبات الجلسة في الثانية")
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--interval-ms", type=float, default=50.0, help="الفاصل بين الطلبات التفاعلية")
+    parser.add_argument("--output", default="bench_results_lanes.json")
+    parser.add_argument("--compare", default=None)
+    args = parser.parse_args()
+    
+    results = BenchResults("lanes")
+    asyncio.run(run(args, results))
+    results.write(args.output)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+قياس ذاكرة القراءة الجماعية: نماذج ORM كاملة مقابل السجلات الخفيفة والمرور المتدفق
+
+يقيس ذروة الذاكرة (tracemalloc) وزمن المرور على كل المستخدمين والقنوات:
+- orm_all: الطريقة القديمة (db.query(Model).all() ثم إغلاق الجلسة)
+- records_list: get_all_users / get_active_channels (سجلات __slots__ بالأعمدة المطلوبة فقط)
+- stream: iter_users / iter_channels (ذاكرة ثابتة مهما كان عدد الصفوف)
+- broadcast_batches: دفعات get_broadcast_batch بمؤشر (مسار البث)
+
+الاستخدام:
+    python -m benchmarks.bench_memory --users 1000000 --channels 100000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.common import BenchResults, build_channels, build_users, compare, prepare_environment
+
+
+def trace(fn) -> dict:
+    """تشغيل fn مرة واحدة وإرجاع الزمن وذروة الذاكرة المخصصة أثناءه"""
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"mean_ms": elapsed * 1000, "peak_mb": peak / 1024 / 1024, "rows": count}
+
+
+def bench_users(results: BenchResults, args):
+    from database import DatabaseManager, User
+    
+    def orm_all():
+        with DatabaseManager.get_db() as db:
+            users = db.query(User).all()
+        return len(users)
+    
+    def records_list():
+        return len(DatabaseManager.get_all_users())
+    
+    def stream():
+        return sum(1 for _ in DatabaseManager.iter_users(batch_size=args.batch))
+    
+    def broadcast_batches():
+        count, cursor = 0, 0
+        while True:
+            batch = DatabaseManager.get_broadcast_batch("users", cursor, args.batch)
+            if not batch:
+                return count
+            count += len(batch)
+            cursor = batch[-1][0]
+    
+    for name, fn in (("orm_all", orm_all), ("records_list", records_list),
+                     ("stream", stream), ("broadcast_batches", broadcast_batches)):
+        results.add(f"users.{name}", trace(fn), users=args.users, batch=args.batch)
+
+
+def bench_channels(results: BenchResults, args):
+    from database import Channel, DatabaseManager
+    
+    def orm_all():
+        with DatabaseManager.get_db() as db:
+            channels = db.query(Channel).filter(Channel.is_active == True).all()
+        return len(channels)
+    
+    def records_list():
+        return len(DatabaseManager.get_active_channels())
+    
+    def stream():
+        return sum(1 for _ in DatabaseManager.iter_channels(batch_size=args.batch))
+    
+    for name, fn in (("orm_all", orm_all), ("records_list", records_list), ("stream", stream)):
+        results.add(f"channels.{name}", trace(fn), channels=args.channels, batch=args.batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk read memory benchmarks")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--channels", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=1000, help="حجم دفعة المرور المتدفق")
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--output", default="bench_results_memory.json")
+    parser.add_argument("--compare", default=None)
+    args = parser.parse_args()
+    
+    prepare_environment(args.workdir)
+    build_users(args.users)
+    build_channels(args.channels)
+    
+    results = BenchResults("memory")
+    bench_users(results, args)
+    bench_channels(results, args)
+    results.write(args.output)
+    for entry in results.results:
+        print(f"{entry['name']:32} peak={entry['peak_mb']:9.1f}MB rows={entry['rows']}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
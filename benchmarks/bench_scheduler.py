@@ -0,0 +1,97 @@
+"""
+قياس جدولة النشر لكل قناة: أداء عجلة التوقيت وتوزيع الإرسال على الثواني
+
+يحاكي فترة زمنية (بدون شبكة) ويقارن ذروة الإرسال في الثانية مع النشر المتزامن القديم
+(كل القنوات في نفس اللحظة عند انتهاء فاصل الفئة).
+
+الاستخدام:
+    python -m benchmarks.bench_scheduler --channels 100000 --hours 2
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import BenchResults, build_channels, compare, measure, prepare_environment
+
+
+def bench_wheel(results: BenchResults, timers: int):
+    from timing_wheel import TimingWheel
+
+    keys = list(range(timers))
+    offsets = [random.random() * 86_400 for _ in keys]
+    wheel = TimingWheel(start=0)
+
+    def insert():
+        for key, offset in zip(keys, offsets):
+            wheel.schedule(key, offset)
+
+    results.add("TimingWheel.schedule", measure(insert, repeat=3), timers=timers)
+
+    def advance_day():
+        for second in range(0, 86_401, 60):
+            wheel.advance(second)
+
+    results.add("TimingWheel.advance[1 day]", measure(
+        advance_day, repeat=1, warmup=0,
+        setup=lambda: (wheel.__init__(start=0), insert())
+    ), timers=timers)
+
+
+async def bench_schedule(args, results: BenchResults):
+    from channel_scheduler import ChannelScheduler
+    from database import DatabaseManager
+
+    DatabaseManager.init_categories()
+    DatabaseManager.update_category("aam", is_enabled=True, interval_minutes=args.interval)
+
+    start = time.time()
+    scheduler = ChannelScheduler()
+    t0 = time.perf_counter()
+    await asyncio.to_thread(scheduler.reload, start)
+    results.add("ChannelScheduler.reload", {"mean_ms": (time.perf_counter() - t0) * 1000}, channels=args.channels)
+
+    per_second = []
+    t0 = time.perf_counter()
+    for second in range(1, int(args.hours * 3600) + 1):
+        per_second.append(sum(len(ids) for ids in scheduler.pop_due(start + second).values()))
+    elapsed = time.perf_counter() - t0
+    await scheduler.close()
+
+    sent = sum(per_second)
+    ordered = sorted(per_second)
+    results.add("staggered_sends_per_second", {
+        "mean_ms": elapsed * 1000 / len(per_second),
+        "sent": sent,
+        "mean_per_second": sent / len(per_second),
+        "p99_per_second": ordered[int(len(ordered) * 0.99)],
+        "max_per_second": ordered[-1],
+        "lockstep_max_per_second": args.channels,
+    }, channels=args.channels, interval_minutes=args.interval, hours=args.hours)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-channel scheduler benchmarks")
+    parser.add_argument("--channels", type=int, default=100_000)
+    parser.add_argument("--interval", type=int, default=60, help="فاصل النشر بالدقائق")
+    parser.add_argument("--hours", type=float, default=2)
+    parser.add_argument("--timers", type=int, default=500_000)
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--output", default="bench_results_scheduler.json")
+    parser.add_argument("--compare", default=None)
+    args = parser.parse_args()
+
+    prepare_environment(args.workdir)
+    build_channels(args.channels)
+
+    results = BenchResults("scheduler")
+    bench_wheel(results, args.timers)
+    asyncio.run(bench_schedule(args, results))
+    results.write(args.output)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
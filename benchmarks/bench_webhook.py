@@ -0,0 +1,160 @@
+"""
+مقارنة زمن وصول التحديثات للمعالجات: Webhook مقابل Long Polling
+
+يعيد إرسال تحديثات مسجلة (benchmarks/data/updates.json):
+- وضع Webhook: عبر POST مباشر إلى WebhookServer
+- وضع Polling: عبر خادم Bot API الوهمي (getUpdates)
+
+الاستخدام:
+    python -m benchmarks.bench_webhook --updates 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import aiohttp
+from aiogram import Dispatcher
+
+from benchmarks.common import BenchResults, _summarize, compare
+from benchmarks.fake_bot_api import FakeTelegramAPI, start_server
+
+UPDATES_FILE = os.path.join(os.path.dirname(__file__), "data", "updates.json")
+SECRET = "bench-secret"
+
+
+def load_recorded_updates() -> list:
+    with open(UPDATES_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_dispatcher(received: dict) -> Dispatcher:
+    """Dispatcher بسيط يسجل لحظة وصول كل تحديث للمعالج"""
+    dp = Dispatcher()
+    
+    @dp.update.outer_middleware()
+    async def record(handler, event, data):
+        received[event.update_id] = time.perf_counter()
+        return await handler(event, data)
+    
+    @dp.message()
+    async def on_message(message):
+        pass
+    
+    @dp.callback_query()
+    async def on_callback(callback):
+        pass
+    
+    return dp
+
+
+async def wait_for(received: dict, count: int, timeout: float = 60):
+    deadline = time.perf_counter() + timeout
+    while len(received) < count and time.perf_counter() < deadline:
+        await asyncio.sleep(0.005)
+
+
+async def bench_webhook(args, recorded: list, results: BenchResults):
+    from bot_session import create_bot
+    from webhook_server import WebhookServer
+    
+    received, sent_at, acks = {}, {}, []
+    dp = make_dispatcher(received)
+    bot = create_bot("123456:FAKE", api_server="http://127.0.0.1:9")
+    server = WebhookServer(dp, bot, secret=SECRET, queue_size=args.queue_size, workers=args.workers)
+    url = await server.start("127.0.0.1", 0)
+    
+    async with aiohttp.ClientSession(headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}) as session:
+        semaphore = asyncio.Semaphore(args.concurrency)
+        
+        async def post(i):
+            update = {**recorded[i % len(recorded)], "update_id": i + 1}
+            async with semaphore:
+                sent_at[i + 1] = t0 = time.perf_counter()
+                async with session.post(url, json=update) as response:
+                    await response.read()
+                    acks.append(time.perf_counter() - t0)
+        
+        t_start = time.perf_counter()
+        await asyncio.gather(*(post(i) for i in range(args.updates)))
+        await wait_for(received, args.updates)
+        elapsed = time.perf_counter() - t_start
+        
+        # التحقق من رفض الطلبات ذات الرمز السري الخاطئ
+        async with session.post(url, json=recorded[0],
+                                headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"}) as response:
+            assert response.status == 401
+    
+    await server.stop()
+    await bot.session.close()
+    
+    params = dict(updates=args.updates, concurrency=args.concurrency)
+    results.add("webhook_ack", _summarize(acks), **params)
+    results.add("webhook_to_handler", {
+        **_summarize([received[u] - sent_at[u] for u in received]),
+        "updates_per_second": len(received) / elapsed,
+        "rejected_queue_full": server.rejected,
+    }, **params)
+
+
+async def bench_polling(args, recorded: list, results: BenchResults):
+    from bot_session import create_bot
+    
+    api = FakeTelegramAPI(latency_ms=args.api_latency_ms)
+    runner, url = await start_server(api)
+    
+    received, sent_at = {}, {}
+    dp = make_dispatcher(received)
+    bot = create_bot("123456:FAKE", api_server=url, rate_limit=0)
+    polling = asyncio.create_task(dp.start_polling(bot, polling_timeout=10, handle_signals=False))
+    await asyncio.sleep(0.2)
+    
+    t_start = time.perf_counter()
+    for i in range(args.updates):
+        update = api.inject_update(recorded[i % len(recorded)])
+        sent_at[update["update_id"]] = time.perf_counter()
+        if i % args.concurrency == 0:
+            await asyncio.sleep(0)
+    await wait_for(received, args.updates)
+    elapsed = time.perf_counter() - t_start
+    
+    await dp.stop_polling()
+    await polling
+    await runner.cleanup()
+    
+    results.add("polling_to_handler", {
+        **_summarize([received[u] - sent_at[u] for u in received if u in sent_at]),
+        "updates_per_second": len(received) / elapsed,
+    }, updates=args.updates, api_latency_ms=args.api_latency_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook vs long polling update latency")
+    parser.add_argument("--updates", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--queue-size", type=int, default=1_000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--api-latency-ms", type=float, default=50.0,
+                        help="زمن الاستجابة المحاكى لخوادم تيليجرام في وضع polling")
+    parser.add_argument("--output", default="bench_results_webhook.json")
+    parser.add_argument("--compare", default=None)
+    args = parser.parse_args()
+    
+    from loguru import logger
+    import sys
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    
+    recorded = load_recorded_updates()
+    results = BenchResults("webhook_vs_polling")
+    asyncio.run(bench_webhook(args, recorded, results))
+    asyncio.run(bench_polling(args, recorded, results))
+    results.write(args.output)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+أدوات مشتركة لقياسات الأداء: بيانات اصطناعية، توقيت، وحفظ النتائج
+"""
+
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# جذر المشروع (لاستيراد وحدات البوت عند التشغيل كـ python -m benchmarks.xxx)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+OWNER_ID = 1_000_000_000
+
+
+# ==========================================
+# --- تجهيز البيئة ---
+# ==========================================
+
+def prepare_environment(workdir: str = None) -> str:
+    """
+    تجهيز مجلد عمل مؤقت وقاعدة بيانات منفصلة
+    يجب استدعاؤها قبل استيراد database
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix="adhkar_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    
+    from database import init_db
+    init_db()
+    return workdir
+
+
+# ==========================================
+# --- البيانات الاصطناعية ---
+# ==========================================
+
+def build_users(count: int, chunk: int = 50_000):
+    """إضافة مستخدمين اصطناعيين بالجملة (المستخدم الأول مالك)"""
+    from database import User, get_engine
+    
+    now = datetime.utcnow()
+    engine = get_engine()
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"user_id": OWNER_ID, "first_name": "Owner", "role": "owner",
+             "is_subscribed": True, "joined_at": now, "last_interaction": now}
+        ])
+        for start in range(1, count, chunk):
+            rows = [
+                {"user_id": OWNER_ID + i, "first_name": f"user{i}", "username": None,
+                 "role": "admin" if i % 10_000 == 0 else "user",
+                 "is_subscribed": False, "joined_at": now, "last_interaction": now}
+                for i in range(start, min(start + chunk, count))
+            ]
+            conn.execute(User.__table__.insert(), rows)
+
+
+def build_channels(count: int, chunk: int = 50_000):
+    """إضافة قنوات اصطناعية نشطة بالجملة"""
+    from database import Channel, get_engine
+    
+    now = datetime.utcnow()
+    engine = get_engine()
+    with engine.begin() as conn:
+        for start in range(0, count, chunk):
+            rows = [
+                {"channel_id": str(-1_000_000_000_000 - i), "title": f"قناة اختبار رقم {i}",
+                 "added_by": OWNER_ID + (i % 1000), "added_at": now, "is_active": True}
+                for i in range(start, min(start + chunk, count))
+            ]
+            conn.execute(Channel.__table__.insert(), rows)
+
+
+def build_corpus(file_path: str, entries: int, seed: int = 0) -> str:
+    """إنشاء ملف أذكار اصطناعي بعدد محدد من المدخلات"""
+    rng = random.Random(seed)
+    words = ["سبحان", "الله", "وبحمده", "العظيم", "لا", "إله", "إلا", "الحمد", "لله",
+             "رب", "العالمين", "أستغفر", "وأتوب", "إليه", "اللهم", "صل", "على", "محمد"]
+    blocks = []
+    for i in range(entries):
+        lines = [" ".join(rng.choice(words) for _ in range(rng.randint(4, 14)))
+                 for _ in range(rng.randint(1, 3))]
+        blocks.append(f"{i + 1}. " + "\n".join(lines))
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(blocks))
+    return file_path
+
+
+class FakeBot:
+    """بوت وهمي يحاكي send_message دون اتصال بالشبكة"""
+    
+    def __init__(self, latency: float = 0.0):
+        self.id = 1
+        self.latency = latency
+        self.sent = 0
+    
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.latency:
+            import asyncio
+            await asyncio.sleep(self.latency)
+        self.sent += 1
+        from types import SimpleNamespace
+        return SimpleNamespace(message_id=self.sent, chat=SimpleNamespace(id=chat_id))
+
+
+# ==========================================
+# --- التوقيت ---
+# ==========================================
+
+def _summarize(samples: list) -> dict:
+    samples_ms = sorted(s * 1000 for s in samples)
+    n = len(samples_ms)
+    return {
+        "runs": n,
+        "mean_ms": statistics.fmean(samples_ms),
+        "p50_ms": samples_ms[n // 2],
+        "p95_ms": samples_ms[min(n - 1, int(n * 0.95))],
+        "min_ms": samples_ms[0],
+        "max_ms": samples_ms[-1],
+    }
+
+
+def measure(fn, repeat: int = 5, warmup: int = 1, setup=None) -> dict:
+    """قياس زمن دالة متزامنة"""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return _summarize(samples)
+
+
+async def ameasure(coro_fn, repeat: int = 5, warmup: int = 1, setup=None) -> dict:
+    """قياس زمن دالة غير متزامنة"""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        await coro_fn()
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        await coro_fn()
+        samples.append(time.perf_counter() - t0)
+    return _summarize(samples)
+
+
+# ==========================================
+# --- حفظ النتائج ---
+# ==========================================
+
+class BenchResults:
+    """تجميع نتائج القياس وحفظها بصيغة JSON قابلة للمقارنة"""
+    
+    def __init__(self, suite: str):
+        self.suite = suite
+        self.results = []
+    
+    def add(self, name: str, stats: dict, **params):
+        entry = {"name": name, "params": params, **stats}
+        self.results.append(entry)
+        print(f"{name:<45} {json.dumps(params, ensure_ascii=False):<30} "
+              f"mean={stats.get('mean_ms', 0):10.3f}ms p95={stats.get('p95_ms', 0):10.3f}ms")
+    
+    def write(self, path: str):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=ROOT_DIR, capture_output=True, text=True
+            ).stdout.strip()
+        except Exception:
+            commit = None
+        payload = {
+            "suite": self.suite,
+            "timestamp": datetime.utcnow().isoformat(),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": self.results,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 تم حفظ النتائج في {path}")
+
+
+def compare(previous_path: str, current: BenchResults):
+    """مقارنة النتائج الحالية بتشغيل سابق"""
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    key = lambda r: (r["name"], json.dumps(r["params"], sort_keys=True))
+    old = {key(r): r for r in previous["results"]}
+    print(f"\n🔁 مقارنة مع {previous_path} ({previous.get('commit')}):")
+    for r in current.results:
+        o = old.get(key(r))
+        if not o or not o.get("mean_ms") or "mean_ms" not in r:
+            continue
+        ratio = r["mean_ms"] / o["mean_ms"]
+        print(f"{r['name']:<45} {o['mean_ms']:10.3f}ms -> {r['mean_ms']:10.3f}ms  x{ratio:.2f}")
@@ -0,0 +1,308 @@
+"""
+خادم Bot API وهمي محلي لاختبار الأداء من طرف إلى طرف
+
+يحاكي: زمن الاستجابة، أخطاء 429 (RetryAfter)، Forbidden، وchat not found،
+ويسجل عدد الرسائل المستلمة لكل محادثة.
+
+الاستخدام:
+    python -m benchmarks.fake_bot_api --port 8081 --latency-ms 30 --rate-limit 30
+ثم تشغيل البوت مع:
+    TELEGRAM_API_SERVER=http://127.0.0.1:8081 python main.py
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import zlib
+from collections import defaultdict
+
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "FakeAdhkarBot", "username": "fake_adhkar_bot"}
+
+SEND_METHODS = {
+    "sendmessage", "copymessage", "sendphoto", "sendvoice", "sendaudio",
+    "sendvideo", "senddocument", "sendanimation",
+}
+
+
+class FakeTelegramAPI:
+    """حالة الخادم الوهمي وسلوكه"""
+    
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        rate_limit: float = 0.0,
+        retry_after: int = 1,
+        forbidden_ratio: float = 0.0,
+        not_found_ratio: float = 0.0,
+        left_ratio: float = 0.0,
+    ):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.forbidden_ratio = forbidden_ratio
+        self.not_found_ratio = not_found_ratio
+        self.left_ratio = left_ratio
+        
+        # دلو الرموز للمعدل العام
+        self._tokens = rate_limit
+        self._last_refill = time.monotonic()
+        
+        # التحديثات المنتظرة لـ getUpdates
+        self.updates: asyncio.Queue = asyncio.Queue()
+        self._update_id = 0
+        
+        self.reset()
+    
+    def reset(self):
+        """تصفير العدادات"""
+        self.deliveries = defaultdict(int)
+        self.calls = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.message_id = 0
+        self.started_at = time.monotonic()
+        self.first_send_at = None
+        self.last_send_at = None
+    
+    # ==================== سلوك المحادثات ====================
+    
+    def _chat_bucket(self, chat_id: str) -> float:
+        """قيمة ثابتة بين 0 و1 لكل محادثة (لتحديد سلوكها بشكل حتمي)"""
+        return (zlib.crc32(str(chat_id).encode()) % 10_000) / 10_000
+    
+    def chat_kind(self, chat_id: str) -> str:
+        bucket = self._chat_bucket(chat_id)
+        if bucket < self.forbidden_ratio:
+            return "forbidden"
+        bucket -= self.forbidden_ratio
+        if bucket < self.not_found_ratio:
+            return "not_found"
+        bucket -= self.not_found_ratio
+        if bucket < self.left_ratio:
+            return "left"
+        return "ok"
+    
+    def _take_token(self) -> bool:
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.rate_limit, self._tokens + (now - self._last_refill) * self.rate_limit)
+        self._last_refill = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+    
+    # ==================== الردود ====================
+    
+    @staticmethod
+    def _ok(result) -> web.Response:
+        return web.json_response({"ok": True, "result": result})
+    
+    def _error(self, method: str, code: int, description: str, parameters: dict = None) -> web.Response:
+        self.errors[f"{method}:{code}"] += 1
+        payload = {"ok": False, "error_code": code, "description": description}
+        if parameters:
+            payload["parameters"] = parameters
+        return web.json_response(payload, status=code)
+    
+    def _chat(self, chat_id) -> dict:
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            # معرف نصي (@name) يتم تحويله لرقم ثابت
+            chat_id = -1_000_000_000_000 - zlib.crc32(str(chat_id).encode())
+        kind = "channel" if chat_id < 0 else "private"
+        chat = {"id": chat_id, "type": kind}
+        if kind == "channel":
+            chat["title"] = f"Fake channel {chat_id}"
+        else:
+            chat["first_name"] = f"user{chat_id}"
+        return chat
+    
+    def _member(self, status: str) -> dict:
+        member = {"status": status, "user": BOT_USER}
+        if status == "administrator":
+            member.update({
+                "can_be_edited": False, "is_anonymous": False, "can_manage_chat": True,
+                "can_delete_messages": True, "can_manage_video_chats": True,
+                "can_restrict_members": True, "can_promote_members": False,
+                "can_change_info": True, "can_invite_users": True, "can_post_messages": True,
+            })
+        elif status == "kicked":
+            member["until_date"] = 0
+        return member
+    
+    # ==================== المعالج الرئيسي ====================
+    
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        self.calls[method] += 1
+        params = dict(await request.post()) if request.can_read_body else {}
+        params.update(request.query)
+        
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + random.random() * self.jitter)
+        
+        if method == "getme":
+            return self._ok(BOT_USER)
+        if method == "getupdates":
+            return await self._get_updates(params)
+        if method in {"setmycommands", "deletewebhook", "setwebhook", "answercallbackquery",
+                      "close", "logout", "answerinlinequery"}:
+            return self._ok(True)
+        
+        chat_id = params.get("chat_id")
+        kind = self.chat_kind(chat_id) if chat_id is not None else "ok"
+        
+        if method in SEND_METHODS:
+            if not self._take_token():
+                return self._error(method, 429, f"Too Many Requests: retry after {self.retry_after}",
+                                   {"retry_after": self.retry_after})
+            if kind == "forbidden":
+                return self._error(method, 403, "Forbidden: bot was kicked from the channel chat")
+            if kind == "not_found":
+                return self._error(method, 400, "Bad Request: chat not found")
+            return self._sent(method, chat_id, params)
+        
+        if method == "getchatmember":
+            if kind == "forbidden":
+                return self._error(method, 403, "Forbidden: bot is not a member of the channel chat")
+            if kind == "not_found":
+                return self._error(method, 400, "Bad Request: chat not found")
+            return self._ok(self._member("left" if kind == "left" else "administrator"))
+        
+        if method == "getchat":
+            if kind == "not_found":
+                return self._error(method, 400, "Bad Request: chat not found")
+            return self._ok(self._chat(chat_id))
+        
+        if method in {"editmessagetext", "editmessagereplymarkup"}:
+            return self._sent(method, chat_id, params)
+        
+        return self._error(method, 404, "Not Found: method not found")
+    
+    def _sent(self, method: str, chat_id, params: dict) -> web.Response:
+        now = time.monotonic()
+        self.first_send_at = self.first_send_at or now
+        self.last_send_at = now
+        self.deliveries[str(chat_id)] += 1
+        self.message_id += 1
+        if method == "copymessage":
+            return self._ok({"message_id": self.message_id})
+        message = {
+            "message_id": self.message_id,
+            "date": int(time.time()),
+            "chat": self._chat(chat_id),
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        kind = method[len("send"):]
+        if kind in params:
+            # الملفات المرفوعة تحصل على معرف جديد، والمعرفات تُعاد كما هي
+            value = params[kind]
+            uploaded = not isinstance(value, str) or value.startswith("attach://")
+            file_id = f"file-{self.message_id}" if uploaded else value
+            media = {"file_id": file_id, "file_unique_id": file_id}
+            if kind == "photo":
+                message["photo"] = [{**media, "width": 1, "height": 1}]
+            else:
+                message[kind] = {**media, "duration": 1} if kind in {"voice", "audio", "video", "animation"} else media
+            if kind in {"video", "animation"}:
+                message[kind].update(width=1, height=1)
+        return self._ok(message)
+    
+    async def _get_updates(self, params: dict) -> web.Response:
+        timeout = float(params.get("timeout") or 0)
+        updates = []
+        try:
+            if self.updates.empty() and timeout:
+                updates.append(await asyncio.wait_for(self.updates.get(), timeout))
+            while not self.updates.empty():
+                updates.append(self.updates.get_nowait())
+        except asyncio.TimeoutError:
+            pass
+        return self._ok(updates)
+    
+    def inject_update(self, update: dict) -> dict:
+        """إضافة تحديث ليستلمه البوت عبر getUpdates"""
+        self._update_id += 1
+        update = {**update, "update_id": self._update_id}
+        self.updates.put_nowait(update)
+        return update
+    
+    # ==================== نقاط المراقبة ====================
+    
+    def stats(self) -> dict:
+        duration = (self.last_send_at - self.first_send_at) if self.first_send_at else 0
+        delivered = sum(self.deliveries.values())
+        return {
+            "delivered": delivered,
+            "chats": len(self.deliveries),
+            "send_duration_s": duration,
+            "messages_per_second": delivered / duration if duration else 0,
+            "calls": dict(self.calls),
+            "errors": dict(self.errors),
+        }
+    
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        payload = self.stats()
+        if request.query.get("per_chat"):
+            payload["per_chat"] = dict(self.deliveries)
+        return web.json_response(payload)
+    
+    async def handle_reset(self, request: web.Request) -> web.Response:
+        self.reset()
+        return self._ok(True)
+    
+    async def handle_inject(self, request: web.Request) -> web.Response:
+        return self._ok(self.inject_update(await request.json()))
+    
+    def make_app(self) -> web.Application:
+        app = web.Application(client_max_size=10 * 1024 * 1024)
+        app.router.add_get("/_stats", self.handle_stats)
+        app.router.add_post("/_reset", self.handle_reset)
+        app.router.add_post("/_inject", self.handle_inject)
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        return app
+
+
+async def start_server(api: FakeTelegramAPI, host: str = "127.0.0.1", port: int = 0):
+    """تشغيل الخادم داخل حلقة الأحداث الحالية (يعيد runner والعنوان)"""
+    runner = web.AppRunner(api.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port, backlog=4096)
+    await site.start()
+    sock = site._server.sockets[0]
+    actual_port = sock.getsockname()[1]
+    return runner, f"http://{host}:{actual_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Telegram Bot API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="رسائل/ثانية (0 = بلا حد)")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--forbidden", type=float, default=0.0, help="نسبة القنوات المحظورة")
+    parser.add_argument("--not-found", type=float, default=0.0, help="نسبة القنوات غير الموجودة")
+    parser.add_argument("--left", type=float, default=0.0, help="نسبة القنوات التي غادرها البوت")
+    args = parser.parse_args()
+    
+    api = FakeTelegramAPI(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_limit=args.rate_limit,
+        retry_after=args.retry_after, forbidden_ratio=args.forbidden,
+        not_found_ratio=args.not_found, left_ratio=args.left,
+    )
+    print(f"🧪 خادم Bot API الوهمي يعمل على http://{args.host}:{args.port}")
+    web.run_app(api.make_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+مجمع بوتات النشر (اختياري)
+حد تيليجرام للرسائل في الثانية محسوب لكل بوت، فتوزيع القنوات على عدة بوتات (كل بوت مشرف في مجموعة منها)
+يرفع معدل النشر الكلي بعدد البوتات.
+البوت الرئيسي هو الفهرس 0 وبوتات BOT_POOL_TOKENS تليه بالترتيب، والبوت المسؤول عن كل قناة محفوظ في
+channels.bot_index. كل بوت بجلسته الخاصة (مسارا الطلبات وحد الطلبات في bot_session).
+"""
+
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional
+from aiogram import Bot
+from bot_session import bulk_lane, create_bot, get_api_server
+from config import BotConfig, PerformanceConfig
+from database import DatabaseManager
+from membership import ADMIN_STATUSES
+from shutdown import cancel_task
+from loguru import logger
+
+
+class BotPool:
+    """البوتات المتاحة للنشر وتوزيع القنوات عليها"""
+    
+    def __init__(self, bot: Bot, tokens: list = None):
+        tokens = BotConfig.POOL_TOKENS if tokens is None else tokens
+        self.bots = [bot]
+        if tokens:
+            api_server = get_api_server(bot)
+            self.bots.extend(create_bot(token, api_server=api_server) for token in tokens)
+        # معرف القناة -> فهرس البوت (القنوات غير الموجودة تتبع البوت الرئيسي)
+        self._owners: Optional[Dict[str, int]] = None
+        self._loading = asyncio.Lock()
+        self._rebalance_task: Optional[asyncio.Task] = None
+        DatabaseManager.on_change("channels", self.invalidate)
+    
+    def __len__(self) -> int:
+        return len(self.bots)
+    
+    @property
+    def enabled(self) -> bool:
+        return len(self.bots) > 1
+    
+    def invalidate(self):
+        """إعادة قراءة التوزيع عند الحاجة التالية"""
+        self._owners = None
+    
+    async def load(self):
+        """قراءة توزيع القنوات على البوتات (مرة واحدة حتى يتغير)"""
+        if self._owners is not None or not self.enabled:
+            return
+        async with self._loading:
+            if self._owners is None:
+                self._owners = await asyncio.to_thread(DatabaseManager.get_channel_bots)
+    
+    def get(self, index: int) -> Bot:
+        return self.bots[index]
+    
+    def owner_of(self, channel_id) -> int:
+        """فهرس البوت المسؤول عن قناة (البوت الرئيسي إذا أُزيل بوتها من الإعدادات)"""
+        index = (self._owners or {}).get(str(channel_id), 0)
+        return index if index < len(self.bots) else 0
+    
+    def bot_for(self, channel_id) -> Bot:
+        return self.bots[self.owner_of(channel_id)]
+    
+    async def partition(self, channel_ids: List[str]) -> Dict[int, List[str]]:
+        """تقسيم القنوات حسب بوتاتها {فهرس البوت: [القنوات]}"""
+        if not self.enabled:
+            return {0: channel_ids}
+        await self.load()
+        groups = {}
+        for channel_id in channel_ids:
+            groups.setdefault(self.owner_of(channel_id), []).append(channel_id)
+        return groups
+    
+    async def pool_channel_count(self) -> int:
+        """عدد القنوات التي ينشر فيها أحد بوتات المجمع الإضافية"""
+        if not self.enabled:
+            return 0
+        await self.load()
+        return sum(1 for index in self._owners.values() if 0 < index < len(self.bots))
+    
+    async def find_admin(self, channel_id, loads: Counter = None) -> Optional[int]:
+        """البوت الأقل حملاً من بين البوتات المشرفة في القناة (None إذا لم يكن أي منها مشرفاً)"""
+        async def is_admin(bot: Bot) -> bool:
+            try:
+                member = await bot.get_chat_member(channel_id, bot.id)
+            except Exception as e:
+                logger.debug(f"البوت {bot.id} لا يصل إلى {channel_id}: {e}")
+                return False
+            return str(getattr(member.status, "value", member.status)) in ADMIN_STATUSES
+        
+        admins = [index for index, ok in enumerate(await asyncio.gather(*map(is_admin, self.bots))) if ok]
+        if len(admins) <= 1:
+            return admins[0] if admins else None
+        loads = await self._loads() if loads is None else loads
+        return min(admins, key=lambda index: (loads[index], index))
+    
+    async def _loads(self) -> Counter:
+        """عدد القنوات النشطة لكل بوت"""
+        await self.load()
+        loads = Counter(self._owners.values())
+        total = await asyncio.to_thread(DatabaseManager.count_active_channels)
+        loads[0] = total - sum(loads.values())
+        return loads
+    
+    async def rebalance(self, rate: float = PerformanceConfig.CHANNEL_RECONCILE_RATE) -> Counter:
+        """
+        إعادة توزيع القنوات النشطة على البوتات المشرفة فيها بحيث يتقارب عدد قنوات كل بوت
+        (مثلاً بعد إضافة بوتات للمجمع) — فحص بمعدل محدود عبر المسار الجماعي، ويُرجع عدد القنوات لكل بوت
+        """
+        loads = await self._loads()
+        moves = []
+        channel_ids = [channel.channel_id for channel in await asyncio.to_thread(DatabaseManager.get_active_channels)]
+        for channel_id in channel_ids:
+            current = self.owner_of(channel_id)
+            # القناة لا تُحسب على بوتها الحالي أثناء المقارنة
+            loads[current] -= 1
+            with bulk_lane():
+                index = await self.find_admin(channel_id, loads)
+            index = current if index is None else index
+            loads[index] += 1
+            if index != current:
+                moves.append((channel_id, index))
+            await asyncio.sleep(1 / rate)
+        
+        if moves:
+            await asyncio.to_thread(DatabaseManager.assign_channel_bots, moves)
+            self.invalidate()
+        logger.info(f"🤖 توزيع القنوات على البوتات: نُقلت {len(moves)} قناة، الحمل: {dict(sorted(loads.items()))}")
+        return loads
+    
+    @property
+    def rebalancing(self) -> bool:
+        return self._rebalance_task is not None and not self._rebalance_task.done()
+    
+    def start_rebalance(self, notify: Callable[[Optional[Counter]], Awaitable] = None) -> bool:
+        """
+        بدء إعادة التوزيع في الخلفية (تستغرق دقائق مع كثرة القنوات) - False إذا كانت جارية بالفعل
+        notify: تُستدعى بعد الانتهاء بعدد القنوات لكل بوت (أو None عند الفشل)
+        """
+        if self.rebalancing:
+            return False
+        self._rebalance_task = asyncio.create_task(self._rebalance_and_notify(notify))
+        return True
+    
+    async def _rebalance_and_notify(self, notify):
+        try:
+            loads = await self.rebalance()
+        except Exception as e:
+            logger.error(f"❌ خطأ في إعادة توزيع القنوات على البوتات: {e}")
+            loads = None
+        if notify is not None:
+            try:
+                await notify(loads)
+            except Exception as e:
+                logger.error(f"❌ خطأ في إرسال نتيجة توزيع القنوات: {e}")
+    
+    async def close(self):
+        """إيقاف إعادة التوزيع الجارية وإغلاق جلسات بوتات المجمع (جلسة البوت الرئيسي تُغلق مع البوت)"""
+        if self._rebalance_task is not None:
+            await cancel_task(self._rebalance_task)
+        for bot in self.bots[1:]:
+            await bot.session.close()
+
+
+# إنشاء مثيل من النظام
+bot_pool_instance = None
+
+
+def get_bot_pool(bot: Bot) -> BotPool:
+    """الحصول على مجمع البوتات (البوت الممرر أول مرة هو الرئيسي)"""
+    global bot_pool_instance
+    if bot_pool_instance is None:
+        bot_pool_instance = BotPool(bot)
+    return bot_pool_instance
@@ -0,0 +1,193 @@
+"""
+إنشاء كائنات البوت وجلسات الاتصال بـ Bot API
+
+طلبات البوت تمر عبر مسارين بأولوية مختلفة:
+- interactive (الافتراضي): الردود وتعديل الرسائل والأزرار داخل المعالجات
+- bulk: النشر التلقائي والبث والفحص الدوري (داخل with bulk_lane())
+لكل مسار مجمع اتصالات منفصل وحصة محجوزة من حد الطلبات في الثانية،
+فلا تنتظر ضغطة زر خلف آلاف رسائل النشر. المسار التفاعلي يستعير من حصة الجماعي عند نفاد حصته، والعكس غير مسموح
+إلا إذا كانت حصة الجماعي صفراً (INTERACTIVE_RATE_SHARE=1) فيعمل بالاستعارة فقط.
+"""
+
+import asyncio
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.base import BaseSession
+from aiogram.client.telegram import TelegramAPIServer
+from config import BotConfig
+from metrics import API_LANE_IN_FLIGHT, API_LANE_REQUESTS, API_LANE_WAIT
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+# المسار الحالي (ينتقل تلقائياً للمهام التي تُنشأ داخله، مثل asyncio.gather)
+_lane: ContextVar[str] = ContextVar("api_lane", default=INTERACTIVE)
+
+
+# كل الجلسات المفتوحة (البوت الرئيسي وبوتات المجمع) - مقياس الطلبات الجارية مجموعها
+_sessions = weakref.WeakSet()
+
+
+def _in_flight(lane: str) -> int:
+    return sum(session.in_flight[lane] for session in list(_sessions))
+
+
+for _lane_name in LANES:
+    API_LANE_IN_FLIGHT.set_function(lambda lane=_lane_name: _in_flight(lane), _lane_name)
+
+
+def current_lane() -> str:
+    """مسار الطلبات في السياق الحالي"""
+    return _lane.get()
+
+
+@contextmanager
+def bulk_lane():
+    """إرسال طلبات هذا السياق عبر المسار الجماعي"""
+    token = _lane.set(BULK)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class TokenBucket:
+    """دلو رموز: rate طلب في الثانية مع سعة burst"""
+    
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    def take(self) -> float:
+        """أخذ رمز إن توفر: 0 عند النجاح، وإلا المدة حتى يتوفر رمز"""
+        if self.rate <= 0:
+            return float("inf")
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class LaneLimiter:
+    """حد الطلبات مقسماً على المسارين (الانتظار بالترتيب داخل كل مسار)"""
+    
+    def __init__(self, rate: float, interactive_share: float):
+        share = min(max(interactive_share, 0.0), 1.0)
+        self.buckets = {INTERACTIVE: TokenBucket(rate * share), BULK: TokenBucket(rate * (1 - share))}
+        self._locks = {lane: asyncio.Lock() for lane in LANES}
+    
+    async def acquire(self, lane: str):
+        bucket = self.buckets[lane]
+        other = self.buckets[BULK if lane == INTERACTIVE else INTERACTIVE]
+        async with self._locks[lane]:
+            while True:
+                delay = bucket.take()
+                if not delay:
+                    return
+                if lane == INTERACTIVE or bucket.rate <= 0:
+                    # استعارة رمز من حصة المسار الآخر (المسار بلا حصة يعمل بالاستعارة فقط)
+                    borrowed = other.take()
+                    if not borrowed:
+                        return
+                    delay = min(delay, borrowed)
+                await asyncio.sleep(delay)
+
+
+class LanedSession(BaseSession):
+    """
+    جلسة Bot API بمسارين: كل مسار جلسة aiohttp مستقلة بمجمع اتصالات خاص، وحصة طلبات من حد مشترك
+    (الجلستان مملوكتان لا موروثتان: AiohttpSession تغلق نفسها عند أول طلب لإعادة ضبط الاتصال،
+    فلو كانت close هنا تغلق المسار الآخر لأغلقت الطلبات المتزامنة جلسات بعضها)
+    """
+    
+    def __init__(
+        self,
+        rate_limit: float = BotConfig.API_RATE_LIMIT,
+        interactive_share: float = BotConfig.INTERACTIVE_RATE_SHARE,
+        interactive_connections: int = BotConfig.INTERACTIVE_CONNECTIONS,
+        bulk_connections: int = BotConfig.BULK_CONNECTIONS,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        connections = {INTERACTIVE: interactive_connections, BULK: bulk_connections}
+        self.lanes = {}
+        for lane in LANES:
+            self.lanes[lane] = AiohttpSession(**kwargs)
+            self.lanes[lane]._connector_init["limit"] = connections[lane]
+        self.limiter = LaneLimiter(rate_limit, interactive_share) if rate_limit > 0 else None
+        self.in_flight = {lane: 0 for lane in LANES}
+        _sessions.add(self)
+    
+    async def make_request(self, bot: Bot, method, timeout: Optional[int] = None):
+        lane = current_lane()
+        if self.limiter is not None:
+            started = time.perf_counter()
+            await self.limiter.acquire(lane)
+            API_LANE_WAIT.observe(time.perf_counter() - started, lane)
+        
+        self.in_flight[lane] += 1
+        outcome = "ok"
+        try:
+            return await self.lanes[lane].make_request(bot, method, timeout)
+        except Exception as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            self.in_flight[lane] -= 1
+            API_LANE_REQUESTS.inc(lane, outcome)
+    
+    async def stream_content(self, url: str, headers: Optional[dict] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True):
+        """تنزيل الملفات عبر مسار السياق الحالي"""
+        async for chunk in self.lanes[current_lane()].stream_content(
+            url, headers=headers, timeout=timeout, chunk_size=chunk_size, raise_for_status=raise_for_status
+        ):
+            yield chunk
+    
+    async def close(self):
+        """إغلاق جلستي المسارين"""
+        await asyncio.gather(*(session.close() for session in self.lanes.values()))
+
+
+def create_bot(
+    token: str = None,
+    api_server: str = None,
+    rate_limit: float = None,
+    interactive_share: float = None
+) -> Bot:
+    """
+    إنشاء بوت يتصل بخادم Bot API الرسمي
+    أو بخادم بديل إذا تم تحديد TELEGRAM_API_SERVER
+    rate_limit / interactive_share: حد الطلبات لهذه الجلسة وحصة المسار التفاعلي منه (الافتراضي من BotConfig)
+    """
+    token = token or BotConfig.TOKEN
+    api_server = api_server if api_server is not None else BotConfig.API_SERVER
+    limits = {
+        "rate_limit": BotConfig.API_RATE_LIMIT if rate_limit is None else rate_limit,
+        "interactive_share": BotConfig.INTERACTIVE_RATE_SHARE if interactive_share is None else interactive_share,
+    }
+    
+    if api_server:
+        session = LanedSession(api=TelegramAPIServer.from_base(api_server), **limits)
+    else:
+        session = LanedSession(**limits)
+    return Bot(token=token, session=session)
+
+
+def get_api_server(bot: Bot) -> str:
+    """استخراج عنوان خادم Bot API الذي يستخدمه البوت ('' للخادم الرسمي)"""
+    base = bot.session.api.base
+    if base == TelegramAPIServer.from_base("https://api.telegram.org").base:
+        return ""
+    return base.split("/bot{token}")[0]
@@ -5,6 +5,10 @@
 import os
 import random
 from datetime import datetime, time as dt_time
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from config import AdhkarConfig
 from loguru import logger
 
 
@@ -12,14 +16,28 @@ from loguru import logger
 # --- إدارة الأذكار من الملفات ---
 # ==========================================
 
+# فهرس الأذكار في الذاكرة: المسار -> (وقت التعديل، الحجم، قائمة الأذكار)
+_corpus_cache = {}
+
+
 def load_adhkars_from_file(file_path: str) -> list:
-    """تحميل الأذكار من ملف نصي"""
-    adhkars = []
-    
-    if not os.path.exists(file_path):
+    """
+    تحميل الأذكار من ملف نصي
+    تُقرأ الملفات مرة واحدة وتُحفظ في الذاكرة، ويُعاد تحميلها فقط عند تغيّرها.
+    القائمة المعادة مشتركة ويجب عدم تعديلها.
+    """
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        _corpus_cache.pop(file_path, None)
         logger.warning(f"⚠️ الملف غير موجود: {file_path}")
-        return adhkars
+        return []
+    
+    cached = _corpus_cache.get(file_path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
     
+    adhkars = []
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read().strip()
@@ -27,6 +45,7 @@ def load_adhkars_from_file(file_path: str) -> list:
                 # تقسيم الأذكار بناءً على الأسطر الفارغة
                 adhkars = [z.strip() for z in content.split('\n\n') if z.strip()]
         
+        _corpus_cache[file_path] = (stat.st_mtime_ns, stat.st_size, adhkars)
         logger.info(f"✅ تم تحميل {len(adhkars)} ذكر من {file_path}")
     except Exception as e:
         logger.error(f"❌ خطأ في قراءة الملف {file_path}: {e}")
@@ -34,6 +53,15 @@ def load_adhkars_from_file(file_path: str) -> list:
     return adhkars
 
 
+def index_corpora(file_paths: list) -> int:
+    """فهرسة ملفات الأذكار مسبقاً في الذاكرة (تُستدعى عند الإقلاع)"""
+    total = 0
+    for file_path in file_paths:
+        ensure_file_exists(file_path)
+        total += len(load_adhkars_from_file(file_path))
+    return total
+
+
 def get_random_adhkar(file_path: str) -> str:
     """الحصول على ذكر عشوائي من الملف"""
     adhkars = load_adhkars_from_file(file_path)
@@ -57,12 +85,32 @@ def save_adhkars_to_file(file_path: str, adhkars: list) -> bool:
 # --- التحقق من الأوقات ---
 # ==========================================
 
-def is_in_time_range(start_time: str, end_time: str) -> bool:
-    """التحقق من أن الوقت الحالي ضمن النطاق المحدد"""
+@lru_cache(maxsize=256)
+def get_zone(name: Optional[str] = None) -> Optional[ZoneInfo]:
+    """
+    المنطقة الزمنية بالاسم (مثل Asia/Riyadh) مع التخزين المؤقت
+    بدون اسم: DEFAULT_TIMEZONE، وإن لم تُحدد فمنطقة الخادم (None)
+    """
+    name = name or AdhkarConfig.DEFAULT_TIMEZONE
+    if not name:
+        return None
     try:
-        current_time = datetime.now().time()
-        start = dt_time.fromisoformat(start_time)
-        end = dt_time.fromisoformat(end_time)
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.error(f"❌ منطقة زمنية غير معروفة: {name}")
+        return None
+
+
+@lru_cache(maxsize=256)
+def _parse_range(start_time: str, end_time: str) -> tuple:
+    return dt_time.fromisoformat(start_time), dt_time.fromisoformat(end_time)
+
+
+def is_in_time_range(start_time: str, end_time: str, timezone: Optional[str] = None) -> bool:
+    """التحقق من أن الوقت الحالي (في المنطقة الزمنية المحددة) ضمن النطاق المحدد"""
+    try:
+        start, end = _parse_range(start_time, end_time)
+        current_time = datetime.now(get_zone(timezone)).time()
         
         if start < end:
             return start <= current_time < end
@@ -102,6 +150,25 @@ def format_adhkar_message(adhkar_text: str) -> str:
     return "\n".join(formatted_lines)
 
 
+def format_broadcast_job(job) -> str:
+    """تنسيق رسالة حالة مهمة بث"""
+    statuses = {"running": "🔄 جارية", "paused": "⏸️ متوقفة مؤقتاً", "cancelled": "⛔ ملغاة", "done": "✅ منتهية"}
+    targets = {"users": "المستخدمين", "channels": "القنوات"}
+    processed = job.sent + job.failed + job.skipped
+    progress = processed * 100 // job.total if job.total else 100
+    skipped = f"\n⏭️ تم تخطي: <code>{job.skipped}</code> (قنوات بوتات المجمع)" if job.skipped else ""
+    return (
+        f"📢 <b>مهمة البث #{job.id}</b>\n\n"
+        f"🎯 الهدف: {targets.get(job.target, job.target)}\n"
+        f"📌 الحالة: {statuses.get(job.status, job.status)}\n"
+        f"📊 التقدم: <code>{processed}/{job.total}</code> ({progress}%)\n"
+        f"✅ تم الإرسال: <code>{job.sent}</code>\n"
+        f"❌ فشل: <code>{job.failed}</code>\n"
+        f"⚡ السرعة: <code>{job.rate:.1f}</code> رسالة/ثانية"
+        f"{skipped}"
+    )
+
+
 def format_stats(total_adhkars: int, channels_count: int, users_count: int) -> str:
     """تنسيق رسالة الإحصائيات"""
     return (
@@ -0,0 +1,337 @@
+"""
+البث الجماعي بنسخ رسالة المشرف الأصلية (copy_message)
+يحافظ على الوسائط والتنسيق (entities) دون إعادة رفع أي ملف، مع حد للإرسال المتزامن.
+قنوات بوتات المجمع لا يستطيع بوتها النسخ من محادثة المشرف، فيعيد إرسال محتواها المحفوظ مع المهمة
+(النص أو التعليق مع التنسيق): ملف الوسائط ينزّله البوت الرئيسي مرة واحدة، ويرفعه كل بوت مرة واحدة ثم يرسل بمعرفه.
+الرسائل التي لا يمكن إعادة إرسالها (ملصقات، استطلاعات...) تُتخطى قنوات المجمع فيها وتُحسب في skipped.
+كل بث مهمة محفوظة في قاعدة البيانات قابلة للإيقاف المؤقت والاستئناف والإلغاء.
+"""
+
+import asyncio
+import json
+import time
+from typing import Dict, Optional, Tuple
+from aiogram import Bot
+from aiogram.types import BufferedInputFile, Message, MessageEntity
+from auto_poster import SendOutcome
+from bot_pool import get_bot_pool
+from bot_session import bulk_lane
+from config import BroadcastConfig, PerformanceConfig
+from database import DatabaseManager
+from logging_setup import log_aggregated
+from media_cache import MEDIA_METHODS, extract_file_id
+from reachability import get_reachability_tracker
+from loguru import logger
+
+# أنواع الوسائط التي يمكن إعادة إرسالها (الرسوم المتحركة قبل المستند لأن تيليجرام يملأ الاثنين للـ GIF)
+RESEND_MEDIA = ("animation", "photo", "video", "voice", "audio", "document")
+
+
+async def copy_to_chat(bot: Bot, chat_id, from_chat_id: int, message_id: int) -> SendOutcome:
+    """نسخ رسالة لمحادثة واحدة"""
+    started = time.perf_counter()
+    try:
+        copied = await bot.copy_message(int(chat_id), from_chat_id, message_id)
+        return SendOutcome(str(chat_id), True, copied.message_id, (time.perf_counter() - started) * 1000)
+    except Exception as e:
+        return SendOutcome(str(chat_id), False, None, (time.perf_counter() - started) * 1000, str(e))
+
+
+async def copy_to_chats(
+    bot: Bot,
+    chat_ids: list,
+    from_chat_id: int,
+    message_id: int,
+    concurrency: int = BroadcastConfig.MAX_CONCURRENT
+) -> list:
+    """نسخ رسالة لمجموعة محادثات بتوازي محدود وإرجاع النتائج"""
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one(chat_id):
+        async with semaphore:
+            return await copy_to_chat(bot, chat_id, from_chat_id, message_id)
+    
+    return await asyncio.gather(*(one(chat_id) for chat_id in chat_ids))
+
+
+def resend_payload(message: Message) -> Optional[str]:
+    """محتوى الرسالة (JSON) لإعادة إرسالها عبر بوتات المجمع، أو None إذا لم يكن نوعها مدعوماً"""
+    if message.text is not None:
+        payload = {"kind": "text", "text": message.text, "entities": message.entities}
+    else:
+        kind = next((kind for kind in RESEND_MEDIA if getattr(message, kind, None)), None)
+        if kind is None:
+            return None
+        media = getattr(message, kind)
+        media = media[-1] if kind == "photo" else media
+        payload = {
+            "kind": kind, "file_id": media.file_id, "file_name": getattr(media, "file_name", None),
+            "text": message.caption, "entities": message.caption_entities,
+        }
+    payload["entities"] = [entity.model_dump(mode="json", exclude_none=True) for entity in payload["entities"] or ()]
+    return json.dumps(payload, ensure_ascii=False)
+
+
+async def _resend(bot: Bot, chat_id, payload: dict, media=None) -> tuple:
+    """إعادة إرسال المحتوى لمحادثة: (النتيجة، الرسالة المرسلة أو None) - media: معرف الملف لهذا البوت أو ملف للرفع"""
+    started = time.perf_counter()
+    entities = [MessageEntity(**entity) for entity in payload["entities"]] or None
+    try:
+        if payload["kind"] == "text":
+            sent = await bot.send_message(int(chat_id), payload["text"], entities=entities, parse_mode=None)
+        else:
+            method = getattr(bot, MEDIA_METHODS[payload["kind"]])
+            sent = await method(int(chat_id), media, caption=payload["text"], caption_entities=entities, parse_mode=None)
+        return SendOutcome(str(chat_id), True, sent.message_id, (time.perf_counter() - started) * 1000), sent
+    except Exception as e:
+        return SendOutcome(str(chat_id), False, None, (time.perf_counter() - started) * 1000, str(e)), None
+
+
+async def resend_to_chats(
+    bot: Bot,
+    chat_ids: list,
+    payload: dict,
+    media=None,
+    concurrency: int = BroadcastConfig.MAX_CONCURRENT
+) -> list:
+    """إعادة إرسال المحتوى لمجموعة محادثات بتوازي محدود وإرجاع النتائج"""
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one(chat_id):
+        async with semaphore:
+            outcome, _ = await _resend(bot, chat_id, payload, media)
+            return outcome
+    
+    return await asyncio.gather(*(one(chat_id) for chat_id in chat_ids))
+
+
+class BroadcastManager:
+    """
+    تشغيل مهام البث المحفوظة في broadcast_jobs
+    كل دفعة من CHECKPOINT_EVERY مستلم تُرسل ثم يُحفظ المؤشر والعدادات، فإذا انقطع البوت
+    يُستأنف البث من آخر نقطة محفوظة (يُعاد الإرسال لدفعة واحدة على الأكثر).
+    الإيقاف المؤقت والإلغاء يغيران حالة المهمة، وتتحقق منها المهمة قبل كل دفعة.
+    """
+    
+    def __init__(
+        self,
+        bot: Bot,
+        batch_size: int = BroadcastConfig.CHECKPOINT_EVERY,
+        concurrency: int = BroadcastConfig.MAX_CONCURRENT
+    ):
+        self.bot = bot
+        self.bots = get_bot_pool(bot)
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._tasks = {}
+        self._stopping = False
+        # ملف وسائط كل مهمة بعد تنزيله (None إذا تعذر)، ومعرفه لدى كل بوت من المجمع بعد رفعه
+        self._media: Dict[int, Optional[bytes]] = {}
+        self._file_ids: Dict[Tuple[int, int], str] = {}
+        self._downloading = asyncio.Lock()
+    
+    async def create(self, target: str, message: Message) -> int:
+        """إنشاء مهمة بث لرسالة المشرف وبدء تشغيلها"""
+        job_id = await asyncio.to_thread(
+            DatabaseManager.create_broadcast_job, target, message.chat.id, message.message_id, message.from_user.id,
+            resend_payload(message) if target == "channels" else None
+        )
+        self.start(job_id)
+        return job_id
+    
+    def start(self, job_id: int):
+        """تشغيل مهمة (إن لم تكن تعمل بالفعل)، ولا مهام جديدة أثناء الإيقاف"""
+        if job_id in self._tasks or self._stopping:
+            return
+        # المهمة ترث المسار الجماعي (تنسخ السياق عند إنشائها)
+        with bulk_lane():
+            task = asyncio.create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._forget(job_id))
+    
+    def _forget(self, job_id: int):
+        self._tasks.pop(job_id, None)
+        self._media.pop(job_id, None)
+        for key in [key for key in self._file_ids if key[0] == job_id]:
+            del self._file_ids[key]
+    
+    async def resume_pending(self) -> int:
+        """استئناف المهام التي كانت تعمل عند توقف البوت"""
+        jobs = await asyncio.to_thread(DatabaseManager.get_broadcast_jobs, ("running",), 100)
+        for job in jobs:
+            self.start(job.id)
+        if jobs:
+            logger.info(f"📢 تم استئناف {len(jobs)} مهمة بث")
+        return len(jobs)
+    
+    async def pause(self, job_id: int) -> bool:
+        return await asyncio.to_thread(DatabaseManager.set_broadcast_job_status, job_id, "paused", ("running",))
+    
+    async def resume(self, job_id: int) -> bool:
+        resumed = await asyncio.to_thread(DatabaseManager.set_broadcast_job_status, job_id, "running", ("paused",))
+        if resumed:
+            self.start(job_id)
+        return resumed
+    
+    async def cancel(self, job_id: int) -> bool:
+        return await asyncio.to_thread(
+            DatabaseManager.set_broadcast_job_status, job_id, "cancelled", ("running", "paused")
+        )
+    
+    async def _run(self, job_id: int):
+        failures = 0
+        while not self._stopping:
+            try:
+                if not await self._run_batch(job_id):
+                    return
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # إعادة المحاولة من آخر نقطة محفوظة بانتظار متزايد، ثم إيقاف المهمة مؤقتاً وإبلاغ منشئها
+                failures += 1
+                if failures > BroadcastConfig.RETRY_COUNT:
+                    await self._fail(job_id, e)
+                    return
+                delay = BroadcastConfig.RETRY_DELAY * 2 ** (failures - 1)
+                logger.error(f"❌ خطأ في مهمة البث #{job_id} (المحاولة {failures}، إعادة بعد {delay} ث): {e}")
+                await asyncio.sleep(delay)
+    
+    async def _run_batch(self, job_id: int) -> bool:
+        """إرسال الدفعة التالية من المهمة وحفظ تقدمها (False عند انتهائها أو توقفها)"""
+        job = await asyncio.to_thread(DatabaseManager.get_broadcast_job, job_id)
+        if job is None or job.status != "running":
+            return False
+        batch = await asyncio.to_thread(
+            DatabaseManager.get_broadcast_batch, job.target, job.cursor, self.batch_size
+        )
+        if not batch:
+            await self._finish(job)
+            return False
+        
+        started = time.perf_counter()
+        groups = {0: [chat_id for _, chat_id in batch]}
+        if job.target == "channels":
+            groups = await self.bots.partition(groups[0])
+        results = await asyncio.gather(*(self._deliver(job, index, chat_ids) for index, chat_ids in groups.items()))
+        outcomes = [outcome for result in results if result is not None for outcome in result]
+        skipped = sum(len(groups[index]) for index, result in zip(groups, results) if result is None)
+        elapsed = time.perf_counter() - started
+        sent = sum(1 for outcome in outcomes if outcome.ok)
+        get_reachability_tracker().observe("user" if job.target == "users" else "channel", outcomes)
+        await asyncio.to_thread(
+            DatabaseManager.checkpoint_broadcast_job,
+            job_id, batch[-1][0], sent, len(outcomes) - sent, len(outcomes) / elapsed if elapsed else 0.0, skipped
+        )
+        log_aggregated(
+            "ERROR", f"❌ خطأ في إرسال البث (مهمة #{job_id})",
+            [(outcome.channel_id, outcome.error) for outcome in outcomes if not outcome.ok],
+            len(outcomes)
+        )
+        return True
+    
+    async def _deliver(self, job, index: int, chat_ids: list) -> Optional[list]:
+        """
+        الإرسال لمحادثات بوت واحد: البوت الرئيسي ينسخ الرسالة، وبوتات المجمع تعيد إرسال محتواها
+        (None إذا تعذرت إعادة الإرسال فتُحسب المحادثات متخطاة)
+        """
+        if index == 0:
+            return await copy_to_chats(self.bot, chat_ids, job.from_chat_id, job.message_id, self.concurrency)
+        if job.payload is None:
+            return None
+        payload = json.loads(job.payload)
+        bot = self.bots.get(index)
+        if payload["kind"] == "text":
+            return await resend_to_chats(bot, chat_ids, payload, concurrency=self.concurrency)
+        
+        outcomes = []
+        file_id = self._file_ids.get((job.id, index))
+        if file_id is None:
+            data = await self._download(job.id, payload)
+            if data is None:
+                return None
+            # الرفع مرة واحدة لكل بوت: أول قناة تقبل الملف، ثم تُرسل البقية بمعرفه
+            upload = BufferedInputFile(data, payload["file_name"] or payload["kind"])
+            for chat_id in chat_ids[:PerformanceConfig.MEDIA_UPLOAD_ATTEMPTS]:
+                outcome, sent = await _resend(bot, chat_id, payload, upload)
+                outcomes.append(outcome)
+                file_id = sent and extract_file_id(sent, payload["kind"])
+                if file_id:
+                    self._file_ids[(job.id, index)] = file_id
+                    break
+            chat_ids = chat_ids[len(outcomes):]
+            if not file_id:
+                outcomes.extend(SendOutcome(str(chat_id), False, error="media_unavailable") for chat_id in chat_ids)
+                return outcomes
+        outcomes.extend(await resend_to_chats(bot, chat_ids, payload, file_id, self.concurrency))
+        return outcomes
+    
+    async def _download(self, job_id: int, payload: dict) -> Optional[bytes]:
+        """تنزيل ملف وسائط المهمة عبر البوت الرئيسي مرة واحدة (None إذا تعذر، مثل الملفات الأكبر من حد التنزيل)"""
+        async with self._downloading:
+            if job_id not in self._media:
+                try:
+                    self._media[job_id] = (await self.bot.download(payload["file_id"])).getvalue()
+                except Exception as e:
+                    logger.warning(f"⚠️ تعذر تنزيل وسائط مهمة البث #{job_id}، ستُتخطى قنوات بوتات المجمع: {e}")
+                    self._media[job_id] = None
+            return self._media[job_id]
+    
+    async def _fail(self, job_id: int, error: Exception):
+        """إيقاف مهمة فشلت كل محاولاتها مؤقتاً (يمكن استئنافها من قائمة مهام البث) وإبلاغ منشئها"""
+        logger.error(f"❌ توقفت مهمة البث #{job_id} بعد {BroadcastConfig.RETRY_COUNT + 1} محاولات: {error}")
+        try:
+            await asyncio.to_thread(DatabaseManager.set_broadcast_job_status, job_id, "paused", ("running",))
+            job = await asyncio.to_thread(DatabaseManager.get_broadcast_job, job_id)
+            if job is not None:
+                await self.bot.send_message(
+                    job.created_by,
+                    f"⚠️ توقف البث مؤقتاً بسبب خطأ (مهمة #{job_id})\n\n"
+                    f"📊 التقدم: <code>{job.sent + job.failed + job.skipped}/{job.total}</code>\n"
+                    f"يمكنك استئنافه من قائمة مهام البث.",
+                    parse_mode="HTML"
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ تعذر إيقاف مهمة البث #{job_id} أو إبلاغ منشئها: {e}")
+    
+    async def _finish(self, job):
+        await asyncio.to_thread(DatabaseManager.set_broadcast_job_status, job.id, "done", ("running",))
+        logger.info(f"✅ انتهت مهمة البث #{job.id}: {job.sent}/{job.total}")
+        try:
+            await self.bot.send_message(
+                job.created_by,
+                f"✅ انتهى البث (مهمة #{job.id})\n\n"
+                f"📨 تم الإرسال: <code>{job.sent}</code>\n"
+                f"❌ فشل: <code>{job.failed}</code>"
+                + (f"\n⏭️ تم تخطي: <code>{job.skipped}</code> (قنوات بوتات المجمع)" if job.skipped else ""),
+                parse_mode="HTML"
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ تعذر إبلاغ منشئ مهمة البث #{job.id}: {e}")
+    
+    async def stop(self, timeout: float = None) -> int:
+        """
+        إيقاف المهام الجارية: كل مهمة تُكمل دفعتها الحالية وتحفظ تقدمها حتى timeout، ثم يُلغى ما تبقى
+        تبقى حالتها running لتُستأنف من آخر نقطة حفظ، ويُرجع عدد المهام المؤجلة
+        """
+        self._stopping = True
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return 0
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return len(tasks)
+
+
+# إنشاء مثيل من النظام
+broadcast_manager_instance = None
+
+
+def get_broadcast_manager(bot: Bot) -> BroadcastManager:
+    """الحصول على مدير مهام البث"""
+    global broadcast_manager_instance
+    if broadcast_manager_instance is None:
+        broadcast_manager_instance = BroadcastManager(bot)
+    return broadcast_manager_instance
@@ -11,9 +11,14 @@ from keyboards import (
     get_main_keyboard, get_adhkar_settings_keyboard, get_category_settings_keyboard,
     get_channels_menu_keyboard, get_delete_channels_keyboard, get_broadcast_menu_keyboard,
     get_admins_menu_keyboard, get_delete_admins_keyboard, get_verification_menu_keyboard,
-    get_cancel_keyboard, get_back_keyboard, get_subscription_keyboard
+    get_cancel_keyboard, get_back_keyboard, get_subscription_keyboard, get_upload_menu_keyboard,
+    get_broadcast_jobs_keyboard, get_broadcast_job_keyboard
 )
-from bot_utils import format_stats, format_adhkar_message, load_adhkars_from_file, is_admin, is_owner
+from bot_utils import (
+    format_stats, format_adhkar_message, format_broadcast_job, load_adhkars_from_file, is_admin, is_owner
+)
+from broadcaster import get_broadcast_manager
+from user_context import UserContext
 from loguru import logger
 
 router = Router()
@@ -46,9 +51,9 @@ class VerificationState(StatesGroup):
 # ==========================================
 
 @router.callback_query(F.data == "main_menu")
-async def main_menu(callback: types.CallbackQuery):
+async def main_menu(callback: types.CallbackQuery, user: UserContext):
     """القائمة الرئيسية"""
-    user_role = DatabaseManager.get_user_role(callback.from_user.id)
+    user_role = user.role
     
     text = f"👋 مرحباً {callback.from_user.first_name}\n\nاختر من القائمة:"
     
@@ -75,8 +80,8 @@ async def show_stats(callback: types.CallbackQuery):
             adhkars = load_adhkars_from_file(category.file_path)
             total_adhkars += len(adhkars)
     
-    channels_count = len(DatabaseManager.get_active_channels())
-    users_count = len(DatabaseManager.get_all_users())
+    channels_count = DatabaseManager.count_active_channels()
+    users_count = DatabaseManager.count_users()
     
     text = format_stats(total_adhkars, channels_count, users_count)
     
@@ -207,11 +212,10 @@ async def add_channel(callback: types.CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "delete_channel")
-async def delete_channel(callback: types.CallbackQuery):
+async def delete_channel(callback: types.CallbackQuery, user: UserContext):
     """حذف قناة"""
-    user_id = callback.from_user.id
     # نبدأ دائماً من الصفحة 0 عند فتح القائمة
-    markup = get_delete_channels_keyboard(user_id, page=0)
+    markup = get_delete_channels_keyboard(user, page=0)
     
     await callback.message.edit_text(
         "🗑️ <b>حذف قناة:</b>",
@@ -221,7 +225,7 @@ async def delete_channel(callback: types.CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("del_ch_"))
-async def confirm_delete_channel(callback: types.CallbackQuery):
+async def confirm_delete_channel(callback: types.CallbackQuery, user: UserContext):
     """تأكيد حذف قناة"""
     channel_id = callback.data.split("_")[2]
     
@@ -229,8 +233,7 @@ async def confirm_delete_channel(callback: types.CallbackQuery):
     await callback.answer("✅ تم حذف القناة", show_alert=True)
     
     # إعادة عرض القناة في الصفحة الأولى بعد الحذف
-    user_id = callback.from_user.id
-    markup = get_delete_channels_keyboard(user_id, page=0)
+    markup = get_delete_channels_keyboard(user, page=0)
     
     await callback.message.edit_text(
         "🗑️ <b>حذف قناة:</b>",
@@ -240,15 +243,13 @@ async def confirm_delete_channel(callback: types.CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("channels_page_"))
-async def channels_page_navigate(callback: types.CallbackQuery):
+async def channels_page_navigate(callback: types.CallbackQuery, user: UserContext):
     """التنقل بين صفحات القنوات (التالي/السابق)"""
-    user_id = callback.from_user.id
-    
     # استخراج رقم الصفحة من البيانات
     page = int(callback.data.split("_")[2])
     
     # إعادة بناء الكيبورد بناءً على الصفحة الجديدة
-    markup = get_delete_channels_keyboard(user_id, page)
+    markup = get_delete_channels_keyboard(user, page)
     
     await callback.message.edit_reply_markup(reply_markup=markup)
 
@@ -268,34 +269,75 @@ async def menu_broadcast(callback: types.CallbackQuery):
 
 @router.callback_query(F.data == "ask_broadcast_ch")
 async def ask_broadcast_channels(callback: types.CallbackQuery, state: FSMContext):
-    """طلب نص البث للقنوات"""
+    """طلب رسالة البث للقنوات"""
     await state.set_state(BroadcastState.waiting_for_broadcast_channels)
     
     await callback.message.edit_text(
-        "أرسل نص البث للقنوات:",
+        "أرسل رسالة البث للقنوات (نص، صورة، صوت...):",
         reply_markup=get_cancel_keyboard("menu_broadcast")
     )
 
 
 @router.callback_query(F.data == "ask_broadcast_pm")
 async def ask_broadcast_private(callback: types.CallbackQuery, state: FSMContext):
-    """طلب نص البث للرسائل الخاصة"""
+    """طلب رسالة البث للرسائل الخاصة"""
     await state.set_state(BroadcastState.waiting_for_broadcast_private)
     
     await callback.message.edit_text(
-        "أرسل نص البث للرسائل الخاصة:",
+        "أرسل رسالة البث للرسائل الخاصة (نص، صورة، صوت...):",
         reply_markup=get_cancel_keyboard("menu_broadcast")
     )
 
 
+@router.callback_query(F.data == "broadcast_jobs")
+async def list_broadcast_jobs(callback: types.CallbackQuery, user: UserContext):
+    """عرض آخر مهام البث"""
+    if not is_admin(user.role):
+        await callback.answer("❌ للمشرفين فقط", show_alert=True)
+        return
+    
+    jobs = DatabaseManager.get_broadcast_jobs()
+    
+    await callback.message.edit_text(
+        "📋 مهام البث:" if jobs else "📋 لا توجد مهام بث",
+        reply_markup=get_broadcast_jobs_keyboard(jobs)
+    )
+
+
+@router.callback_query(F.data.startswith("bjob_"))
+async def broadcast_job_action(callback: types.CallbackQuery, user: UserContext):
+    """عرض مهمة بث والتحكم بها (إيقاف مؤقت / استئناف / إلغاء)"""
+    if not is_admin(user.role):
+        await callback.answer("❌ للمشرفين فقط", show_alert=True)
+        return
+    
+    _, action, job_id = callback.data.split("_")
+    job_id = int(job_id)
+    manager = get_broadcast_manager(callback.bot)
+    actions = {"pause": manager.pause, "resume": manager.resume, "cancel": manager.cancel}
+    if action in actions and not await actions[action](job_id):
+        await callback.answer("⚠️ لا يمكن تنفيذ هذا الإجراء على المهمة في حالتها الحالية", show_alert=True)
+    
+    job = DatabaseManager.get_broadcast_job(job_id)
+    if job is None:
+        await callback.answer("❌ المهمة غير موجودة", show_alert=True)
+        return
+    
+    await callback.message.edit_text(
+        format_broadcast_job(job),
+        reply_markup=get_broadcast_job_keyboard(job.id, job.status),
+        parse_mode="HTML"
+    )
+
+
 # ==========================================
 # --- معالجات المشرفين ---
 # ==========================================
 
 @router.callback_query(F.data == "menu_admins")
-async def menu_admins(callback: types.CallbackQuery):
+async def menu_admins(callback: types.CallbackQuery, user: UserContext):
     """قائمة إدارة المشرفين"""
-    user_role = DatabaseManager.get_user_role(callback.from_user.id)
+    user_role = user.role
     
     if not is_owner(user_role):
         await callback.answer("❌ للمالك فقط", show_alert=True)
@@ -320,9 +362,9 @@ async def add_admin(callback: types.CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "delete_admin")
-async def delete_admin(callback: types.CallbackQuery):
+async def delete_admin(callback: types.CallbackQuery, user: UserContext):
     """حذف مشرف"""
-    user_role = DatabaseManager.get_user_role(callback.from_user.id)
+    user_role = user.role
     
     if not is_owner(user_role):
         await callback.answer("❌ للمالك فقط", show_alert=True)
@@ -335,9 +377,9 @@ async def delete_admin(callback: types.CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("del_ad_"))
-async def confirm_delete_admin(callback: types.CallbackQuery):
+async def confirm_delete_admin(callback: types.CallbackQuery, user: UserContext):
     """تأكيد حذف مشرف"""
-    user_role = DatabaseManager.get_user_role(callback.from_user.id)
+    user_role = user.role
     
     if not is_owner(user_role):
         await callback.answer("❌ للمالك فقط", show_alert=True)
@@ -379,9 +421,9 @@ async def list_admins(callback: types.CallbackQuery):
 # ==========================================
 
 @router.callback_query(F.data == "menu_verification")
-async def menu_verification(callback: types.CallbackQuery):
+async def menu_verification(callback: types.CallbackQuery, user: UserContext):
     """قائمة قناة التحقق"""
-    user_role = DatabaseManager.get_user_role(callback.from_user.id)
+    user_role = user.role
     
     if not is_owner(user_role):
         await callback.answer("❌ للمطور فقط", show_alert=True)
@@ -428,20 +470,7 @@ async def remove_verification_channel(callback: types.CallbackQuery):
 @router.callback_query(F.data == "menu_upload")
 async def menu_upload(callback: types.CallbackQuery):
     """قائمة رفع الملفات"""
-    from keyboards import InlineKeyboardMarkup, InlineKeyboardButton
-    
-    markup = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="☀️ صباح", callback_data="upload_sabah"),
-            InlineKeyboardButton(text="🌙 مساء", callback_data="upload_masaa"),
-            InlineKeyboardButton(text="📖 عام", callback_data="upload_aam")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 رجوع", callback_data="main_menu")
-        ]
-    ])
-    
     await callback.message.edit_text(
         "اختر الفئة:",
-        reply_markup=markup
+        reply_markup=get_upload_menu_keyboard()
     )
\ No newline at end of file
@@ -0,0 +1,236 @@
+"""
+جدولة النشر لكل قناة باستخدام عجلة توقيت
+كل (قناة، فئة) مؤقت مستقل بفاصله ونافذته الزمنية، مع إزاحة ثابتة (phase) لكل منهما،
+حتى تتوزع المنشورات بالتساوي على الفاصل الزمني بدلاً من إرسالها لكل القنوات في نفس اللحظة.
+
+النوافذ الزمنية تُحسب بالمنطقة الزمنية للقناة أو الفئة (مع مراعاة التوقيت الصيفي)،
+وموعد النشر التالي يُحسب مسبقاً بتوقيت UTC ويُحفظ في next_fire_at، ويُقرأ مع خطة الجدولة في reload()
+فيبقى الجدول صحيحاً بعد إعادة التشغيل دون إعادة حساب النوافذ.
+"""
+
+import time
+import zlib
+from datetime import datetime, timedelta, tzinfo
+from typing import Dict, List, Optional
+from batch_writer import BatchWriter
+from bot_utils import get_zone
+from config import PerformanceConfig
+from database import DatabaseManager
+from timing_wheel import TimingWheel
+from loguru import logger
+
+DAY_MINUTES = 24 * 60
+EPOCH = datetime(1970, 1, 1)
+
+
+def _to_timestamp(value: Optional[datetime]) -> Optional[float]:
+    """وقت UTC مخزن في قاعدة البيانات (بدون منطقة) -> ثوانٍ منذ epoch"""
+    return (value - EPOCH).total_seconds() if value else None
+
+
+def _to_utc(ts: float) -> datetime:
+    """ثوانٍ منذ epoch -> وقت UTC بدون منطقة (صيغة التخزين)"""
+    return EPOCH + timedelta(seconds=ts)
+
+
+def _parse_minutes(value: Optional[str]) -> Optional[int]:
+    """تحويل HH:MM إلى دقائق منذ منتصف الليل"""
+    if not value:
+        return None
+    try:
+        hours, minutes = value.split(":")
+        return int(hours) * 60 + int(minutes)
+    except ValueError:
+        logger.error(f"❌ صيغة وقت خاطئة: {value}")
+        return None
+
+
+class ScheduleEntry:
+    """جدول فئة في قناة بعد دمج إعدادات الفئة مع تعديلات القناة"""
+    __slots__ = ("channel_id", "category", "interval", "start", "end", "tz", "phase")
+    
+    def __init__(self, channel_id: str, category: str, interval_minutes: int,
+                 start_time: Optional[str] = None, end_time: Optional[str] = None,
+                 tz: Optional[tzinfo] = None):
+        self.channel_id = channel_id
+        self.category = category
+        self.interval = max(1, int(interval_minutes or 60)) * 60
+        # None = منطقة الخادم
+        self.tz = tz
+        self.start = _parse_minutes(start_time)
+        self.end = _parse_minutes(end_time)
+        if self.start is None or self.end is None:
+            self.start = self.end = None
+        # إزاحة ثابتة لكل (قناة، فئة) داخل الفاصل الزمني
+        self.phase = zlib.crc32(f"{channel_id}:{category}".encode()) % self.interval
+    
+    def same_as(self, other: "ScheduleEntry") -> bool:
+        return (self.interval, self.start, self.end, self.tz) == (other.interval, other.start, other.end, other.tz)
+    
+    # ==================== النافذة الزمنية ====================
+    
+    def in_window(self, ts: float) -> bool:
+        if self.start is None:
+            return True
+        local = datetime.fromtimestamp(ts, self.tz)
+        minute = local.hour * 60 + local.minute
+        if self.start < self.end:
+            return self.start <= minute < self.end
+        # نافذة تعبر منتصف الليل (مثل 22:00 إلى 06:00)
+        return minute >= self.start or minute < self.end
+    
+    def fit(self, ts: float) -> float:
+        """
+        أقرب وقت نشر مسموح به بدءاً من ts (بداية النافذة التالية + الإزاحة)
+        الجمع يتم على الساعة المحلية، فتبقى بداية النافذة ثابتة عند تغيير التوقيت الصيفي
+        """
+        if self.in_window(ts):
+            return ts
+        local = datetime.fromtimestamp(ts, self.tz)
+        start = local.replace(hour=self.start // 60, minute=self.start % 60, second=0, microsecond=0)
+        if start <= local:
+            start += timedelta(days=1)
+        window = ((self.end - self.start) % DAY_MINUTES or DAY_MINUTES) * 60
+        return start.timestamp() + self.phase % min(self.interval, window)
+    
+    def first_fire(self, now: float, last_posted: Optional[float], catchup_window: float,
+                   next_fire: Optional[float] = None) -> float:
+        """وقت النشر الأول عند بناء الجدول (الموعد المحسوب مسبقاً إن وُجد)"""
+        if next_fire is not None:
+            fire_at = next_fire
+        elif last_posted is not None:
+            fire_at = last_posted + self.interval
+        else:
+            fire_at = now + self.phase
+        if fire_at < now:
+            # منشورات متأخرة (بعد توقف البوت): توزيعها على فترة قصيرة بدلاً من إرسالها دفعة واحدة
+            fire_at = now + self.phase % catchup_window
+        return self.fit(fire_at)
+
+
+class ChannelScheduler:
+    """مؤقتات النشر لكل القنوات في عجلة توقيت واحدة"""
+    
+    def __init__(
+        self,
+        tick: float = PerformanceConfig.SCHEDULER_TICK,
+        catchup_window: float = PerformanceConfig.SCHEDULER_CATCHUP_WINDOW
+    ):
+        self.tick = tick
+        self.catchup_window = catchup_window
+        self.wheel = TimingWheel(tick=tick)
+        self.entries: Dict[tuple, ScheduleEntry] = {}
+        # اسم الفئة -> مسار ملف الأذكار
+        self.categories: Dict[str, str] = {}
+        self.dirty = True
+        self._writer = BatchWriter(DatabaseManager.save_channel_post_times, "channel_schedules", flush_interval=5.0)
+        for topic in ("channels", "categories", "schedules"):
+            DatabaseManager.on_change(topic, self.invalidate)
+    
+    def __len__(self) -> int:
+        return len(self.wheel)
+    
+    def invalidate(self):
+        """إعادة بناء الجدول قبل النبضة التالية"""
+        self.dirty = True
+    
+    # ==================== بناء الجدول ====================
+    
+    def reload(self, now: float = None):
+        """
+        بناء/تحديث المؤقتات من قاعدة البيانات (يُستدعى في خيط منفصل)
+        المؤقتات التي لم يتغير جدولها تبقى كما هي حتى لا تتغير مواعيدها
+        """
+        self.dirty = False
+        now = time.time() if now is None else now
+        categories = DatabaseManager.get_categories()
+        channel_ids, rows = DatabaseManager.get_schedule_plan()
+        overrides = {(row["channel_id"], row["category_name"]): row for row in rows}
+        
+        entries = {}
+        for category in categories:
+            if not category.is_enabled:
+                continue
+            name = category.category_name
+            # فئة "العام" بدون نافذة زمنية إلا إذا حددتها القناة
+            start_time = category.start_time if name != "aam" else None
+            end_time = category.end_time if name != "aam" else None
+            category_tz = get_zone(category.timezone)
+            for channel_id in channel_ids:
+                key = (channel_id, name)
+                row = overrides.get(key)
+                if row is None:
+                    entries[key] = ScheduleEntry(
+                        channel_id, name, category.interval_minutes, start_time, end_time, category_tz
+                    )
+                    continue
+                if row["is_enabled"] is False:
+                    continue
+                entries[key] = ScheduleEntry(
+                    channel_id, name,
+                    row["interval_minutes"] or category.interval_minutes,
+                    row["start_time"] or start_time,
+                    row["end_time"] or end_time,
+                    get_zone(row["timezone"]) if row["timezone"] else category_tz
+                )
+        
+        for key in self.entries.keys() - entries.keys():
+            self.wheel.cancel(key)
+        scheduled = 0
+        for key, entry in entries.items():
+            previous = self.entries.get(key)
+            if previous is not None and key in self.wheel and previous.same_as(entry):
+                continue
+            row = overrides.get(key)
+            pending = self._writer.peek(key)
+            if pending:
+                posted_at, next_fire_at = pending[2], pending[3]
+            elif row is not None:
+                posted_at, next_fire_at = row["last_posted_at"], row["next_fire_at"]
+            else:
+                posted_at = next_fire_at = None
+            # الموعد المحفوظ صالح فقط إذا لم يتغير الجدول منذ حسابه
+            if previous is not None:
+                next_fire_at = None
+            self.wheel.schedule(key, entry.first_fire(
+                now, _to_timestamp(posted_at), self.catchup_window, _to_timestamp(next_fire_at)
+            ))
+            scheduled += 1
+        
+        self.entries = entries
+        self.categories = {category.category_name: category.file_path for category in categories}
+        logger.info(f"🗓️ جدول النشر: {len(entries)} مؤقت ({scheduled} جديد أو معدل)")
+    
+    # ==================== المنشورات المستحقة ====================
+    
+    def pop_due(self, now: float = None) -> Dict[str, List[str]]:
+        """المنشورات المستحقة الآن مجمعة حسب الفئة {فئة: [معرفات القنوات]}، مع جدولة الموعد التالي"""
+        now = time.time() if now is None else now
+        batches = {}
+        posted_at = datetime.utcfromtimestamp(now)
+        for key, _ in self.wheel.advance(now):
+            entry = self.entries.get(key)
+            if entry is None:
+                continue
+            if not entry.in_window(now):
+                self.wheel.schedule(key, entry.fit(now))
+                continue
+            batches.setdefault(entry.category, []).append(entry.channel_id)
+            next_fire = entry.fit(now + entry.interval)
+            self.wheel.schedule(key, next_fire)
+            self._writer.put(key, (entry.channel_id, entry.category, posted_at, _to_utc(next_fire)))
+        return batches
+    
+    def defer(self, category: str, channel_ids: list, now: float = None) -> int:
+        """
+        إعادة منشورات لم يكتمل إرسالها (عند الإيقاف) حتى تُرسل بعد إعادة التشغيل
+        تُحفظ مستحقة الآن مع إبقاء آخر وقت نشر، فتُوزع ضمن نافذة اللحاق عند بناء الجدول
+        """
+        now_utc = _to_utc(time.time() if now is None else now)
+        for channel_id in channel_ids:
+            self._writer.put((channel_id, category), (channel_id, category, None, now_utc))
+        return len(channel_ids)
+    
+    async def close(self):
+        """كتابة أوقات النشر المعلقة"""
+        await self._writer.close()
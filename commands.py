@@ -2,29 +2,22 @@
 معالجات الأوامر (Commands)
 """
 
+import html
 from aiogram import Router, types, F
 from aiogram.filters import Command
 from database import DatabaseManager
 from keyboards import get_main_keyboard
+from user_context import UserContext
 from loguru import logger
 
 router = Router()
 
 
 @router.message(Command("start"))
-async def cmd_start(message: types.Message):
-    """معالج أمر /start"""
-    user_id = message.from_user.id
-    first_name = message.from_user.first_name
-    username = message.from_user.username
-    
-    # إضافة المستخدم إلى قاعدة البيانات
-    user = DatabaseManager.add_user(user_id, first_name, username)
-    
-    user_role = user.role
-    
+async def cmd_start(message: types.Message, user: UserContext):
+    """معالج أمر /start (المستخدم مسجل مسبقاً عبر وسيط سياق المستخدم)"""
     welcome_text = (
-        f"👋 مرحباً {first_name}!\n\n"
+        f"👋 مرحباً {user.first_name}!\n\n"
         f"🤖 أنا بوت الأذكار الإسلامية\n\n"
         f"✨ يمكنني نشر الأذكار تلقائياً في قنواتك\n\n"
         f"📖 اختر من القائمة أدناه للبدء:"
@@ -32,10 +25,11 @@ async def cmd_start(message: types.Message):
     
     await message.reply(
         welcome_text,
-        reply_markup=get_main_keyboard(user_role)
+        reply_markup=get_main_keyboard(user.role)
     )
     
-    logger.info(f"✅ مستخدم جديد: {user_id} ({first_name})")
+    if user.is_new:
+        logger.info(f"✅ مستخدم جديد: {user.user_id} ({user.first_name})")
 
 
 @router.message(Command("help"))
@@ -79,8 +73,8 @@ async def cmd_stats(message: types.Message):
             adhkars = load_adhkars_from_file(category.file_path)
             total_adhkars += len(adhkars)
     
-    channels_count = len(DatabaseManager.get_active_channels())
-    users_count = len(DatabaseManager.get_all_users())
+    channels_count = DatabaseManager.count_active_channels()
+    users_count = DatabaseManager.count_users()
     
     text = format_stats(total_adhkars, channels_count, users_count)
     
@@ -88,9 +82,9 @@ async def cmd_stats(message: types.Message):
 
 
 @router.message(Command("admin"))
-async def cmd_admin(message: types.Message):
+async def cmd_admin(message: types.Message, user: UserContext):
     """معالج أمر /admin - للمشرفين فقط"""
-    user_role = DatabaseManager.get_user_role(message.from_user.id)
+    user_role = user.role
     
     if user_role not in ["admin", "owner"]:
         await message.reply("❌ هذا الأمر للمشرفين فقط.")
@@ -113,9 +107,9 @@ async def cmd_admin(message: types.Message):
 
 
 @router.message(Command("owner"))
-async def cmd_owner(message: types.Message):
+async def cmd_owner(message: types.Message, user: UserContext):
     """معالج أمر /owner - للمالك فقط"""
-    user_role = DatabaseManager.get_user_role(message.from_user.id)
+    user_role = user.role
     
     if user_role != "owner":
         await message.reply("❌ هذا الأمر للمالك فقط.")
@@ -138,9 +132,9 @@ async def cmd_owner(message: types.Message):
 
 
 @router.message(Command("list_channels"))
-async def cmd_list_channels(message: types.Message):
+async def cmd_list_channels(message: types.Message, user: UserContext):
     """عرض قائمة القنوات"""
-    user_role = DatabaseManager.get_user_role(message.from_user.id)
+    user_role = user.role
     
     if user_role not in ["admin", "owner"]:
         await message.reply("❌ هذا الأمر للمشرفين فقط.")
@@ -160,9 +154,9 @@ async def cmd_list_channels(message: types.Message):
 
 
 @router.message(Command("list_admins"))
-async def cmd_list_admins(message: types.Message):
+async def cmd_list_admins(message: types.Message, user: UserContext):
     """عرض قائمة المشرفين"""
-    user_role = DatabaseManager.get_user_role(message.from_user.id)
+    user_role = user.role
     
     if user_role not in ["admin", "owner"]:
         await message.reply("❌ هذا الأمر للمشرفين فقط.")
@@ -180,3 +174,57 @@ async def cmd_list_admins(message: types.Message):
         text += f"{role_emoji} {admin.first_name} (ID: {admin.user_id})\n"
     
     await message.reply(text, parse_mode="HTML")
+
+
+@router.message(Command("rebalance_bots"))
+async def cmd_rebalance_bots(message: types.Message, user: UserContext):
+    """إعادة توزيع القنوات على بوتات النشر المشرفة فيها - للمالك فقط"""
+    from bot_pool import get_bot_pool
+    
+    if user.role != "owner":
+        await message.reply("❌ هذا الأمر للمالك فقط.")
+        return
+    
+    bot_pool = get_bot_pool(message.bot)
+    if not bot_pool.enabled:
+        await message.reply("ℹ️ لا توجد بوتات نشر إضافية (BOT_POOL_TOKENS غير محدد).")
+        return
+    
+    chat_id = message.chat.id
+    
+    async def notify(loads):
+        if loads is None:
+            await message.bot.send_message(chat_id, "❌ فشلت إعادة توزيع القنوات، راجع السجلات.")
+            return
+        text = "🤖 <b>توزيع القنوات على البوتات:</b>\n\n"
+        for index, count in sorted(loads.items()):
+            text += f"{'الرئيسي' if index == 0 else f'بوت #{index}'}: {count} قناة\n"
+        await message.bot.send_message(chat_id, text, parse_mode="HTML")
+    
+    # الفحص بمعدل محدود قد يستغرق دقائق، فيعمل في الخلفية ويُرسل النتيجة عند انتهائه
+    if not bot_pool.start_rebalance(notify):
+        await message.reply("⏳ إعادة التوزيع جارية بالفعل، ستصلك النتيجة عند انتهائها.")
+        return
+    await message.reply("⏳ بدأ فحص القنوات وإعادة توزيعها على البوتات، ستصلك النتيجة عند الانتهاء.")
+
+
+@router.message(Command("slowlog"))
+async def cmd_slowlog(message: types.Message, user: UserContext):
+    """عرض سجل البطء (الاستعلامات والمعالجات وحجب الحلقة) - للمالك فقط"""
+    from diagnostics import slow_log
+    
+    user_role = user.role
+    
+    if user_role != "owner":
+        await message.reply("❌ هذا الأمر للمالك فقط.")
+        return
+    
+    text = slow_log.dump()
+    
+    if len(text) <= 3500:
+        await message.reply(f"<pre>{html.escape(text)}</pre>", parse_mode="HTML")
+    else:
+        await message.reply_document(
+            types.BufferedInputFile(text.encode("utf-8"), filename="slowlog.txt"),
+            caption="🐢 سجل البطء"
+        )
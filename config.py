@@ -33,6 +33,51 @@ class BotConfig:
     
     # وصف البوت
     BOT_DESCRIPTION = "بوت متطور لنشر الأذكار الإسلامية تلقائياً"
+    
+    # خادم Bot API بديل (مثل خادم محلي أو خادم الاختبار الوهمي)
+    API_SERVER = os.getenv('TELEGRAM_API_SERVER', '')
+    
+    # بوتات نشر إضافية (اختياري، مفصولة بفواصل): كل بوت مشرف في مجموعة من القنوات وله حده الخاص
+    POOL_TOKENS = [token.strip() for token in os.getenv('BOT_POOL_TOKENS', '').split(',') if token.strip()]
+    
+    # مسارا طلبات Bot API: التفاعلي (الردود والأزرار) والجماعي (النشر والبث والفحص الدوري)
+    # الحد الكلي لطلبات البوت في الثانية (0 = بدون حد)، والحصة المحجوزة منه للمسار التفاعلي
+    API_RATE_LIMIT = float(os.getenv('API_RATE_LIMIT', '30'))
+    INTERACTIVE_RATE_SHARE = float(os.getenv('INTERACTIVE_RATE_SHARE', '0.3'))
+    
+    # عدد الاتصالات المتزامنة لكل مسار (مجمع اتصالات منفصل)
+    INTERACTIVE_CONNECTIONS = int(os.getenv('INTERACTIVE_CONNECTIONS', '20'))
+    BULK_CONNECTIONS = int(os.getenv('BULK_CONNECTIONS', '80'))
+
+
+# ==========================================
+# --- إعدادات استقبال التحديثات (Webhook) ---
+# ==========================================
+
+class WebhookConfig:
+    """إعدادات وضع الـ Webhook"""
+    
+    # وضع الاستقبال: polling أو webhook
+    MODE = os.getenv('BOT_MODE', 'polling').lower()
+    
+    # العنوان العام الذي يرسل إليه تيليجرام التحديثات (https://example.com)
+    BASE_URL = os.getenv('WEBHOOK_URL', '')
+    
+    # مسار الـ Webhook
+    PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+    
+    # الرمز السري للتحقق من أن الطلب قادم من تيليجرام (مطلوب في وضع webhook: 1-256 حرفاً من A-Z a-z 0-9 _ -)
+    SECRET = os.getenv('WEBHOOK_SECRET', '')
+    
+    # عنوان ومنفذ الخادم المحلي
+    HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+    PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+    
+    # الحد الأقصى لطابور التحديثات المنتظرة
+    QUEUE_SIZE = 1000
+    
+    # عدد المعالجات المتزامنة للطابور
+    WORKERS = 16
 
 
 # ==========================================
@@ -75,6 +120,53 @@ class LogConfig:
     
     # عدد ملفات السجل المحفوظة
     LOG_BACKUP_COUNT = 5
+    
+    # كتابة ملف السجل بصيغة JSON منظمة (سطر لكل سجل)
+    LOG_JSON = os.getenv('LOG_JSON', 'True').lower() == 'true'
+    
+    # أقل فاصل بين سجلين متكررين لنفس الحدث (ثانية)
+    LOG_THROTTLE_INTERVAL = 60
+
+
+# ==========================================
+# --- إعدادات المقاييس (Metrics) ---
+# ==========================================
+
+class MetricsConfig:
+    """إعدادات خادم المقاييس"""
+    
+    # تفعيل المقاييس
+    ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    
+    # عنوان ومنفذ خادم المقاييس (محلي فقط)
+    HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    PORT = int(os.getenv('METRICS_PORT', '9100'))
+
+
+# ==========================================
+# --- إعدادات التشخيص (الاستعلامات والمعالجات البطيئة) ---
+# ==========================================
+
+class DiagnosticsConfig:
+    """إعدادات رصد البطء"""
+    
+    # تفعيل رصد البطء
+    ENABLED = os.getenv('DIAGNOSTICS_ENABLED', 'True').lower() == 'true'
+    
+    # حد الاستعلام البطيء (ميلي ثانية)
+    SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', '100'))
+    
+    # حد المعالج البطيء (ميلي ثانية)
+    SLOW_HANDLER_MS = int(os.getenv('SLOW_HANDLER_MS', '500'))
+    
+    # حد حجب حلقة الأحداث (ميلي ثانية)
+    LOOP_LAG_MS = int(os.getenv('LOOP_LAG_MS', '200'))
+    
+    # نسبة الأحداث البطيئة التي يتم تسجيلها بالتفصيل (0 - 1)
+    SAMPLE_RATE = float(os.getenv('DIAGNOSTICS_SAMPLE_RATE', '1.0'))
+    
+    # عدد السجلات المحفوظة في الذاكرة
+    RING_SIZE = 200
 
 
 # ==========================================
@@ -120,6 +212,26 @@ class AdhkarConfig:
     
     # فترة التحقق من النشر (ثواني)
     CHECK_INTERVAL = 30
+    
+    # المنطقة الزمنية الافتراضية لنوافذ النشر (مثل Asia/Riyadh، فارغ = منطقة الخادم)
+    DEFAULT_TIMEZONE = os.getenv('DEFAULT_TIMEZONE', '')
+    
+    # البحث المضمن (@bot نص): عدد النتائج في كل صفحة (الحد الأقصى لتيليجرام 50)
+    INLINE_RESULTS_PER_PAGE = 20
+    
+    # مدة احتفاظ تيليجرام بنتائج الاستعلام (ثانية) - النتائج واحدة لكل المستخدمين
+    INLINE_CACHE_TIME = int(os.getenv('INLINE_CACHE_TIME', '300'))
+    
+    # عدد صفحات النتائج المحفوظة في الذاكرة، وما يُحسب مسبقاً عند بناء الفهرس:
+    # الكلمات الأكثر شيوعاً وكل البادئات حتى هذا الطول (أول ما يكتبه المستخدم وأكثرها نتائج)
+    INLINE_RESULT_CACHE_SIZE = 2048
+    INLINE_PRECOMPUTE_WORDS = 200
+    INLINE_PRECOMPUTE_PREFIX_LENGTH = 2
+    
+    # عند عدم وجود تطابق (أخطاء الكتابة): عدد الكلمات المرشحة بالمقاطع الثلاثية لكل كلمة في الاستعلام،
+    # وأدنى نسبة تشابه حرفي بين كلمة الاستعلام والكلمة المرشحة
+    INLINE_FUZZY_CANDIDATES = 64
+    INLINE_MIN_SIMILARITY = 0.75
 
 
 # ==========================================
@@ -132,11 +244,17 @@ class BroadcastConfig:
     # التأخير بين الرسائل (ثانية)
     MESSAGE_DELAY = 0.3
     
-    # عدد محاولات الإرسال
+    # عدد إعادة محاولات مهمة البث بعد خطأ غير متوقع قبل إيقافها مؤقتاً وإبلاغ منشئها
     RETRY_COUNT = 3
     
-    # التأخير بين المحاولات (ثانية)
+    # التأخير قبل أول إعادة محاولة (ثانية، ويتضاعف مع كل محاولة)
     RETRY_DELAY = 5
+    
+    # الحد الأقصى لعمليات النسخ المتزامنة أثناء البث
+    MAX_CONCURRENT = 20
+    
+    # حفظ تقدم مهمة البث كل N رسالة (الحد الأقصى لما قد يُعاد إرساله بعد انقطاع)
+    CHECKPOINT_EVERY = 100
 
 
 # ==========================================
@@ -149,6 +267,13 @@ class SecurityConfig:
     # تفعيل التحقق من الاشتراك
     ENABLE_SUBSCRIPTION_CHECK = True
     
+    # مدة تخزين نتيجة التحقق من الاشتراك (ثانية): مشترك / غير مشترك
+    SUBSCRIPTION_POSITIVE_TTL = 600
+    SUBSCRIPTION_NEGATIVE_TTL = 30
+    
+    # مدة تخزين قناة التحقق نفسها (ثانية)
+    SUBSCRIPTION_CHANNEL_TTL = 60
+    
     # تفعيل معدل التحديث (Rate Limiting)
     ENABLE_RATE_LIMITING = True
     
@@ -186,17 +311,82 @@ class UIConfig:
 class PerformanceConfig:
     """إعدادات الأداء"""
     
-    # عدد العمال المتزامنين
-    WORKER_COUNT = 4
+    # عدد عمليات النشر المتوازية (1 = النشر داخل العملية الرئيسية)
+    WORKER_COUNT = int(os.getenv('WORKER_COUNT', '4'))
+    
+    # الحد الأدنى لعدد القنوات لتوزيع النشر على العمليات
+    SHARDING_MIN_CHANNELS = int(os.getenv('SHARDING_MIN_CHANNELS', '1000'))
+    
+    # المهلة القصوى لانتظار نتيجة عامل نشر (ثانية)
+    WORKER_JOB_TIMEOUT = 900
     
     # حجم الذاكرة المؤقتة
     CACHE_SIZE = 1000
     
+    # عدد المستخدمين المحفوظين في ذاكرة سياق المستخدم (الدور يُقرأ من الذاكرة لكل تحديث)
+    USER_CONTEXT_CACHE_SIZE = 10000
+    
+    # عدد الصفوف المجلوبة في كل دفعة عند المرور على الجداول الكبيرة (iter_users / iter_channels)
+    STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', '1000'))
+    
     # مدة الذاكرة المؤقتة (ثانية)
     CACHE_TTL = 3600
     
     # تفعيل ضغط البيانات
     ENABLE_COMPRESSION = True
+    
+    # مدة صلاحية حالات المحادثة المهجورة (ثانية)
+    FSM_STATE_TTL = 24 * 3600
+    
+    # الفاصل الزمني لكتابة حالات المحادثة على دفعات (ثانية)
+    FSM_FLUSH_INTERVAL = 1.0
+    
+    # دقة عجلة توقيت النشر (ثانية)
+    SCHEDULER_TICK = 1.0
+    
+    # المدة التي تُوزع عليها المنشورات المتأخرة بعد إعادة التشغيل (ثانية)
+    SCHEDULER_CATCHUP_WINDOW = 300
+    
+    # سجل الإرسال: مدة الاحتفاظ بالسجلات التفصيلية (يوم) قبل ضغطها في ملخص يومي
+    DELIVERY_RETENTION_DAYS = int(os.getenv('DELIVERY_RETENTION_DAYS', '30'))
+    
+    # مدة الاحتفاظ بالملخصات اليومية (يوم)
+    DELIVERY_STATS_RETENTION_DAYS = 365
+    
+    # الفاصل بين عمليات ضغط السجل (ثانية) - مرة يومياً، وأول مرة بعد بدء التشغيل مباشرة
+    DELIVERY_COMPACT_INTERVAL = 86400
+    
+    # نافذة عدم التكرار (ساعة): لا يُختار ذكر أُرسل بنجاح لنفس القنوات خلالها ما دام غيره متاحاً (0 = تعطيل)
+    DELIVERY_NO_REPEAT_HOURS = int(os.getenv('DELIVERY_NO_REPEAT_HOURS', '24'))
+    
+    # عدد القنوات التي يُفحص سجلها لنافذة عدم التكرار (القنوات المستحقة معاً تتلقى نفس الأذكار غالباً)
+    DELIVERY_NO_REPEAT_SAMPLE = 200
+    
+    # الفاصل الزمني لكتابة سجلات الإرسال على دفعات (ثانية)
+    DELIVERY_FLUSH_INTERVAL = 2.0
+    
+    # عدد القنوات التي يُحاول رفع ملف الوسائط إليها قبل اعتباره غير متاح
+    MEDIA_UPLOAD_ATTEMPTS = 3
+    
+    # مطابقة حالة القنوات (احتياطية، فالأحداث my_chat_member تحدّثها فوراً):
+    # الفاصل بين الدورات، وعمر آخر حدث قبل فحص القناة (ثانية)، ومعدل الفحص (طلب/ثانية)
+    CHANNEL_RECONCILE_INTERVAL = 6 * 3600
+    CHANNEL_RECONCILE_STALE_AFTER = 7 * 24 * 3600
+    CHANNEL_RECONCILE_RATE = 5
+
+
+# ==========================================
+# --- إعدادات الإيقاف ---
+# ==========================================
+
+class ShutdownConfig:
+    """إعدادات الإيقاف المنظم"""
+    
+    # المهلة الكاملة للإيقاف (ثانية) - أقل من مهلة مدير العمليات قبل SIGKILL (Docker: 10)
+    DEADLINE = float(os.getenv('SHUTDOWN_DEADLINE', '8'))
+    
+    # الوقت المحجوز من المهلة لكتابة الطوابير والإغلاق (لا يستهلكه انتظار الإرسال الجاري)
+    FLUSH_RESERVE = float(os.getenv('SHUTDOWN_FLUSH_RESERVE', '3'))
 
 
 # ==========================================
@@ -224,12 +414,16 @@ def get_config():
     """الحصول على جميع الإعدادات"""
     return {
         'bot': BotConfig,
+        'webhook': WebhookConfig,
         'database': DatabaseConfig,
         'log': LogConfig,
+        'metrics': MetricsConfig,
+        'diagnostics': DiagnosticsConfig,
         'adhkar': AdhkarConfig,
         'broadcast': BroadcastConfig,
         'security': SecurityConfig,
         'ui': UIConfig,
         'performance': PerformanceConfig,
+        'shutdown': ShutdownConfig,
         'development': DevelopmentConfig,
     }
@@ -5,24 +5,58 @@
 
 import os
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Text, Float
+from sqlalchemy import (
+    create_engine, event, bindparam, case, func, insert, update, Column, Integer, String, Boolean, DateTime,
+    Text, Float, Index, UniqueConstraint, select
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
+from config import PerformanceConfig
 from loguru import logger
 
 # إعداد قاعدة البيانات
-DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///adhkar_bot.db')
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine,
-    expire_on_commit=False
-)
-#engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}) # تم ازالة التكرار
+# المحرك والجلسات تُنشأ عند أول استخدام فقط (وليس عند الاستيراد) لتسريع الإقلاع
+_engine = None
+_session_factory = None
 Base = declarative_base()
 
+# دوال تُستدعى عند تغيير البيانات (لإبطال الذاكرة المؤقتة): الموضوع -> قائمة دوال
+_change_listeners = {}
+
+
+def get_engine():
+    """الحصول على محرك قاعدة البيانات (يُنشأ عند أول طلب)"""
+    global _engine, _session_factory
+    if _engine is None:
+        database_url = os.getenv('DATABASE_URL', 'sqlite:///adhkar_bot.db')
+        _engine = create_engine(database_url, connect_args={"check_same_thread": False})
+        if _engine.dialect.name == "sqlite":
+            event.listen(_engine, "connect", _set_sqlite_pragmas)
+        _session_factory = sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=_engine,
+            expire_on_commit=False
+        )
+    return _engine
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """وضع WAL يسمح بالقراءة أثناء الكتابة الدفعية في الخلفية"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def SessionLocal() -> Session:
+    """إنشاء جلسة جديدة على المحرك الكسول"""
+    if _session_factory is None:
+        get_engine()
+    return _session_factory()
+
 
 # ==========================================
 # --- نماذج قاعدة البيانات (Models) ---
@@ -31,6 +65,8 @@ Base = declarative_base()
 class User(Base):
     """نموذج المستخدم"""
     __tablename__ = "users"
+    # مسح المستخدمين القابلين للوصول بترتيب user_id (مؤشر البث)
+    __table_args__ = (Index("ix_users_reachable_user_id", "is_reachable", "user_id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, unique=True, index=True)
@@ -38,6 +74,7 @@ class User(Base):
     username = Column(String(100), nullable=True)
     role = Column(String(20), default="user")  # user, admin, owner
     is_subscribed = Column(Boolean, default=False)
+    is_reachable = Column(Boolean, default=True)  # False بعد حظر البوت أو حذف الحساب
     joined_at = Column(DateTime, default=datetime.utcnow)
     last_interaction = Column(DateTime, default=datetime.utcnow)
 
@@ -45,6 +82,8 @@ class User(Base):
 class Channel(Base):
     """نموذج القناة"""
     __tablename__ = "channels"
+    # مسح القنوات النشطة بترتيب id (النشر ومؤشر البث)
+    __table_args__ = (Index("ix_channels_active_id", "is_active", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     channel_id = Column(String(50), unique=True, index=True)
@@ -52,6 +91,12 @@ class Channel(Base):
     added_by = Column(Integer)  # user_id من أضاف القناة
     added_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
+    # حالة البوت في القناة من أحداث my_chat_member أو فحص المطابقة
+    bot_status = Column(String(20), nullable=True)
+    is_bot_admin = Column(Boolean, default=True)
+    status_checked_at = Column(DateTime, nullable=True, index=True)  # UTC
+    # البوت المسؤول عن النشر في القناة: 0 = الرئيسي، ثم بوتات BOT_POOL_TOKENS بالترتيب
+    bot_index = Column(Integer, default=0)
 
 
 class AdhkarCategory(Base):
@@ -66,6 +111,24 @@ class AdhkarCategory(Base):
     interval_minutes = Column(Integer, default=60)
     last_posted_at = Column(DateTime, nullable=True)
     file_path = Column(String(255))
+    timezone = Column(String(64), nullable=True)  # مثل Asia/Riyadh (فارغ = المنطقة الافتراضية)
+
+
+class ChannelSchedule(Base):
+    """جدول نشر فئة معينة في قناة (القيم الفارغة تعني استخدام إعدادات الفئة)"""
+    __tablename__ = "channel_schedules"
+    __table_args__ = (UniqueConstraint("channel_id", "category_name"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    channel_id = Column(String(50), index=True)
+    category_name = Column(String(50))
+    is_enabled = Column(Boolean, default=True)
+    interval_minutes = Column(Integer, nullable=True)
+    start_time = Column(String(5), nullable=True)  # HH:MM
+    end_time = Column(String(5), nullable=True)    # HH:MM
+    timezone = Column(String(64), nullable=True)
+    last_posted_at = Column(DateTime, nullable=True)  # UTC
+    next_fire_at = Column(DateTime, nullable=True)  # UTC، محسوب مسبقاً
 
 
 class Adhkar(Base):
@@ -88,13 +151,153 @@ class BotConfig(Base):
     updated_at = Column(DateTime, default=datetime.utcnow)
 
 
+class Delivery(Base):
+    """سجل إرسال (إلحاقي فقط): أي ذكر أُرسل لأي قناة ومتى وبأي نتيجة"""
+    __tablename__ = "deliveries"
+    __table_args__ = (
+        # سجل القناة، ونافذة عدم التكرار (نفس الذكر لنفس القناة)
+        Index("ix_deliveries_channel_sent", "channel_id", "sent_at"),
+        Index("ix_deliveries_channel_entry", "channel_id", "entry_hash", "sent_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    channel_id = Column(String(50), nullable=False)
+    category_name = Column(String(50))
+    entry_hash = Column(Integer)  # crc32 لنص الذكر
+    message_id = Column(Integer, nullable=True)
+    ok = Column(Boolean, default=True)
+    latency_ms = Column(Float, default=0.0)
+    error = Column(String(200), nullable=True)
+    sent_at = Column(DateTime, default=datetime.utcnow, index=True)  # UTC، للتحليلات حسب الفترة
+
+
+class DeliveryDailyStat(Base):
+    """ملخص يومي للإرسال بعد ضغط السجلات القديمة"""
+    __tablename__ = "delivery_daily_stats"
+    __table_args__ = (UniqueConstraint("day", "channel_id", "category_name"),)
+    
+    id = Column(Integer, primary_key=True)
+    day = Column(String(10), index=True)  # YYYY-MM-DD
+    channel_id = Column(String(50))
+    category_name = Column(String(50))
+    sent = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    total_latency_ms = Column(Float, default=0.0)
+
+
+class MediaFile(Base):
+    """معرفات الوسائط المرفوعة لتيليجرام (كل ملف يُرفع مرة واحدة ثم يُرسل بالمعرف)"""
+    __tablename__ = "media_files"
+    
+    path = Column(String(255), primary_key=True)
+    kind = Column(String(20))
+    file_id = Column(String(255))
+    fingerprint = Column(String(64))  # وقت التعديل:الحجم (لإعادة الرفع عند تغيّر الملف)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class BroadcastJob(Base):
+    """مهمة بث محفوظة قابلة للاستئناف (مؤشر keyset على users.user_id أو channels.id)"""
+    __tablename__ = "broadcast_jobs"
+    
+    id = Column(Integer, primary_key=True)
+    target = Column(String(20))  # users, channels
+    from_chat_id = Column(Integer)
+    message_id = Column(Integer)
+    status = Column(String(20), default="running", index=True)  # running, paused, cancelled, done
+    cursor = Column(Integer, default=0)  # آخر مفتاح تمت معالجته
+    total = Column(Integer, default=0)
+    sent = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    skipped = Column(Integer, default=0)  # قنوات بوتات المجمع لرسالة لا يمكن إعادة إرسالها
+    rate = Column(Float, default=0.0)  # رسالة/ثانية في آخر دفعة
+    # محتوى الرسالة (JSON) لإعادة إرسالها عبر بوتات المجمع التي لا تستطيع النسخ من محادثة المشرف
+    payload = Column(Text, nullable=True)
+    created_by = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class FSMRecord(Base):
+    """نموذج حالات المحادثة (FSM) المحفوظة"""
+    __tablename__ = "fsm_states"
+    
+    key = Column(String(200), primary_key=True)
+    state = Column(String(100), nullable=True)
+    data = Column(Text, default="{}")
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+# ==========================================
+# --- سجلات القراءة الجماعية ---
+# ==========================================
+# صفوف خفيفة بالأعمدة المطلوبة فقط (بدون خريطة الهوية وحالة ORM)،
+# بنفس أسماء خصائص النماذج حتى تعمل مكانها في العرض
+
+class UserRecord:
+    """مستخدم للقراءة فقط"""
+    __slots__ = ("user_id", "first_name", "username", "role")
+    
+    def __init__(self, user_id: int, first_name: str, username: str, role: str):
+        self.user_id = user_id
+        self.first_name = first_name
+        self.username = username
+        self.role = role
+    
+    def __repr__(self) -> str:
+        return f"UserRecord({self.user_id}, {self.role})"
+
+
+class ChannelRecord:
+    """قناة للقراءة فقط"""
+    __slots__ = ("id", "channel_id", "title", "added_by")
+    
+    def __init__(self, id: int, channel_id: str, title: str, added_by: int):
+        self.id = id
+        self.channel_id = channel_id
+        self.title = title
+        self.added_by = added_by
+    
+    def __repr__(self) -> str:
+        return f"ChannelRecord({self.channel_id})"
+
+
 # ==========================================
 # --- إنشاء الجداول ---
 # ==========================================
 
+def add_missing_columns(connection):
+    """
+    إضافة الأعمدة الجديدة للجداول الموجودة مسبقاً (create_all لا يعدل الجداول القائمة)
+    مع قيمها الافتراضية الثابتة، وإنشاء الفهارس الناقصة
+    """
+    for table in Base.metadata.sorted_tables:
+        existing = {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info("{table.name}")')}
+        if not existing:
+            continue
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            default = ""
+            if column.default is not None and column.default.is_scalar:
+                value = column.default.arg
+                default = f" DEFAULT {int(value) if isinstance(value, bool) else repr(value)}"
+            connection.exec_driver_sql(
+                f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}{default}'
+            )
+            logger.info(f"🧩 تمت إضافة العمود {table.name}.{column.name}")
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
 def init_db():
     """إنشاء جميع الجداول"""
+    engine = get_engine()
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        add_missing_columns(connection)
     logger.info("✅ تم إنشاء جداول قاعدة البيانات بنجاح")
 
 
@@ -120,6 +323,24 @@ class DatabaseManager:
         finally:
             db.close()
     
+    # ==================== إشعارات التغيير ====================
+    
+    @staticmethod
+    def on_change(topic: str, callback):
+        """
+        تسجيل دالة تُستدعى عند تغيير بيانات موضوع معين
+        المواضيع: channels، roles، categories، schedules، config
+        """
+        _change_listeners.setdefault(topic, []).append(callback)
+    
+    @staticmethod
+    def _notify(topic: str):
+        for callback in _change_listeners.get(topic, ()):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"❌ خطأ في إشعار التغيير ({topic}): {e}")
+    
     # ==================== المستخدمون ====================
     
     @staticmethod
@@ -129,6 +350,8 @@ class DatabaseManager:
             user = db.query(User).filter(User.user_id == user_id).first()
             if user:
                 user.last_interaction = datetime.utcnow()
+                # المستخدم تواصل مع البوت مجدداً (أزال الحظر)
+                user.is_reachable = True
                 db.commit()
                 return user
             
@@ -144,6 +367,43 @@ class DatabaseManager:
         with DatabaseManager.get_db() as db:
             return db.query(User).filter(User.user_id == user_id).first()
     
+    @staticmethod
+    def load_or_create_user(user_id: int, first_name: str, username: str = None) -> tuple:
+        """
+        تحميل المستخدم أو إنشاؤه في جلسة واحدة: (الدور، هل هو جديد)
+        """
+        with DatabaseManager.get_db() as db:
+            role = db.query(User.role).filter(User.user_id == user_id).scalar()
+            if role is not None:
+                return role, False
+            db.execute(
+                sqlite_insert(User).values(
+                    user_id=user_id, first_name=first_name, username=username, role="user"
+                ).on_conflict_do_nothing(index_elements=[User.user_id])
+            )
+        logger.info(f"✅ تم إضافة مستخدم جديد: {user_id}")
+        return "user", True
+    
+    @staticmethod
+    def touch_users(records: list):
+        """تحديث دفعة من أوقات التفاعل: كل عنصر (user_id, first_name, username, last_interaction)"""
+        stmt = (
+            update(User.__table__)
+            .where(User.__table__.c.user_id == bindparam("uid"))
+            .values(
+                first_name=bindparam("first_name"),
+                username=bindparam("username"),
+                last_interaction=bindparam("at"),
+                # المستخدم تواصل مع البوت (أزال الحظر إن وُجد)
+                is_reachable=True
+            )
+        )
+        with DatabaseManager.get_db() as db:
+            db.execute(stmt, [
+                {"uid": user_id, "first_name": first_name, "username": username, "at": at}
+                for user_id, first_name, username, at in records
+            ])
+    
     @staticmethod
     def get_user_role(user_id: int) -> str:
         """الحصول على دور المستخدم"""
@@ -159,28 +419,91 @@ class DatabaseManager:
                 user.role = role
                 db.commit()
                 logger.info(f"✅ تم تعيين دور {role} للمستخدم {user_id}")
+                DatabaseManager._notify("roles")
                 return True
             return False
     
+    @staticmethod
+    def iter_users(roles: tuple = None, reachable_only: bool = False, batch_size: int = None):
+        """
+        المرور على المستخدمين كسجلات UserRecord بذاكرة ثابتة
+        الأعمدة المطلوبة فقط، والصفوف تُجلب من المؤشر دفعة بعد دفعة (yield_per)
+        الجلسة تبقى مفتوحة حتى انتهاء المرور، فلا يُستخدم عبر انتظار طويل (البث يستخدم get_broadcast_batch)
+        """
+        stmt = select(User.user_id, User.first_name, User.username, User.role).order_by(User.id)
+        if roles:
+            stmt = stmt.where(User.role.in_(roles))
+        if reachable_only:
+            stmt = stmt.where(User.is_reachable == True)
+        stmt = stmt.execution_options(yield_per=batch_size or PerformanceConfig.STREAM_BATCH_SIZE)
+        with DatabaseManager.get_db() as db:
+            for row in db.execute(stmt):
+                yield UserRecord(*row)
+    
+    @staticmethod
+    def count_users() -> int:
+        """عدد المستخدمين (بدون تحميلهم)"""
+        with DatabaseManager.get_db() as db:
+            return db.query(func.count(User.id)).scalar()
+    
     @staticmethod
     def get_all_users() -> list:
-        """الحصول على جميع المستخدمين"""
+        """الحصول على جميع المستخدمين (سجلات خفيفة)"""
+        return list(DatabaseManager.iter_users())
+    
+    @staticmethod
+    def get_subscribed_user_ids() -> list:
+        """معرفات المستخدمين المسجلين كمشتركين في قناة التحقق"""
         with DatabaseManager.get_db() as db:
-            return db.query(User).all()
+            return [row[0] for row in db.query(User.user_id).filter(User.is_subscribed == True).all()]
     
     @staticmethod
-    def get_admin_users() -> list:
-        """الحصول على جميع المشرفين"""
+    def save_subscriptions(records: list):
+        """حفظ دفعة من حالات الاشتراك: كل عنصر (user_id, is_subscribed)"""
+        stmt = (
+            update(User.__table__)
+            .where(User.__table__.c.user_id == bindparam("uid"))
+            .values(is_subscribed=bindparam("subscribed"))
+        )
+        with DatabaseManager.get_db() as db:
+            db.execute(stmt, [{"uid": uid, "subscribed": subscribed} for uid, subscribed in records])
+    
+    @staticmethod
+    def mark_unreachable(records: list):
+        """
+        تعليم دفعة من المحادثات كغير قابلة للوصول: كل عنصر ("user" أو "channel"، المعرف)
+        المستخدمون: is_reachable = False، القنوات: is_active = False
+        """
+        user_ids = [int(chat_id) for kind, chat_id in records if kind == "user"]
+        channel_ids = [str(chat_id) for kind, chat_id in records if kind == "channel"]
+        deactivated = 0
         with DatabaseManager.get_db() as db:
-            return db.query(User).filter(User.role.in_(["admin", "owner"])).all()
+            for start in range(0, len(user_ids), 500):
+                db.execute(update(User).where(User.user_id.in_(user_ids[start:start + 500])).values(is_reachable=False))
+            for start in range(0, len(channel_ids), 500):
+                deactivated += db.execute(
+                    update(Channel).where(
+                        Channel.channel_id.in_(channel_ids[start:start + 500]), Channel.is_active == True
+                    ).values(is_active=False)
+                ).rowcount
+        if user_ids or deactivated:
+            logger.info(f"🚫 مستخدمون غير قابلين للوصول: {len(user_ids)}، قنوات معطلة: {deactivated}")
+        if deactivated:
+            DatabaseManager._notify("channels")
+    
+    @staticmethod
+    def get_admin_users() -> list:
+        """الحصول على جميع المشرفين (سجلات خفيفة)"""
+        return list(DatabaseManager.iter_users(roles=("admin", "owner")))
     
     # ==================== القنوات ====================
     
     @staticmethod
-    def add_channel(channel_id: str, title: str, added_by: int) -> Channel:
+    def add_channel(channel_id: str, title: str, added_by: int, bot_index: int = 0) -> Channel:
         """
         إضافة قناة جديدة (محدثة لتدعم إعادة التفعيل)
         إذا كانت القناة موجودة ولكن غير نشطة (محذوفة)، يتم إعادة تفعيلها.
+        bot_index: البوت المشرف في القناة من مجمع البوتات
         """
         with DatabaseManager.get_db() as db:
             existing = db.query(Channel).filter(Channel.channel_id == channel_id).first()
@@ -191,33 +514,111 @@ class DatabaseManager:
                     existing.is_active = True  # إعادة تفعيل القناة
                     existing.title = title      # تحديث العنوان
                     existing.added_by = added_by # تحديث من أضافها
+                    existing.bot_index = bot_index
                     db.commit()
                     logger.info(f"✅ تم إعادة تفعيل القناة: {channel_id}")
+                    DatabaseManager._notify("channels")
                 # -----------------------------------------
                 return existing
             
             # إذا لم تكن موجودة، نقوم بإضافتها
-            new_channel = Channel(channel_id=channel_id, title=title, added_by=added_by)
+            new_channel = Channel(channel_id=channel_id, title=title, added_by=added_by, bot_index=bot_index)
             db.add(new_channel)
             db.commit()
             logger.info(f"✅ تم إضافة قناة جديدة: {channel_id}")
+            DatabaseManager._notify("channels")
             return new_channel
     
+    @staticmethod
+    def iter_channels(added_by: int = None, batch_size: int = None):
+        """المرور على القنوات النشطة كسجلات ChannelRecord بذاكرة ثابتة (اختيارياً قنوات مستخدم معين)"""
+        stmt = select(Channel.id, Channel.channel_id, Channel.title, Channel.added_by).where(Channel.is_active == True)
+        if added_by is not None:
+            stmt = stmt.where(Channel.added_by == added_by)
+        stmt = stmt.order_by(Channel.id).execution_options(
+            yield_per=batch_size or PerformanceConfig.STREAM_BATCH_SIZE
+        )
+        with DatabaseManager.get_db() as db:
+            for row in db.execute(stmt):
+                yield ChannelRecord(*row)
+    
+    @staticmethod
+    def count_active_channels() -> int:
+        """عدد القنوات النشطة (بدون تحميلها)"""
+        with DatabaseManager.get_db() as db:
+            return db.query(func.count(Channel.id)).filter(Channel.is_active == True).scalar()
+    
     @staticmethod
     def get_active_channels() -> list:
         """الحصول على جميع القنوات النشطة (للاستخدام العام في البوت)"""
+        return list(DatabaseManager.iter_channels())
+    
+    @staticmethod
+    def save_channel_memberships(records: list):
+        """
+        حفظ دفعة من حالات البوت في القنوات
+        كل عنصر: (channel_id, status, is_admin, is_active, checked_at) — القنوات غير المسجلة تُتجاهل
+        """
+        if not records:
+            return
+        rows = [
+            {"cid": str(channel_id), "status": status, "admin": is_admin, "checked": checked_at}
+            for channel_id, status, is_admin, _, checked_at in records
+        ]
+        stmt = (
+            update(Channel.__table__)
+            .where(Channel.__table__.c.channel_id == bindparam("cid"))
+            .values(bot_status=bindparam("status"), is_bot_admin=bindparam("admin"), status_checked_at=bindparam("checked"))
+        )
+        changed = 0
+        with DatabaseManager.get_db() as db:
+            db.execute(stmt, rows)
+            for active in (True, False):
+                channel_ids = [str(record[0]) for record in records if record[3] == active]
+                for start in range(0, len(channel_ids), 500):
+                    changed += db.execute(
+                        update(Channel).where(
+                            Channel.channel_id.in_(channel_ids[start:start + 500]), Channel.is_active != active
+                        ).values(is_active=active)
+                    ).rowcount
+        if changed:
+            logger.info(f"📡 تم تحديث حالة {changed} قناة من أحداث العضوية")
+            DatabaseManager._notify("channels")
+    
+    @staticmethod
+    def get_channel_bots() -> dict:
+        """القنوات النشطة التابعة لبوتات المجمع الإضافية: {معرف القناة: فهرس البوت}"""
+        with DatabaseManager.get_db() as db:
+            return dict(db.query(Channel.channel_id, Channel.bot_index).filter(
+                Channel.is_active == True, Channel.bot_index > 0
+            ).all())
+    
+    @staticmethod
+    def assign_channel_bots(records: list):
+        """حفظ البوت المسؤول عن دفعة من القنوات: كل عنصر (channel_id, bot_index)"""
+        stmt = (
+            update(Channel.__table__)
+            .where(Channel.__table__.c.channel_id == bindparam("cid"))
+            .values(bot_index=bindparam("index"))
+        )
+        with DatabaseManager.get_db() as db:
+            db.execute(stmt, [{"cid": str(channel_id), "index": bot_index} for channel_id, bot_index in records])
+    
+    @staticmethod
+    def get_channels_to_reconcile(checked_before: datetime, limit: int = 1000) -> list:
+        """القنوات النشطة التي لم يصل عنها حدث أو فحص منذ وقت معين (الأقدم أولاً)"""
         with DatabaseManager.get_db() as db:
-            return db.query(Channel).filter(Channel.is_active == True).all()
+            rows = db.query(Channel.channel_id).filter(
+                Channel.is_active == True,
+                (Channel.status_checked_at == None) | (Channel.status_checked_at < checked_before)
+            ).order_by(Channel.status_checked_at).limit(limit).all()
+            return [row[0] for row in rows]
     
     # --- التعديل الجديد: دالة لجلب قنوات مستخدم معين ---
     @staticmethod
     def get_user_channels(user_id: int) -> list:
         """الحصول على القنوات النشطة التي أضافها مستخدم معين"""
-        with DatabaseManager.get_db() as db:
-            return db.query(Channel).filter(
-                Channel.added_by == user_id,
-                Channel.is_active == True
-            ).all()
+        return list(DatabaseManager.iter_channels(added_by=user_id))
     # --------------------------------------------------
     
     @staticmethod
@@ -229,6 +630,7 @@ class DatabaseManager:
                 channel.is_active = False
                 db.commit()
                 logger.info(f"✅ تم حذف القناة: {channel_id}")
+                DatabaseManager._notify("channels")
                 return True
             return False
     
@@ -239,14 +641,15 @@ class DatabaseManager:
         """حذف قناة بأمان (للاستخدام في المهام الخلفية)"""
         with DatabaseManager.get_db() as db:
             channel = db.query(Channel).filter(Channel.channel_id == channel_id).first()
-            if channel:
-                db.delete(channel)
-                # db.commit يتم تلقائياً عند الخروج من الـ with
-                logger.info(f"✅ تم حذف القناة {channel_id} بنجاح عبر المهمة الدورية.")
-                return True
-            return False
-            
-            
+            if not channel:
+                return False
+            db.delete(channel)
+            # db.commit يتم تلقائياً عند الخروج من الـ with
+        logger.info(f"✅ تم حذف القناة {channel_id} بنجاح عبر المهمة الدورية.")
+        DatabaseManager._notify("channels")
+        return True
+    
+    
     @staticmethod
     def init_categories():
         """تهيئة فئات الأذكار الافتراضية"""
@@ -271,6 +674,52 @@ class DatabaseManager:
             db.commit()
             logger.info("✅ تم تهيئة فئات الأذكار")
     
+    @staticmethod
+    def bootstrap(admin_ids: list) -> list:
+        """
+        تهيئة قاعدة البيانات في معاملة واحدة:
+        إنشاء الجداول، الفئات الافتراضية، وتعيين المالكين.
+        تعيد مسارات ملفات الفئات للتأكد من وجودها وفهرستها.
+        """
+        with DatabaseManager.get_db() as db:
+            Base.metadata.create_all(bind=db.connection())
+            add_missing_columns(db.connection())
+            
+            defaults = [
+                ("sabah", "06:00", "12:00", "azkar_sabah.txt"),
+                ("masaa", "18:00", "22:00", "azkar_masaa.txt"),
+                ("aam", None, None, "azkar_aam.txt"),
+            ]
+            existing = {c.category_name: c for c in db.query(AdhkarCategory).all()}
+            for cat_name, start, end, file_path in defaults:
+                if cat_name not in existing:
+                    cat = AdhkarCategory(
+                        category_name=cat_name,
+                        start_time=start,
+                        end_time=end,
+                        file_path=file_path
+                    )
+                    db.add(cat)
+                    existing[cat_name] = cat
+            
+            if admin_ids:
+                users = {
+                    u.user_id: u
+                    for u in db.query(User).filter(User.user_id.in_(admin_ids)).all()
+                }
+                for admin_id in admin_ids:
+                    user = users.get(admin_id)
+                    if user:
+                        user.role = "owner"
+                    else:
+                        db.add(User(user_id=admin_id, first_name="Owner", role="owner"))
+            
+            file_paths = [existing[name].file_path for name, _, _, _ in defaults]
+        
+        logger.info("✅ تم تهيئة قاعدة البيانات في معاملة واحدة")
+        DatabaseManager._notify("roles")
+        return file_paths
+    
     @staticmethod
     def get_category(category_name: str) -> AdhkarCategory:
         """الحصول على فئة أذكار"""
@@ -288,9 +737,68 @@ class DatabaseManager:
                         setattr(category, key, value)
                 db.commit()
                 logger.info(f"✅ تم تحديث فئة {category_name}")
+                DatabaseManager._notify("categories")
                 return True
             return False
     
+    @staticmethod
+    def get_categories() -> list:
+        """الحصول على كل فئات الأذكار في استعلام واحد"""
+        with DatabaseManager.get_db() as db:
+            return db.query(AdhkarCategory).all()
+    
+    # ==================== جداول النشر لكل قناة ====================
+    
+    @staticmethod
+    def get_schedule_plan() -> tuple:
+        """
+        بيانات بناء جدول النشر في معاملة واحدة:
+        (معرفات القنوات النشطة، صفوف channel_schedules كقواميس)
+        """
+        with DatabaseManager.get_db() as db:
+            channel_ids = [row[0] for row in db.query(Channel.channel_id).filter(Channel.is_active == True).all()]
+            rows = [dict(row._mapping) for row in db.execute(ChannelSchedule.__table__.select()).all()]
+            return channel_ids, rows
+    
+    @staticmethod
+    def set_channel_schedule(channel_id: str, category_name: str, **kwargs):
+        """تعديل جدول فئة في قناة (is_enabled، interval_minutes، start_time، end_time، timezone)"""
+        values = {"channel_id": channel_id, "category_name": category_name, **kwargs}
+        stmt = sqlite_insert(ChannelSchedule).values(values)
+        if kwargs:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ChannelSchedule.channel_id, ChannelSchedule.category_name],
+                set_=kwargs
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing()
+        with DatabaseManager.get_db() as db:
+            db.execute(stmt)
+        DatabaseManager._notify("schedules")
+    
+    @staticmethod
+    def save_channel_post_times(records: list):
+        """
+        حفظ دفعة من أوقات النشر
+        كل عنصر: (channel_id, category_name, posted_at, next_fire_at) بتوقيت UTC (posted_at = None لا يغير القيمة المحفوظة)
+        """
+        with DatabaseManager.get_db() as db:
+            for start in range(0, len(records), 500):
+                stmt = sqlite_insert(ChannelSchedule).values([
+                    {"channel_id": channel_id, "category_name": category_name,
+                     "last_posted_at": posted_at, "next_fire_at": next_fire_at}
+                    for channel_id, category_name, posted_at, next_fire_at in records[start:start + 500]
+                ])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[ChannelSchedule.channel_id, ChannelSchedule.category_name],
+                    set_={
+                        # None = إبقاء آخر وقت نشر (منشور مؤجل لم يكتمل)
+                        "last_posted_at": func.coalesce(stmt.excluded.last_posted_at, ChannelSchedule.last_posted_at),
+                        "next_fire_at": stmt.excluded.next_fire_at,
+                    }
+                )
+                db.execute(stmt)
+    
     # ==================== الإعدادات ====================
     
     @staticmethod
@@ -306,6 +814,7 @@ class DatabaseManager:
                 db.add(config)
             db.commit()
             logger.info(f"✅ تم حفظ الإعداد: {key}")
+        DatabaseManager._notify("config")
     
     @staticmethod
     def get_config(key: str) -> str:
@@ -313,7 +822,223 @@ class DatabaseManager:
         with DatabaseManager.get_db() as db:
             config = db.query(BotConfig).filter(BotConfig.key == key).first()
             return config.value if config else None
-
-
-# تهيئة قاعدة البيانات عند استيراد الملف
-init_db()
\ No newline at end of file
+    
+    # ==================== مهام البث ====================
+    
+    @staticmethod
+    def create_broadcast_job(
+        target: str, from_chat_id: int, message_id: int, created_by: int, payload: str = None
+    ) -> int:
+        """إنشاء مهمة بث وإرجاع رقمها"""
+        with DatabaseManager.get_db() as db:
+            if target == "users":
+                total = db.query(func.count(User.id)).filter(User.is_reachable == True).scalar()
+            else:
+                total = db.query(func.count(Channel.id)).filter(Channel.is_active == True).scalar()
+            job = BroadcastJob(
+                target=target, from_chat_id=from_chat_id, message_id=message_id,
+                created_by=created_by, total=total or 0, payload=payload
+            )
+            db.add(job)
+            db.flush()
+            return job.id
+    
+    @staticmethod
+    def get_broadcast_job(job_id: int) -> BroadcastJob:
+        """الحصول على مهمة بث"""
+        with DatabaseManager.get_db() as db:
+            return db.query(BroadcastJob).filter(BroadcastJob.id == job_id).first()
+    
+    @staticmethod
+    def get_broadcast_jobs(statuses: tuple = None, limit: int = 10) -> list:
+        """أحدث مهام البث (مع تصفية اختيارية حسب الحالة)"""
+        with DatabaseManager.get_db() as db:
+            query = db.query(BroadcastJob)
+            if statuses:
+                query = query.filter(BroadcastJob.status.in_(statuses))
+            return query.order_by(BroadcastJob.id.desc()).limit(limit).all()
+    
+    @staticmethod
+    def get_broadcast_batch(target: str, after: int, limit: int) -> list:
+        """الدفعة التالية من المستلمين بعد المؤشر: قائمة (المفتاح، معرف المحادثة)"""
+        with DatabaseManager.get_db() as db:
+            if target == "users":
+                return db.query(User.user_id, User.user_id).filter(
+                    User.is_reachable == True, User.user_id > after
+                ).order_by(User.user_id).limit(limit).all()
+            return db.query(Channel.id, Channel.channel_id).filter(
+                Channel.is_active == True, Channel.id > after
+            ).order_by(Channel.id).limit(limit).all()
+    
+    @staticmethod
+    def checkpoint_broadcast_job(job_id: int, cursor: int, sent: int, failed: int, rate: float, skipped: int = 0):
+        """حفظ تقدم المهمة بعد دفعة: المؤشر الجديد مع زيادة العدادات"""
+        with DatabaseManager.get_db() as db:
+            db.query(BroadcastJob).filter(BroadcastJob.id == job_id).update({
+                BroadcastJob.cursor: cursor,
+                BroadcastJob.sent: BroadcastJob.sent + sent,
+                BroadcastJob.failed: BroadcastJob.failed + failed,
+                BroadcastJob.skipped: BroadcastJob.skipped + skipped,
+                BroadcastJob.rate: rate,
+                BroadcastJob.updated_at: datetime.utcnow(),
+            }, synchronize_session=False)
+    
+    @staticmethod
+    def set_broadcast_job_status(job_id: int, status: str, expected: tuple = None) -> bool:
+        """تغيير حالة مهمة (اختيارياً فقط إذا كانت حالتها الحالية ضمن expected)"""
+        values = {BroadcastJob.status: status, BroadcastJob.updated_at: datetime.utcnow()}
+        if status in ("done", "cancelled"):
+            values[BroadcastJob.finished_at] = datetime.utcnow()
+        with DatabaseManager.get_db() as db:
+            query = db.query(BroadcastJob).filter(BroadcastJob.id == job_id)
+            if expected:
+                query = query.filter(BroadcastJob.status.in_(expected))
+            return query.update(values, synchronize_session=False) > 0
+    
+    # ==================== معرفات الوسائط ====================
+    
+    @staticmethod
+    def get_media_files() -> dict:
+        """كل معرفات الوسائط المحفوظة: المسار -> (النوع، file_id، البصمة)"""
+        with DatabaseManager.get_db() as db:
+            return {
+                row.path: (row.kind, row.file_id, row.fingerprint)
+                for row in db.query(MediaFile.path, MediaFile.kind, MediaFile.file_id, MediaFile.fingerprint)
+            }
+    
+    @staticmethod
+    def save_media_file(path: str, kind: str, file_id: str, fingerprint: str):
+        """حفظ/تحديث معرف وسائط بعد رفعها"""
+        values = {"kind": kind, "file_id": file_id, "fingerprint": fingerprint, "updated_at": datetime.utcnow()}
+        stmt = sqlite_insert(MediaFile).values(path=path, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=[MediaFile.path], set_=values)
+        with DatabaseManager.get_db() as db:
+            db.execute(stmt)
+    
+    # ==================== سجل الإرسال ====================
+    
+    @staticmethod
+    def record_deliveries(records: list):
+        """
+        إلحاق دفعة سجلات إرسال
+        كل عنصر: (channel_id, category_name, entry_hash, message_id, ok, latency_ms, error, sent_at)
+        """
+        rows = [
+            {
+                "channel_id": channel_id, "category_name": category_name, "entry_hash": entry_hash,
+                "message_id": message_id, "ok": ok, "latency_ms": latency_ms,
+                "error": error[:200] if error else None, "sent_at": sent_at,
+            }
+            for channel_id, category_name, entry_hash, message_id, ok, latency_ms, error, sent_at in records
+        ]
+        with DatabaseManager.get_db() as db:
+            db.execute(insert(Delivery), rows)
+    
+    @staticmethod
+    def get_recent_entry_hashes(channel_ids: list, since: datetime) -> set:
+        """الأذكار المرسلة بنجاح لهذه القنوات منذ وقت معين (لنافذة عدم التكرار)"""
+        result = set()
+        with DatabaseManager.get_db() as db:
+            for start in range(0, len(channel_ids), 500):
+                rows = db.query(Delivery.entry_hash).filter(
+                    Delivery.channel_id.in_(channel_ids[start:start + 500]),
+                    Delivery.sent_at >= since,
+                    Delivery.ok == True
+                ).distinct().all()
+                result.update(row[0] for row in rows)
+        return result
+    
+    @staticmethod
+    def compact_deliveries(older_than: datetime, batch_size: int = 5000) -> int:
+        """
+        ضغط السجلات الأقدم من وقت معين: تجميعها في ملخص يومي لكل (قناة، فئة) ثم حذفها
+        يتم على دفعات حتى لا تطول معاملة الكتابة
+        """
+        compacted = 0
+        while True:
+            with DatabaseManager.get_db() as db:
+                last_id = db.query(Delivery.id).filter(
+                    Delivery.sent_at < older_than
+                ).order_by(Delivery.id).offset(batch_size - 1).limit(1).scalar()
+                scope = [Delivery.sent_at < older_than]
+                if last_id is not None:
+                    scope.append(Delivery.id <= last_id)
+                day = func.strftime("%Y-%m-%d", Delivery.sent_at)
+                rows = db.query(
+                    day, Delivery.channel_id, Delivery.category_name,
+                    func.sum(case((Delivery.ok == True, 1), else_=0)),
+                    func.sum(case((Delivery.ok == True, 0), else_=1)),
+                    func.sum(Delivery.latency_ms)
+                ).filter(*scope).group_by(day, Delivery.channel_id, Delivery.category_name).all()
+                if not rows:
+                    return compacted
+                stmt = sqlite_insert(DeliveryDailyStat).values([
+                    {"day": row[0], "channel_id": row[1], "category_name": row[2],
+                     "sent": row[3], "failed": row[4], "total_latency_ms": row[5] or 0.0}
+                    for row in rows
+                ])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[DeliveryDailyStat.day, DeliveryDailyStat.channel_id, DeliveryDailyStat.category_name],
+                    set_={
+                        "sent": DeliveryDailyStat.sent + stmt.excluded.sent,
+                        "failed": DeliveryDailyStat.failed + stmt.excluded.failed,
+                        "total_latency_ms": DeliveryDailyStat.total_latency_ms + stmt.excluded.total_latency_ms,
+                    }
+                )
+                db.execute(stmt)
+                compacted += db.query(Delivery).filter(*scope).delete(synchronize_session=False)
+            if last_id is None:
+                return compacted
+    
+    @staticmethod
+    def purge_delivery_stats(older_than: str) -> int:
+        """حذف الملخصات اليومية الأقدم من يوم معين (YYYY-MM-DD)"""
+        with DatabaseManager.get_db() as db:
+            return db.query(DeliveryDailyStat).filter(DeliveryDailyStat.day < older_than).delete(
+                synchronize_session=False
+            )
+    
+    # ==================== حالات المحادثة (FSM) ====================
+    
+    @staticmethod
+    def load_fsm_record(key: str):
+        """تحميل حالة محادثة: (state, data_json, updated_at) أو None"""
+        with DatabaseManager.get_db() as db:
+            record = db.query(FSMRecord).filter(FSMRecord.key == key).first()
+            if record:
+                return record.state, record.data, record.updated_at
+            return None
+    
+    @staticmethod
+    def save_fsm_records(records: list):
+        """
+        حفظ دفعة من حالات المحادثة في معاملة واحدة
+        كل عنصر: (key, state, data_json, updated_at)، والحالة الفارغة تُحذف
+        """
+        upserts = [r for r in records if r[1] is not None or r[2] != "{}"]
+        deletes = [r[0] for r in records if r[1] is None and r[2] == "{}"]
+        with DatabaseManager.get_db() as db:
+            for start in range(0, len(upserts), 500):
+                stmt = sqlite_insert(FSMRecord).values([
+                    {"key": key, "state": state, "data": data, "updated_at": updated_at}
+                    for key, state, data, updated_at in upserts[start:start + 500]
+                ])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[FSMRecord.key],
+                    set_={
+                        "state": stmt.excluded.state,
+                        "data": stmt.excluded.data,
+                        "updated_at": stmt.excluded.updated_at,
+                    }
+                )
+                db.execute(stmt)
+            if deletes:
+                db.query(FSMRecord).filter(FSMRecord.key.in_(deletes)).delete(synchronize_session=False)
+    
+    @staticmethod
+    def purge_fsm_records(older_than: datetime) -> int:
+        """حذف حالات المحادثة المهجورة"""
+        with DatabaseManager.get_db() as db:
+            return db.query(FSMRecord).filter(FSMRecord.updated_at < older_than).delete(
+                synchronize_session=False
+            )
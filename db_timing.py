@@ -0,0 +1,46 @@
+"""
+قياس زمن استعلامات قاعدة البيانات مرة واحدة لكل المستهلكين
+زوج واحد من مستمعي SQLAlchemy لكل محرك يقيس زمن كل استعلام ويمرره لكل من سجّل عبر on_query
+(المقاييس ورصد الاستعلامات البطيئة)، ومستمع handle_error يحذف وقت البدء عند فشل الاستعلام
+حتى لا يبقى عالقاً في الاتصال المشترك.
+"""
+
+import time
+import weakref
+from typing import Callable
+
+# المحرك -> دوال تُستدعى بعد كل استعلام (statement, parameters, المدة بالثواني)
+_consumers = weakref.WeakKeyDictionary()
+
+_STARTED = "query_started"
+
+
+def on_query(engine, fn: Callable[[str, object, float], None]):
+    """تسجيل دالة تستقبل زمن كل استعلام على المحرك (المستمعون يُضافون مع أول تسجيل)"""
+    consumers = _consumers.get(engine)
+    if consumers is None:
+        consumers = _consumers[engine] = []
+        _listen(engine, consumers)
+    consumers.append(fn)
+
+
+def _listen(engine, consumers: list):
+    from sqlalchemy import event
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info[_STARTED] = time.perf_counter()
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop(_STARTED, None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        for fn in consumers:
+            fn(statement, parameters, duration)
+    
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        if exception_context.connection is not None:
+            exception_context.connection.info.pop(_STARTED, None)
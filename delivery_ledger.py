@@ -0,0 +1,114 @@
+"""
+سجل الإرسال (Delivery Ledger)
+كل محاولة إرسال تُضاف لجدول deliveries عبر كاتب دفعات غير متزامن:
+القناة، الفئة، بصمة الذكر، رقم الرسالة في تيليجرام، الزمن المستغرق والخطأ إن وُجد.
+
+السجل يحدد أيضاً نافذة عدم التكرار: pick() تختار ذكراً لم يُرسل لنفس القنوات خلال DELIVERY_NO_REPEAT_HOURS.
+
+للحفاظ على حجم الجدول: السجلات الأقدم من DELIVERY_RETENTION_DAYS تُضغط مرة يومياً
+في ملخص يومي لكل (قناة، فئة) ثم تُحذف، والملخصات تُحذف بعد DELIVERY_STATS_RETENTION_DAYS.
+"""
+
+import asyncio
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+from batch_writer import BatchWriter
+from config import PerformanceConfig
+from database import DatabaseManager
+from loguru import logger
+
+
+def entry_hash(text: str) -> int:
+    """بصمة ثابتة لنص الذكر (لتجميع السجلات ونافذة عدم التكرار)"""
+    return zlib.crc32(text.encode("utf-8"))
+
+
+class DeliveryLedger:
+    """تسجيل نتائج الإرسال على دفعات مع ضغط دوري للسجلات القديمة"""
+    
+    def __init__(
+        self,
+        retention_days: int = PerformanceConfig.DELIVERY_RETENTION_DAYS,
+        compact_interval: float = PerformanceConfig.DELIVERY_COMPACT_INTERVAL,
+        flush_interval: float = PerformanceConfig.DELIVERY_FLUSH_INTERVAL,
+        no_repeat_hours: float = PerformanceConfig.DELIVERY_NO_REPEAT_HOURS
+    ):
+        self.retention = timedelta(days=retention_days)
+        self.compact_interval = compact_interval
+        self.no_repeat = timedelta(hours=no_repeat_hours) if no_repeat_hours > 0 else None
+        self._writer = BatchWriter(
+            DatabaseManager.record_deliveries, "deliveries", flush_interval=flush_interval, max_batch=2000
+        )
+        # أول ضغط مع أول دورة إرسال (حتى لا يمنعه تكرار إعادة التشغيل قبل مرور يوم)
+        self._last_compact = None
+        self._compacting = None
+    
+    @property
+    def pending(self) -> int:
+        return self._writer.pending
+    
+    async def pick(self, adhkars: list, channel_ids: list) -> str:
+        """ذكر عشوائي لم يُرسل لهذه القنوات خلال نافذة عدم التكرار (أو أي ذكر إذا أُرسلت كلها)"""
+        if self.no_repeat is None or len(adhkars) < 2:
+            return random.choice(adhkars)
+        sample = channel_ids if len(channel_ids) <= PerformanceConfig.DELIVERY_NO_REPEAT_SAMPLE else random.sample(
+            channel_ids, PerformanceConfig.DELIVERY_NO_REPEAT_SAMPLE
+        )
+        try:
+            recent = await asyncio.to_thread(
+                DatabaseManager.get_recent_entry_hashes, sample, datetime.utcnow() - self.no_repeat
+            )
+        except Exception as e:
+            logger.error(f"❌ خطأ في قراءة نافذة عدم التكرار: {e}")
+            return random.choice(adhkars)
+        # محاولات عشوائية أولاً (الملفات الكبيرة)، ثم التصفية الكاملة عندما تكون أغلب الأذكار مرسلة
+        for _ in range(16):
+            text = random.choice(adhkars)
+            if entry_hash(text) not in recent:
+                return text
+        fresh = [text for text in adhkars if entry_hash(text) not in recent]
+        return random.choice(fresh or adhkars)
+    
+    def record(self, outcomes: list, category_name: str, text: str):
+        """إضافة نتائج دورة إرسال (قائمة SendOutcome)"""
+        sent_at = datetime.utcnow()
+        fingerprint = entry_hash(text)
+        for outcome in outcomes:
+            self._writer.add((
+                outcome.channel_id, category_name, fingerprint, outcome.message_id,
+                outcome.ok, round(outcome.latency_ms, 2), outcome.error, sent_at
+            ))
+        self._maybe_compact()
+    
+    def _maybe_compact(self):
+        """ضغط السجلات القديمة في الخلفية (بشكل كسول، مرة كل compact_interval)"""
+        now = time.monotonic()
+        if self._compacting is not None:
+            return
+        if self._last_compact is not None and now - self._last_compact < self.compact_interval:
+            return
+        self._last_compact = now
+        self._compacting = asyncio.create_task(self.compact())
+        self._compacting.add_done_callback(lambda _: setattr(self, "_compacting", None))
+    
+    async def compact(self) -> int:
+        """ضغط السجلات الأقدم من مدة الاحتفاظ وحذف الملخصات المنتهية"""
+        now = datetime.utcnow()
+        try:
+            compacted = await asyncio.to_thread(DatabaseManager.compact_deliveries, now - self.retention)
+            stats_cutoff = (now - timedelta(days=PerformanceConfig.DELIVERY_STATS_RETENTION_DAYS)).strftime("%Y-%m-%d")
+            await asyncio.to_thread(DatabaseManager.purge_delivery_stats, stats_cutoff)
+        except Exception as e:
+            logger.error(f"❌ خطأ في ضغط سجل الإرسال: {e}")
+            return 0
+        if compacted:
+            logger.info(f"🗜️ تم ضغط {compacted} سجل إرسال قديم في الملخص اليومي")
+        return compacted
+    
+    async def close(self):
+        """كتابة السجلات المعلقة"""
+        if self._compacting is not None:
+            await self._compacting
+        await self._writer.close()
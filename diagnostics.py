@@ -0,0 +1,177 @@
+"""
+رصد البطء مع التقاط تلقائي للتفاصيل
+- الاستعلامات البطيئة (مع معاملاتها) عبر أحداث SQLAlchemy
+- المعالجات البطيئة عبر Outer Middleware
+- حجب حلقة الأحداث مع التقاط مكدس الاستدعاءات (Stack) للكود الحاجب
+تُحفظ العينات في مخزن دائري محدود الحجم يمكن للمالك عرضه بالأمر /slowlog
+"""
+
+import asyncio
+import random
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from config import DiagnosticsConfig
+from loguru import logger
+
+
+# ==========================================
+# --- المخزن الدائري ---
+# ==========================================
+
+class SlowLog:
+    """مخزن دائري لعينات البطء"""
+    
+    def __init__(self, size: int = DiagnosticsConfig.RING_SIZE, sample_rate: float = DiagnosticsConfig.SAMPLE_RATE):
+        self.entries = deque(maxlen=size)
+        self.sample_rate = sample_rate
+        self.counts = {"query": 0, "handler": 0, "loop": 0}
+    
+    def record(self, kind: str, duration_ms: float, detail: str, stack: str = None) -> bool:
+        """تسجيل حدث بطيء (يعيد False إذا لم يُختر ضمن العينة)"""
+        self.counts[kind] += 1
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return False
+        self.entries.append({
+            "kind": kind,
+            "at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+            "duration_ms": round(duration_ms, 1),
+            "detail": detail,
+            "stack": stack,
+        })
+        return True
+    
+    def dump(self, limit: int = None) -> str:
+        """نص مقروء لآخر العينات"""
+        entries = list(self.entries)[-limit:] if limit else list(self.entries)
+        lines = [
+            f"الإجمالي: استعلامات={self.counts['query']} معالجات={self.counts['handler']} "
+            f"حجب الحلقة={self.counts['loop']}",
+            ""
+        ]
+        for entry in reversed(entries):
+            lines.append(f"[{entry['at']}] {entry['kind']} {entry['duration_ms']}ms")
+            lines.append(f"  {entry['detail']}")
+            if entry["stack"]:
+                lines.append(entry["stack"])
+            lines.append("")
+        return "\n".join(lines)
+
+
+slow_log = SlowLog()
+
+
+# ==========================================
+# --- الاستعلامات البطيئة ---
+# ==========================================
+
+def instrument_engine(engine, threshold_ms: float = DiagnosticsConfig.SLOW_QUERY_MS):
+    """رصد الاستعلامات التي تتجاوز الحد مع معاملاتها (من مستمعي db_timing المشتركين)"""
+    from db_timing import on_query
+    
+    def observe(statement, parameters, duration):
+        duration_ms = duration * 1000
+        if duration_ms < threshold_ms:
+            return
+        params = repr(parameters)
+        if len(params) > 300:
+            params = params[:300] + "..."
+        detail = f"{' '.join(statement.split())[:500]} | params={params}"
+        if slow_log.record("query", duration_ms, detail):
+            logger.warning(f"🐢 استعلام بطيء ({duration_ms:.0f}ms): {detail}")
+    
+    on_query(engine, observe)
+
+
+# ==========================================
+# --- المعالجات البطيئة ---
+# ==========================================
+
+def _describe_update(update: TelegramObject) -> str:
+    if not isinstance(update, Update):
+        return type(update).__name__
+    if update.callback_query:
+        return f"callback_query data={update.callback_query.data!r} user={update.callback_query.from_user.id}"
+    if update.message:
+        text = (update.message.text or update.message.caption or "")[:50]
+        return f"message text={text!r} user={update.message.from_user.id if update.message.from_user else None}"
+    return update.event_type
+
+
+class SlowHandlerMiddleware(BaseMiddleware):
+    """تنبيه عند تجاوز معالجة التحديث للحد المسموح"""
+    
+    def __init__(self, threshold_ms: float = DiagnosticsConfig.SLOW_HANDLER_MS):
+        self.threshold = threshold_ms / 1000
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.threshold:
+                detail = _describe_update(event)
+                if slow_log.record("handler", elapsed * 1000, detail):
+                    logger.warning(f"🐢 معالج بطيء ({elapsed * 1000:.0f}ms): {detail}")
+
+
+# ==========================================
+# --- مراقبة حجب حلقة الأحداث ---
+# ==========================================
+
+class LoopLagMonitor:
+    """
+    نبضة دورية داخل الحلقة + خيط مراقب خارجها:
+    إذا تأخرت النبضة أكثر من الحد، يلتقط الخيط مكدس الكود الذي يحجب الحلقة
+    """
+    
+    def __init__(self, threshold_ms: float = DiagnosticsConfig.LOOP_LAG_MS, interval: float = 0.05):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self._last_beat = time.monotonic()
+        self._loop_thread_id = None
+        self._stop = threading.Event()
+        self._task = None
+        self._thread = None
+    
+    async def _heartbeat(self):
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+    
+    def _watch(self):
+        captured_for = None
+        while not self._stop.wait(self.interval):
+            beat = self._last_beat
+            lag = time.monotonic() - beat
+            if lag < self.threshold or captured_for == beat:
+                continue
+            # التقاط مكدس واحد لكل فترة حجب
+            captured_for = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=15)) if frame else None
+            if slow_log.record("loop", lag * 1000, "event loop blocked", stack):
+                logger.warning(f"🐢 حلقة الأحداث محجوبة منذ {lag * 1000:.0f}ms")
+    
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-monitor", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
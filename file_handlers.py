@@ -15,6 +15,7 @@ from keyboards import (
     get_channels_menu_keyboard
 )
 from bot_utils import load_adhkars_from_file, save_adhkars_to_file
+from user_context import UserContext
 from loguru import logger
 
 router = Router()
@@ -46,12 +47,10 @@ async def show_channels_menu(call: types.CallbackQuery):
 
 
 @router.callback_query(F.data == "delete_channel")
-async def show_delete_channels_list(call: types.CallbackQuery):
+async def show_delete_channels_list(call: types.CallbackQuery, user: UserContext):
     """عرض قائمة القنوات لحذفها (تعرض قنوات المستخدم فقط)"""
-    user_id = call.from_user.id
-    
-    # التعديل المهم: تمرير user_id لعرض قنوات المستخدم فقط
-    markup = get_delete_channels_keyboard(user_id)
+    # التعديل المهم: تمرير المستخدم لعرض قنوات المستخدم فقط
+    markup = get_delete_channels_keyboard(user)
     
     try:
         await call.message.edit_text("🗑️ **اختر قناة للحذف:**", reply_markup=markup)
@@ -128,9 +127,9 @@ async def save_verification_channel(message: types.Message, state: FSMContext):
 
 
 @router.message(F.document)
-async def handle_file_upload(message: types.Message, state: FSMContext):
+async def handle_file_upload(message: types.Message, state: FSMContext, user: UserContext):
     """معالجة رفع الملفات"""
-    user_role = DatabaseManager.get_user_role(message.from_user.id)
+    user_role = user.role
     
     if user_role not in ["admin", "owner"]:
         await message.reply("❌ ليس لديك صلاحيات كافية.")
@@ -195,26 +194,15 @@ async def handle_file_upload(message: types.Message, state: FSMContext):
 
 
 @router.message(F.text)
-async def handle_text_message(message: types.Message):
-    """معالجة الرسائل النصية العامة"""
-    user_id = message.from_user.id
-    
-    # إضافة المستخدم إلى قاعدة البيانات إذا لم يكن موجوداً
-    DatabaseManager.add_user(
-        user_id,
-        message.from_user.first_name,
-        message.from_user.username
-    )
-    
+async def handle_text_message(message: types.Message, user: UserContext):
+    """معالجة الرسائل النصية العامة (المستخدم مسجل مسبقاً عبر وسيط سياق المستخدم)"""
     # الرد على الرسائل غير المتوقعة
     if message.text.startswith("/"):
         # معالجة الأوامر في ملف منفصل
         return
     
     # الرد على الرسائل العامة
-    user_role = DatabaseManager.get_user_role(user_id)
-    
     await message.reply(
         "👋 مرحباً! استخدم الأزرار أدناه للتنقل:",
-        reply_markup=get_main_keyboard(user_role)
+        reply_markup=get_main_keyboard(user.role)
     )
\ No newline at end of file
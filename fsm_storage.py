@@ -0,0 +1,148 @@
+"""
+تخزين حالات المحادثة (FSM) في SQLite
+مع ذاكرة مؤقتة LRU أمامية (القراءة من الذاكرة) وكتابة دفعية في الخلفية،
+وانتهاء صلاحية الحالات المهجورة بعد مدة محددة (TTL).
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from batch_writer import BatchWriter
+from config import PerformanceConfig
+from database import DatabaseManager
+from loguru import logger
+
+
+class _Record:
+    """سجل حالة في الذاكرة"""
+    __slots__ = ("state", "data", "touched")
+    
+    def __init__(self, state: Optional[str] = None, data: Dict[str, Any] = None, touched: float = None):
+        self.state = state
+        self.data = data if data is not None else {}
+        self.touched = touched if touched is not None else time.monotonic()
+
+
+class SQLiteStorage(BaseStorage):
+    """تخزين FSM دائم مع كتابة فورية للذاكرة ودفعية لقاعدة البيانات"""
+    
+    def __init__(
+        self,
+        capacity: int = PerformanceConfig.CACHE_SIZE,
+        ttl: float = PerformanceConfig.FSM_STATE_TTL,
+        flush_interval: float = PerformanceConfig.FSM_FLUSH_INTERVAL
+    ):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        self._writer = BatchWriter(DatabaseManager.save_fsm_records, "fsm", flush_interval=flush_interval)
+        self._last_sweep = time.monotonic()
+        self._purging = None
+    
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}"
+    
+    # ==================== القراءة ====================
+    
+    async def _get(self, key: StorageKey) -> _Record:
+        skey = self._key(key)
+        now = time.monotonic()
+        record = self._cache.get(skey)
+        if record is not None:
+            if now - record.touched <= self.ttl:
+                self._cache.move_to_end(skey)
+                return record
+            # حالة منتهية الصلاحية
+            record = _Record(touched=now)
+            self._cache[skey] = record
+            self._persist(skey, record)
+            return record
+        
+        # غير موجود في الذاكرة: تحميل من قاعدة البيانات (بعد إعادة التشغيل مثلاً)
+        pending = self._writer.peek(skey)
+        if pending is not None:
+            row = pending[1:]
+        else:
+            row = await asyncio.to_thread(DatabaseManager.load_fsm_record, skey)
+        record = _Record(touched=now)
+        if row and datetime.utcnow() - row[2] <= timedelta(seconds=self.ttl):
+            record.state = row[0]
+            record.data = json.loads(row[1] or "{}")
+        self._remember(skey, record)
+        return record
+    
+    def _remember(self, skey: str, record: _Record):
+        self._cache[skey] = record
+        self._cache.move_to_end(skey)
+        while len(self._cache) > self.capacity:
+            # السجلات المحذوفة من الذاكرة محفوظة مسبقاً في قاعدة البيانات
+            self._cache.popitem(last=False)
+    
+    # ==================== الكتابة ====================
+    
+    def _persist(self, skey: str, record: _Record):
+        self._writer.put(skey, (
+            skey,
+            record.state,
+            json.dumps(record.data, ensure_ascii=False, default=str),
+            datetime.utcnow()
+        ))
+        self._maybe_sweep()
+    
+    def _maybe_sweep(self):
+        """حذف الحالات المهجورة من الذاكرة وقاعدة البيانات (بشكل كسول)"""
+        now = time.monotonic()
+        if now - self._last_sweep < min(self.ttl, 600):
+            return
+        self._last_sweep = now
+        expired = [k for k, r in self._cache.items() if now - r.touched > self.ttl]
+        for skey in expired:
+            del self._cache[skey]
+        if self._purging is None:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+            self._purging = asyncio.create_task(self._purge(cutoff))
+            self._purging.add_done_callback(lambda _: setattr(self, "_purging", None))
+        if expired:
+            logger.info(f"🧹 تم حذف {len(expired)} حالة محادثة مهجورة من الذاكرة")
+    
+    async def _purge(self, cutoff: datetime):
+        """حذف الحالات المهجورة من قاعدة البيانات في خيط منفصل"""
+        try:
+            await asyncio.to_thread(DatabaseManager.purge_fsm_records, cutoff)
+        except Exception as e:
+            logger.error(f"❌ خطأ في حذف حالات المحادثة المهجورة: {e}")
+    
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get(key)
+        record.state = state.state if isinstance(state, State) else state
+        record.touched = time.monotonic()
+        self._persist(self._key(key), record)
+    
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get(key)).state
+    
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = await self._get(key)
+        record.data = data.copy()
+        record.touched = time.monotonic()
+        self._persist(self._key(key), record)
+    
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._get(key)).data.copy()
+    
+    @property
+    def pending_writes(self) -> int:
+        """عدد الحالات التي لم تُكتب بعد"""
+        return self._writer.pending
+    
+    async def close(self) -> None:
+        """انتظار الحذف الجاري ثم كتابة كل الحالات المعلقة"""
+        if self._purging is not None:
+            await self._purging
+        await self._writer.close()
@@ -0,0 +1,28 @@
+"""
+البحث المضمن: @bot نص
+يُجيب من فهرس الأذكار في الذاكرة (search_index) بصفحات محسوبة مسبقاً أو محفوظة،
+دون أي استعلام لقاعدة البيانات داخل المعالج. النتائج واحدة لكل المستخدمين، فيحتفظ بها تيليجرام cache_time ثانية.
+(يلزم تفعيل الوضع المضمن للبوت من BotFather عبر /setinline)
+"""
+
+from aiogram import Router, types
+from config import AdhkarConfig
+from search_index import get_index, normalize_text
+
+router = Router()
+
+
+@router.inline_query()
+async def inline_search(inline_query: types.InlineQuery):
+    """البحث في الأذكار وإرجاع صفحة من النتائج"""
+    index = await get_index()
+    query = normalize_text(inline_query.query)
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    results, next_offset = index.page(query, offset)
+    
+    await inline_query.answer(
+        list(results),
+        cache_time=AdhkarConfig.INLINE_CACHE_TIME,
+        is_personal=False,
+        next_offset=next_offset,
+    )
@@ -1,8 +1,13 @@
 """
 تعريفات الأزرار والواجهات (Keyboards)
+اللوحات الثابتة تُبنى مرة واحدة لكل دور/معامل ويُعاد استخدامها،
+واللوحات المبنية من قاعدة البيانات تُخزن مؤقتاً وتُبطل عند تغيير بياناتها.
+اللوحات المعادة مشتركة: لا تعدل عليها بعد الحصول عليها.
 """
 
+from functools import lru_cache
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from config import PerformanceConfig
 from database import DatabaseManager
 
 
@@ -10,6 +15,7 @@ from database import DatabaseManager
 # --- القائمة الرئيسية ---
 # ==========================================
 
+@lru_cache(maxsize=None)
 def get_main_keyboard(user_role: str) -> InlineKeyboardMarkup:
     """الحصول على لوحة المفاتيح الرئيسية بناءً على دور المستخدم"""
     markup = InlineKeyboardMarkup(inline_keyboard=[])
@@ -51,6 +57,7 @@ def get_main_keyboard(user_role: str) -> InlineKeyboardMarkup:
 # --- قائمة الأذكار ---
 # ==========================================
 
+@lru_cache(maxsize=None)
 def get_adhkar_settings_keyboard() -> InlineKeyboardMarkup:
     """لوحة مفاتيح اختيار فئة الأذكار"""
     markup = InlineKeyboardMarkup(inline_keyboard=[
@@ -66,6 +73,7 @@ def get_adhkar_settings_keyboard() -> InlineKeyboardMarkup:
     return markup
 
 
+@lru_cache(maxsize=None)
 def get_category_settings_keyboard(category: str) -> InlineKeyboardMarkup:
     """لوحة مفاتيح إعدادات فئة معينة"""
     markup = InlineKeyboardMarkup(inline_keyboard=[])
@@ -106,6 +114,7 @@ def get_category_settings_keyboard(category: str) -> InlineKeyboardMarkup:
 # --- قائمة القنوات (مع التصفح - Pagination) ---
 # ==========================================
 
+@lru_cache(maxsize=None)
 def get_channels_menu_keyboard() -> InlineKeyboardMarkup:
     """لوحة مفاتيح إدارة القنوات"""
     markup = InlineKeyboardMarkup(inline_keyboard=[
@@ -120,20 +129,32 @@ def get_channels_menu_keyboard() -> InlineKeyboardMarkup:
     return markup
 
 
-def get_delete_channels_keyboard(user_id: int, page: int = 0) -> InlineKeyboardMarkup:
+def get_delete_channels_keyboard(user, page: int = 0) -> InlineKeyboardMarkup:
     """
     لوحة مفاتيح حذف القنوات (للمشرفين: الكل، للمستخدمين: الخاصة بهم فقط)
     تدعم التصفح (Pagination) بعرض 10 قنوات في كل صفحة
+    user: سياق المستخدم (UserContext) فلا حاجة لاستعلام الدور
     """
-    markup = InlineKeyboardMarkup(inline_keyboard=[])
-    
-    user_role = DatabaseManager.get_user_role(user_id)
-    
-    channels = []
-    if user_role in ["admin", "owner"]:
+    owner_scope = None if user.role in ["admin", "owner"] else user.user_id
+    return _get_channels_page_keyboard(owner_scope, page)
+
+
+@lru_cache(maxsize=64)
+def _get_channel_rows(owner_scope: int) -> list:
+    """القنوات النشطة كصفوف (channel_id, title) مشتركة بين كل صفحات التصفح"""
+    if owner_scope is None:
         channels = DatabaseManager.get_active_channels()
     else:
-        channels = DatabaseManager.get_user_channels(user_id)
+        channels = DatabaseManager.get_user_channels(owner_scope)
+    return [(channel.channel_id, channel.title) for channel in channels]
+
+
+@lru_cache(maxsize=PerformanceConfig.CACHE_SIZE)
+def _get_channels_page_keyboard(owner_scope: int, page: int) -> InlineKeyboardMarkup:
+    """صفحة قنوات الحذف: owner_scope = None لكل القنوات أو معرف المستخدم لقنواته فقط"""
+    markup = InlineKeyboardMarkup(inline_keyboard=[])
+    
+    channels = _get_channel_rows(owner_scope)
     
     # إعدادات التصفح
     items_per_page = 10
@@ -155,11 +176,11 @@ def get_delete_channels_keyboard(user_id: int, page: int = 0) -> InlineKeyboardM
         ])
     else:
         # عرض القنوات
-        for channel in current_channels:
+        for channel_id, title in current_channels:
             markup.inline_keyboard.append([
                 InlineKeyboardButton(
-                    text=f"❌ {channel.title[:25]}",
-                    callback_data=f"del_ch_{channel.channel_id}"
+                    text=f"❌ {title[:25]}",
+                    callback_data=f"del_ch_{channel_id}"
                 )
             ])
         
@@ -183,10 +204,34 @@ def get_delete_channels_keyboard(user_id: int, page: int = 0) -> InlineKeyboardM
     return markup
 
 
+# ==========================================
+# --- قائمة رفع الملفات ---
+# ==========================================
+
+@lru_cache(maxsize=None)
+def get_upload_menu_keyboard() -> InlineKeyboardMarkup:
+    """لوحة مفاتيح اختيار فئة الملف المرفوع"""
+    markup = InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="☀️ صباح", callback_data="upload_sabah"),
+            InlineKeyboardButton(text="🌙 مساء", callback_data="upload_masaa"),
+            InlineKeyboardButton(text="📖 عام", callback_data="upload_aam")
+        ],
+        [
+            InlineKeyboardButton(text="🔙 رجوع", callback_data="main_menu")
+        ]
+    ])
+    return markup
+
+
 # ==========================================
 # --- قائمة الإذاعة ---
 # ==========================================
 
+BROADCAST_STATUS_ICONS = {"running": "🔄", "paused": "⏸️", "cancelled": "⛔", "done": "✅"}
+
+
+@lru_cache(maxsize=None)
 def get_broadcast_menu_keyboard() -> InlineKeyboardMarkup:
     """لوحة مفاتيح الإذاعة"""
     markup = InlineKeyboardMarkup(inline_keyboard=[
@@ -194,6 +239,9 @@ def get_broadcast_menu_keyboard() -> InlineKeyboardMarkup:
             InlineKeyboardButton(text="📢 للقنوات", callback_data="ask_broadcast_ch"),
             InlineKeyboardButton(text="📢 للخاص", callback_data="ask_broadcast_pm")
         ],
+        [
+            InlineKeyboardButton(text="📋 مهام البث", callback_data="broadcast_jobs")
+        ],
         [
             InlineKeyboardButton(text="🔙 رجوع", callback_data="main_menu")
         ]
@@ -201,10 +249,48 @@ def get_broadcast_menu_keyboard() -> InlineKeyboardMarkup:
     return markup
 
 
+def get_broadcast_jobs_keyboard(jobs: list) -> InlineKeyboardMarkup:
+    """لوحة مفاتيح قائمة مهام البث (تتغير مع تقدم المهام فلا تُخزن)"""
+    markup = InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(
+                text=f"{BROADCAST_STATUS_ICONS.get(job.status, '❔')} #{job.id} - {job.sent}/{job.total}",
+                callback_data=f"bjob_view_{job.id}"
+            )
+        ]
+        for job in jobs
+    ])
+    markup.inline_keyboard.append([
+        InlineKeyboardButton(text="🔙 رجوع", callback_data="menu_broadcast")
+    ])
+    return markup
+
+
+@lru_cache(maxsize=256)
+def get_broadcast_job_keyboard(job_id: int, status: str) -> InlineKeyboardMarkup:
+    """لوحة مفاتيح التحكم بمهمة بث حسب حالتها"""
+    markup = InlineKeyboardMarkup(inline_keyboard=[])
+    controls = []
+    if status == "running":
+        controls.append(InlineKeyboardButton(text="⏸️ إيقاف مؤقت", callback_data=f"bjob_pause_{job_id}"))
+    if status == "paused":
+        controls.append(InlineKeyboardButton(text="▶️ استئناف", callback_data=f"bjob_resume_{job_id}"))
+    if status in ("running", "paused"):
+        controls.append(InlineKeyboardButton(text="⛔ إلغاء", callback_data=f"bjob_cancel_{job_id}"))
+    if controls:
+        markup.inline_keyboard.append(controls)
+    markup.inline_keyboard.append([
+        InlineKeyboardButton(text="🔄 تحديث", callback_data=f"bjob_view_{job_id}"),
+        InlineKeyboardButton(text="🔙 رجوع", callback_data="broadcast_jobs")
+    ])
+    return markup
+
+
 # ==========================================
 # --- قائمة المشرفين ---
 # ==========================================
 
+@lru_cache(maxsize=None)
 def get_admins_menu_keyboard() -> InlineKeyboardMarkup:
     """لوحة مفاتيح إدارة المشرفين"""
     markup = InlineKeyboardMarkup(inline_keyboard=[
@@ -222,6 +308,7 @@ def get_admins_menu_keyboard() -> InlineKeyboardMarkup:
     return markup
 
 
+@lru_cache(maxsize=None)
 def get_delete_admins_keyboard() -> InlineKeyboardMarkup:
     """لوحة مفاتيح حذف المشرفين"""
     markup = InlineKeyboardMarkup(inline_keyboard=[])
@@ -246,6 +333,7 @@ def get_delete_admins_keyboard() -> InlineKeyboardMarkup:
 # --- قائمة التحقق ---
 # ==========================================
 
+@lru_cache(maxsize=None)
 def get_verification_menu_keyboard() -> InlineKeyboardMarkup:
     """لوحة مفاتيح قناة التحقق"""
     markup = InlineKeyboardMarkup(inline_keyboard=[
@@ -266,6 +354,7 @@ def get_verification_menu_keyboard() -> InlineKeyboardMarkup:
 # --- أزرار الإلغاء والرجوع ---
 # ==========================================
 
+@lru_cache(maxsize=256)
 def get_cancel_keyboard(callback_data: str = "main_menu") -> InlineKeyboardMarkup:
     """لوحة مفاتيح الإلغاء والرجوع"""
     markup = InlineKeyboardMarkup(inline_keyboard=[
@@ -276,6 +365,7 @@ def get_cancel_keyboard(callback_data: str = "main_menu") -> InlineKeyboardMarku
     return markup
 
 
+@lru_cache(maxsize=256)
 def get_back_keyboard(callback_data: str = "main_menu") -> InlineKeyboardMarkup:
     """لوحة مفاتيح الرجوع"""
     markup = InlineKeyboardMarkup(inline_keyboard=[
@@ -290,6 +380,7 @@ def get_back_keyboard(callback_data: str = "main_menu") -> InlineKeyboardMarkup:
 # --- أزرار الاشتراك ---
 # ==========================================
 
+@lru_cache(maxsize=256)
 def get_subscription_keyboard(channel_username: str) -> InlineKeyboardMarkup:
     """لوحة مفاتيح الاشتراك"""
     markup = InlineKeyboardMarkup(inline_keyboard=[
@@ -303,4 +394,14 @@ def get_subscription_keyboard(channel_username: str) -> InlineKeyboardMarkup:
             InlineKeyboardButton(text="🔄 تحقق", callback_data="main_menu")
         ]
     ])
-    return markup
\ No newline at end of file
+    return markup
+
+
+# ==========================================
+# --- إبطال اللوحات المبنية من قاعدة البيانات ---
+# ==========================================
+
+DatabaseManager.on_change("categories", get_category_settings_keyboard.cache_clear)
+DatabaseManager.on_change("channels", _get_channel_rows.cache_clear)
+DatabaseManager.on_change("channels", _get_channels_page_keyboard.cache_clear)
+DatabaseManager.on_change("roles", get_delete_admins_keyboard.cache_clear)
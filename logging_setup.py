@@ -0,0 +1,87 @@
+"""
+إعداد السجلات
+- الكتابة عبر طابور في خيط منفصل (enqueue) حتى لا تحجب حلقة الأحداث
+- ملف السجل بصيغة JSON منظمة مع التدوير والاحتفاظ من LogConfig
+- أدوات للأحداث عالية التكرار: تقييد المعدل لكل مفتاح، وتجميع الأخطاء الجماعية في سجل واحد
+"""
+
+import re
+import sys
+import time
+from collections import Counter
+from config import LogConfig
+from loguru import logger
+
+_DIGITS = re.compile(r"-?\d+")
+
+# مفتاح -> آخر وقت تسجيل / عدد السجلات المحذوفة منذه
+_last_logged = {}
+_suppressed = {}
+
+
+def setup_logging(console: bool = True):
+    """استبدال السجلات الافتراضية بسجلات غير حاجبة"""
+    logger.remove()
+    logger.add(
+        LogConfig.LOG_FILE,
+        format=LogConfig.LOG_FORMAT,
+        level=LogConfig.LOG_LEVEL,
+        rotation=f"{LogConfig.LOG_FILE_SIZE} MB",
+        retention=LogConfig.LOG_BACKUP_COUNT,
+        serialize=LogConfig.LOG_JSON,
+        encoding="utf-8",
+        enqueue=True
+    )
+    if console:
+        logger.add(
+            sys.stdout,
+            format="{time:HH:mm:ss} | {level: <8} | {message}",
+            level=LogConfig.LOG_LEVEL,
+            colorize=False,
+            enqueue=True
+        )
+
+
+def setup_worker_logging():
+    """سجلات عمليات النشر الفرعية: stderr فقط (ملف السجل الدوّار تكتبه العملية الرئيسية وحدها)"""
+    logger.remove()
+    logger.add(sys.stderr, format="{time:HH:mm:ss} | {level: <8} | {message}", level=LogConfig.LOG_LEVEL, colorize=False)
+
+
+def log_throttled(level: str, key: str, message: str, interval: float = LogConfig.LOG_THROTTLE_INTERVAL) -> bool:
+    """
+    تسجيل رسالة مرة واحدة على الأكثر لكل مفتاح خلال الفترة المحددة
+    عدد الرسائل المحذوفة يُضاف للرسالة التالية التي تُسجل
+    """
+    now = time.monotonic()
+    last = _last_logged.get(key)
+    if last is not None and now - last < interval:
+        _suppressed[key] = _suppressed.get(key, 0) + 1
+        return False
+    _last_logged[key] = now
+    suppressed = _suppressed.pop(key, 0)
+    if suppressed:
+        message = f"{message} (+{suppressed} مماثلة خلال آخر {interval:.0f} ثانية)"
+    logger.opt(depth=1).log(level, message)
+    return True
+
+
+def _error_kind(error) -> str:
+    """توحيد نص الخطأ (حذف الأرقام والمعرفات) لتجميع الأخطاء المتشابهة"""
+    return _DIGITS.sub("N", str(error))[:120]
+
+
+def log_aggregated(level: str, message: str, failures: list, total: int = None, examples: int = 5):
+    """
+    سجل واحد يلخص عملية جماعية بدلاً من سطر لكل عنصر
+    failures: قائمة (العنصر, الخطأ)
+    """
+    if not failures:
+        return
+    by_kind = Counter(_error_kind(error) for _, error in failures)
+    breakdown = "، ".join(f"{kind} ×{count}" for kind, count in by_kind.most_common(5))
+    sample = ", ".join(str(item) for item, _ in failures[:examples])
+    count = f"{len(failures)}/{total}" if total is not None else str(len(failures))
+    logger.opt(depth=1).bind(
+        failed=len(failures), total=total, errors=dict(by_kind)
+    ).log(level, f"{message}: {count} | {breakdown} | أمثلة: {sample}")
@@ -3,40 +3,26 @@
 يجمع جميع المكونات ويشغل البوت
 """
 
+import time
+
+# بداية قياس زمن الإقلاع (قبل أي استيراد ثقيل)
+PROCESS_START = time.perf_counter()
+
 import asyncio
 import os
 from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher, types
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand
 from loguru import logger
+from config import DiagnosticsConfig, MetricsConfig, SecurityConfig, WebhookConfig
+from logging_setup import setup_logging
 
-# استيراد المكونات
-from database import DatabaseManager, init_db
-from auto_poster import get_auto_poster
-from commands import router as commands_router
-from text_handlers import router as text_handlers_router
-from callback_handlers import router as callback_handlers_router
-from file_handlers import router as file_handlers_router
-from bot_utils import ensure_file_exists
+# المكونات الثقيلة (قاعدة البيانات، المعالجات، النشر التلقائي)
+# تُستورد داخل الدوال عند الحاجة لتسريع الإقلاع
 
 # تحميل متغيرات البيئة
 load_dotenv()
 
-# إعداد السجلات
-logger.remove()
-logger.add(
-    "logs/bot.log",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}",
-    level="INFO",
-    encoding="utf-8"
-)
-logger.add(
-    lambda msg: print(msg, end=""),
-    format="{time:HH:mm:ss} | {level: <8} | {message}",
-    level="INFO"
-)
-
 # الحصول على التوكن والإعدادات
 TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 ADMINS_ID_STR = os.getenv('ADMINS_ID', '')
@@ -51,55 +37,6 @@ os.makedirs("logs", exist_ok=True)
 os.makedirs("data", exist_ok=True)
 
 
-# ==========================================
-# --- مهمة فحص القنوات (جديدة) ---
-# ==========================================
-
-async def check_and_remove_kicked_channels(bot: Bot):
-    """
-    وظيفة تعمل في الخلفية للتحقق من القنوات وحذف التي طُرد منها البوت
-    """
-    while True:
-        try:
-            logger.info("🔍 جاري فحص حالة البوت في القنوات...")
-            channels = DatabaseManager.get_active_channels()
-            removed_count = 0
-            
-            for channel in channels:
-                try:
-                    # محاولة جلب عضوية البوت في القناة
-                    member = await bot.get_chat_member(channel.channel_id, bot.id)
-                    
-                    # التحقق من الحالة: نحذف فقط إذا غادر (left) أو طُرد (kicked)
-                    # نحتفظ بالقناة إذا كان: administrator, creator, member
-                    if member.status in ["left", "kicked"]:
-                        logger.warning(f"⚠️ سيتم حذف القناة {channel.title} ({channel.channel_id}) - البوت ليس فيها.")
-                        # استخدام الدالة الآمنة التي تعالج قاعدة البيانات بشكل صحيح
-                        DatabaseManager.delete_channel_safe(channel.channel_id)
-                        removed_count += 1
-                
-                except Exception as e:
-                    # إذا فشل جلب العضوية (البوت محظور أو القناة محذوفة)
-                    error_msg = str(e)
-                    if "Bot was blocked" in error_msg or "Chat not found" in error_msg or "Forbidden" in error_msg:
-                        logger.warning(f"⚠️ سيتم حذف القناة {channel.title} بسبب خطأ في الوصول: {error_msg}")
-                        DatabaseManager.delete_channel_safe(channel.channel_id)
-                        removed_count += 1
-            
-            if removed_count > 0:
-                logger.success(f"🗑️ تم تنظيف القائمة وحذف {removed_count} قناة.")
-            else:
-                logger.info("✅ جميع القنوات صالحة.")
-            
-            # انتظار ساعة واحدة
-            await asyncio.sleep(3600) 
-            
-        except Exception as main_e:
-            logger.error(f"❌ خطأ في مهمة فحص القنوات: {main_e}")
-            # انتظار 10 دقائق قبل إعادة المحاولة
-            await asyncio.sleep(600)
-
-
 # ==========================================
 # --- تهيئة البوت ---
 # ==========================================
@@ -115,84 +52,234 @@ async def setup_bot_commands(bot: Bot):
 
 
 async def init_database():
-    """تهيئة قاعدة البيانات"""
-    init_db()
+    """
+    تهيئة قاعدة البيانات في معاملة واحدة ثم فهرسة ملفات الأذكار
+    (تعمل في خيط منفصل حتى لا تحجب حلقة الأحداث)
+    """
+    from database import DatabaseManager
+    from bot_utils import index_corpora
+    
+    file_paths = await asyncio.to_thread(DatabaseManager.bootstrap, ADMINS_ID)
+    total = await asyncio.to_thread(index_corpora, file_paths)
     
-    # تهيئة فئات الأذكار
-    DatabaseManager.init_categories()
+    logger.info(f"✅ تم تهيئة قاعدة البيانات وفهرسة {total} ذكر")
     
-    # التأكد من وجود ملفات الأذكار
-    categories = ["sabah", "masaa", "aam"]
-    for category in categories:
-        cat_obj = DatabaseManager.get_category(category)
-        if cat_obj:
-            ensure_file_exists(cat_obj.file_path)
+    # فهرس البحث المضمن (يُبنى هنا حتى لا ينتظره أول استعلام)
+    from search_index import get_index
+    await get_index()
+
+
+def register_routers(dp: Dispatcher) -> list:
+    """استيراد وتسجيل المعالجات (Routers)"""
+    from commands import router as commands_router
+    from text_handlers import router as text_handlers_router
+    from callback_handlers import router as callback_handlers_router
+    from file_handlers import router as file_handlers_router
+    from membership import router as membership_router
+    from inline_handlers import router as inline_handlers_router
     
-    # إضافة المالك إلى قاعدة البيانات
-    if ADMINS_ID:
-        for admin_id in ADMINS_ID:
-            user = DatabaseManager.get_user(admin_id)
-            if not user:
-                DatabaseManager.add_user(admin_id, "Owner", None, "owner")
-            else:
-                DatabaseManager.set_user_role(admin_id, "owner")
+    dp.include_router(commands_router)
+    dp.include_router(text_handlers_router)
+    dp.include_router(callback_handlers_router)
+    dp.include_router(file_handlers_router)
+    dp.include_router(membership_router)
+    dp.include_router(inline_handlers_router)
     
-    logger.info("✅ تم تهيئة قاعدة البيانات")
+    return [
+        commands_router, text_handlers_router, callback_handlers_router, file_handlers_router,
+        membership_router, inline_handlers_router
+    ]
+
+
+async def setup_metrics(bot: Bot, routers: list, storage):
+    """تفعيل المقاييس: المعالجات، طلبات Bot API، قاعدة البيانات، والطوابير"""
+    import metrics
+    from database import get_engine
+    
+    metrics.instrument_routers(routers)
+    bot.session.middleware(metrics.BotAPIMetricsMiddleware())
+    metrics.instrument_engine(get_engine())
+    metrics.track_queue("fsm_writes", lambda: storage.pending_writes)
+    
+    try:
+        return await metrics.start_metrics_server(MetricsConfig.HOST, MetricsConfig.PORT)
+    except OSError as e:
+        logger.error(f"❌ تعذر تشغيل خادم المقاييس: {e}")
+        return None
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    """تشغيل البوت بوضع الـ Webhook عبر خادم aiohttp مدمج"""
+    from webhook_server import WebhookServer
+    
+    if not WebhookConfig.BASE_URL:
+        raise RuntimeError("WEBHOOK_URL غير محدد في ملف .env")
+    if not WebhookConfig.SECRET:
+        # بدون الرمز السري يقبل العنوان العام تحديثات مزيفة من أي جهة
+        raise RuntimeError("WEBHOOK_SECRET غير محدد في ملف .env (مطلوب في وضع الـ Webhook)")
+    
+    server = WebhookServer(
+        dp,
+        bot,
+        path=WebhookConfig.PATH,
+        secret=WebhookConfig.SECRET,
+        queue_size=WebhookConfig.QUEUE_SIZE,
+        workers=WebhookConfig.WORKERS
+    )
+    await server.start(WebhookConfig.HOST, WebhookConfig.PORT)
+    
+    if MetricsConfig.ENABLED:
+        from metrics import track_queue
+        track_queue("webhook_updates", server.queue.qsize)
+    
+    # لا نحذف التحديثات المعلقة حتى لا يضيع ما وصل أثناء إعادة التشغيل
+    await bot.set_webhook(
+        WebhookConfig.BASE_URL.rstrip("/") + WebhookConfig.PATH,
+        secret_token=WebhookConfig.SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+        drop_pending_updates=False
+    )
+    logger.info("✅ تم تسجيل الـ Webhook لدى تيليجرام")
+    
+    await dp.emit_startup(bot=bot)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+        await dp.emit_shutdown(bot=bot)
+
+
+def setup_diagnostics(dp: Dispatcher):
+    """تفعيل رصد الاستعلامات والمعالجات البطيئة وحجب حلقة الأحداث"""
+    import diagnostics
+    from database import get_engine
+    
+    diagnostics.instrument_engine(get_engine())
+    dp.update.outer_middleware(diagnostics.SlowHandlerMiddleware())
+    
+    monitor = diagnostics.LoopLagMonitor()
+    monitor.start()
+    return monitor
 
 
 async def main():
     """الدالة الرئيسية للبوت"""
+    # إعداد السجلات (كتابة غير حاجبة عبر طابور) - هنا لا عند الاستيراد، لأن عمال النشر
+    # يعيدون استيراد هذا الملف (spawn) ولا يجوز أن يفتح كل منهم ملف السجل الدوّار
+    setup_logging()
+    import database  # noqa: F401 - استيراد مسبق قبل بدء خيط التهيئة
+    from middlewares import RateLimitMiddleware, StartupTimerMiddleware
+    from bot_session import create_bot
+    from fsm_storage import SQLiteStorage
     
     # إنشاء البوت والـ Dispatcher
-    bot = Bot(token=TOKEN)
-    storage = MemoryStorage()
+    bot = create_bot(TOKEN)
+    storage = SQLiteStorage()
     dp = Dispatcher(storage=storage)
+    dp.update.outer_middleware(StartupTimerMiddleware(PROCESS_START))
+    if SecurityConfig.ENABLE_RATE_LIMITING:
+        dp.update.outer_middleware(RateLimitMiddleware())
+    if SecurityConfig.ENABLE_SUBSCRIPTION_CHECK:
+        from subscription import get_subscription_gate
+        subscription_gate = get_subscription_gate()
+        dp.message.outer_middleware(subscription_gate)
+        dp.callback_query.outer_middleware(subscription_gate)
+    # تحميل المستخدم مرة واحدة لكل تحديث (بعد التحقق من الاشتراك)
+    from user_context import get_user_context_middleware
+    user_context = get_user_context_middleware()
+    dp.message.outer_middleware(user_context)
+    dp.callback_query.outer_middleware(user_context)
     
-    # تهيئة قاعدة البيانات
-    await init_database()
+    # تهيئة قاعدة البيانات وإعداد الأوامر بشكل متزامن
+    init_tasks = [
+        asyncio.create_task(init_database()),
+        asyncio.create_task(setup_bot_commands(bot)),
+    ]
+    await asyncio.sleep(0)
     
-    # إعداد أوامر البوت
-    await setup_bot_commands(bot)
+    # تسجيل المعالجات أثناء انتظار مهام التهيئة
+    routers = register_routers(dp)
     
-    # تسجيل المعالجات (Routers)
-    dp.include_router(commands_router)
-    dp.include_router(text_handlers_router)
-    dp.include_router(callback_handlers_router)
-    dp.include_router(file_handlers_router)
+    await asyncio.gather(*init_tasks)
+    
+    metrics_runner = None
+    if MetricsConfig.ENABLED:
+        metrics_runner = await setup_metrics(bot, routers, storage)
+    
+    lag_monitor = None
+    if DiagnosticsConfig.ENABLED:
+        lag_monitor = setup_diagnostics(dp)
     
     # ==========================================
     # تشغيل مهمة فحص القنوات في الخلفية
     # ==========================================
-    loop = asyncio.get_event_loop()
-    loop.create_task(check_and_remove_kicked_channels(bot))
-    logger.info("🔄 تم تفعيل الفحص الدوري للقنوات (كل ساعة).")
+    from membership import get_membership_tracker, reconcile_channels
+    reconcile_task = asyncio.create_task(reconcile_channels(bot))
+    logger.info("🔄 تم تفعيل تتبع عضوية القنوات (my_chat_member) مع مطابقة احتياطية.")
     # ==========================================
     
     # بدء نظام النشر التلقائي
+    from auto_poster import get_auto_poster
     auto_poster = get_auto_poster(bot)
     auto_poster_task = asyncio.create_task(auto_poster.start())
     
-    logger.info("🚀 تم بدء تشغيل البوت بنجاح...")
+    # استئناف مهام البث التي انقطعت
+    from broadcaster import get_broadcast_manager
+    broadcast_manager = get_broadcast_manager(bot)
+    await broadcast_manager.resume_pending()
+    
+    logger.info(f"🚀 تم بدء تشغيل البوت بنجاح خلال {time.perf_counter() - PROCESS_START:.3f} ثانية...")
     
     try:
         # بدء استقبال الرسائل
-        await dp.start_polling(
-            bot,
-            allowed_updates=dp.resolve_used_update_types(),
-            skip_updates=True
-        )
+        if WebhookConfig.MODE == "webhook":
+            await run_webhook(dp, bot)
+        else:
+            await dp.start_polling(
+                bot,
+                allowed_updates=dp.resolve_used_update_types(),
+                skip_updates=True
+            )
     except KeyboardInterrupt:
         logger.info("⏸️ تم إيقاف البوت من قبل المستخدم")
     except Exception as e:
         logger.error(f"❌ خطأ في البوت: {e}")
     finally:
-        # إيقاف نظام النشر التلقائي
-        await auto_poster.stop()
-        auto_poster_task.cancel()
+        from bot_pool import get_bot_pool
+        from reachability import get_reachability_tracker
+        from shutdown import ShutdownCoordinator, cancel_task
+        shutdown = ShutdownCoordinator()
+        
+        # (1) لا عمل جديد: إيقاف الجدولة ومطابقة القنوات
+        shutdown.add("intake", "auto_poster.intake", auto_poster.stop_intake)
+        shutdown.add("intake", "reconcile", lambda: cancel_task(reconcile_task))
+        
+        # (2) الإرسال الجاري: يكتمل ضمن المهلة أو يُحفظ ليُستأنف بعد إعادة التشغيل
+        shutdown.add("drain", "auto_poster", auto_poster.drain, bounded=True)
+        shutdown.add("drain", "broadcasts", broadcast_manager.stop, bounded=True)
         
-        # إغلاق البوت
-        await bot.session.close()
+        # (3) طوابير الكتابة: أوقات النشر وسجل الإرسال، حالات المحادثة، أوقات التفاعل...
+        shutdown.add("flush", "auto_poster.writers", auto_poster.close)
+        shutdown.add("flush", "reachability", get_reachability_tracker().close)
+        shutdown.add("flush", "membership", get_membership_tracker().close)
+        shutdown.add("flush", "fsm_storage", storage.close)
+        shutdown.add("flush", "user_context", user_context.close)
+        if SecurityConfig.ENABLE_SUBSCRIPTION_CHECK:
+            shutdown.add("flush", "subscription", subscription_gate.close)
+        
+        # (4) الإغلاق
+        if metrics_runner:
+            shutdown.add("close", "metrics", metrics_runner.cleanup)
+        if lag_monitor:
+            shutdown.add("close", "lag_monitor", lag_monitor.stop)
+        shutdown.add("close", "bot_pool", get_bot_pool(bot).close)
+        shutdown.add("close", "bot_session", bot.session.close)
+        
+        await shutdown.run()
         logger.info("✅ تم إغلاق البوت بنجاح")
+        
+        # انتظار كتابة السجلات المتبقية في الطابور
+        await logger.complete()
 
 
 # ==========================================
@@ -0,0 +1,150 @@
+"""
+أذكار الوسائط وذاكرة معرفات الملفات (file_id)
+يمكن أن يبدأ الذكر في ملف الأذكار بسطر يحدد ملف وسائط، وبقية النص تعليق عليه:
+
+    [photo] media/sabah.jpg
+    أصبحنا وأصبح الملك لله
+
+الأنواع المدعومة: photo، video، voice، audio، document، animation.
+يُرفع كل ملف مرة واحدة فقط، ثم يُرسل بالمعرف الذي أعاده تيليجرام (محفوظ في media_files)،
+ويُعاد الرفع تلقائياً إذا تغيّر الملف على القرص.
+"""
+
+import asyncio
+import os
+import re
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional
+from aiogram import Bot
+from aiogram.types import Message
+from database import DatabaseManager
+from loguru import logger
+
+# نوع الوسائط -> دالة الإرسال في Bot
+MEDIA_METHODS = {
+    "photo": "send_photo",
+    "video": "send_video",
+    "voice": "send_voice",
+    "audio": "send_audio",
+    "document": "send_document",
+    "animation": "send_animation",
+}
+
+_DIRECTIVE = re.compile(r"^\[(%s)\]\s*(.+)$" % "|".join(MEDIA_METHODS))
+
+
+class MediaEntry(NamedTuple):
+    """ذكر وسائط في ملف الأذكار"""
+    kind: str
+    path: str
+    caption: str
+
+
+class MediaPost(NamedTuple):
+    """رسالة وسائط جاهزة للإرسال (media: file_id أو FSInputFile)"""
+    kind: str
+    media: Any
+    caption: str
+
+
+@lru_cache(maxsize=4096)
+def parse_media_entry(text: str) -> Optional[MediaEntry]:
+    """تحليل سطر الوسائط في بداية الذكر (None للأذكار النصية)"""
+    first_line, _, caption = text.partition("\n")
+    match = _DIRECTIVE.match(first_line.strip())
+    if not match:
+        return None
+    return MediaEntry(match.group(1), match.group(2).strip(), caption.strip())
+
+
+async def send_content(bot: Bot, chat_id: int, content) -> Message:
+    """إرسال نص (HTML) أو رسالة وسائط"""
+    if isinstance(content, MediaPost):
+        method = getattr(bot, MEDIA_METHODS[content.kind])
+        return await method(chat_id, content.media, caption=content.caption or None, parse_mode="HTML")
+    return await bot.send_message(chat_id, content, parse_mode="HTML")
+
+
+def extract_file_id(message: Message, kind: str) -> Optional[str]:
+    """معرف الملف من رسالة الوسائط المرسلة (أكبر مقاس في حالة الصور)"""
+    media = getattr(message, kind, None)
+    if kind == "photo" and media:
+        media = media[-1]
+    return media.file_id if media else None
+
+
+class MediaCache:
+    """ذاكرة معرفات الوسائط: المسار -> (النوع، file_id، البصمة) مع الحفظ في قاعدة البيانات"""
+    
+    def __init__(self, bot_index: int = 0):
+        # معرفات الملفات خاصة بكل بوت: بوتات المجمع تحفظ معرفاتها بمفتاح "المسار#الفهرس"
+        self.bot_index = bot_index
+        self._files = None
+        self._loading = asyncio.Lock()
+        # الرفع الجاري لكل ملف -> معرفه عند انتهائه (None إذا فشل)
+        self._uploads: Dict[str, asyncio.Future] = {}
+    
+    def _key(self, path: str) -> str:
+        return f"{path}#{self.bot_index}" if self.bot_index else path
+    
+    @staticmethod
+    def fingerprint(path: str) -> Optional[str]:
+        """بصمة الملف على القرص (None إذا لم يكن موجوداً)"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+    
+    async def _ensure_loaded(self):
+        if self._files is not None:
+            return
+        async with self._loading:
+            if self._files is None:
+                self._files = await asyncio.to_thread(DatabaseManager.get_media_files)
+    
+    async def get(self, entry: MediaEntry) -> Optional[str]:
+        """معرف الملف المحفوظ إذا لم يتغير الملف منذ رفعه"""
+        await self._ensure_loaded()
+        cached = self._files.get(self._key(entry.path))
+        if cached is None or cached[0] != entry.kind:
+            return None
+        if cached[2] != self.fingerprint(entry.path):
+            return None
+        return cached[1]
+    
+    async def wait_upload(self, entry: MediaEntry) -> Optional[str]:
+        """انتظار رفع جارٍ لنفس الملف من نشر آخر (None إذا لم يكن هناك رفع جارٍ أو فشل)"""
+        future = self._uploads.get(self._key(entry.path))
+        if future is None:
+            return None
+        return await asyncio.shield(future)
+    
+    @asynccontextmanager
+    async def uploading(self, entry: MediaEntry):
+        """تسجيل رفع جارٍ حتى ينتظر معرفَه من يطلب نفس الملف بدلاً من رفعه مرة أخرى"""
+        key = self._key(entry.path)
+        future = asyncio.get_running_loop().create_future()
+        self._uploads[key] = future
+        try:
+            yield
+        finally:
+            del self._uploads[key]
+            if not future.done():
+                future.set_result(None)
+    
+    async def remember(self, entry: MediaEntry, file_id: str):
+        """حفظ معرف ملف بعد أول رفع ناجح"""
+        await self._ensure_loaded()
+        fingerprint = self.fingerprint(entry.path)
+        key = self._key(entry.path)
+        self._files[key] = (entry.kind, file_id, fingerprint)
+        future = self._uploads.get(key)
+        if future is not None and not future.done():
+            future.set_result(file_id)
+        try:
+            await asyncio.to_thread(DatabaseManager.save_media_file, key, entry.kind, file_id, fingerprint)
+        except Exception as e:
+            logger.error(f"❌ خطأ في حفظ معرف الملف {entry.path}: {e}")
+        logger.info(f"📎 تم رفع {entry.path} وحفظ معرفه")
@@ -0,0 +1,136 @@
+"""
+تتبع عضوية البوت في القنوات لحظياً عبر تحديثات my_chat_member
+كل تغيير (رفع البوت مشرفاً، تنزيله، طرده...) يُحدّث is_active وحالة الإشراف في جدول القنوات
+عبر كاتب دفعات، بدلاً من فحص كل القنوات بـ get_chat_member كل ساعة.
+يبقى فحص مطابقة احتياطي نادر وبمعدل محدود للقنوات التي لم يصل عنها أي حدث منذ مدة طويلة.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from aiogram import Bot, Router, types
+from batch_writer import BatchWriter
+from bot_session import bulk_lane
+from config import PerformanceConfig
+from database import DatabaseManager
+from logging_setup import log_aggregated
+from reachability import classify_error
+from loguru import logger
+
+router = Router()
+
+ADMIN_STATUSES = ("creator", "administrator")
+MEMBER_STATUSES = ("member", "restricted")
+
+
+class MembershipTracker:
+    """تجميع حالات البوت في القنوات وكتابتها على دفعات (آخر حالة لكل قناة)"""
+    
+    def __init__(self, flush_interval: float = 2.0):
+        self._writer = BatchWriter(
+            DatabaseManager.save_channel_memberships, "channel_memberships", flush_interval=flush_interval
+        )
+    
+    def record(self, chat_id, status: str, is_admin: bool, is_active: bool):
+        self._writer.put(str(chat_id), (str(chat_id), status, is_admin, is_active, datetime.utcnow()))
+    
+    def observe(self, chat_id, member: types.ChatMember, chat_type: Optional[str] = None):
+        """
+        تسجيل عضوية البوت في محادثة
+        في القنوات يلزم أن يكون البوت مشرفاً ليتمكن من النشر، وفي المجموعات تكفي العضوية
+        (chat_type غير معروف في فحص المطابقة فتُقبل العضوية العادية كما كان سابقاً)
+        """
+        status = str(getattr(member.status, "value", member.status))
+        is_admin = status in ADMIN_STATUSES and (
+            status == "creator" or getattr(member, "can_post_messages", None) is not False
+        )
+        is_active = is_admin or (status in MEMBER_STATUSES and chat_type != "channel")
+        self.record(chat_id, status, is_admin, is_active)
+    
+    async def close(self):
+        """كتابة ما تبقى"""
+        await self._writer.close()
+
+
+# إنشاء مثيل من النظام
+membership_tracker_instance = None
+
+
+def get_membership_tracker() -> MembershipTracker:
+    """الحصول على متتبع العضوية"""
+    global membership_tracker_instance
+    if membership_tracker_instance is None:
+        membership_tracker_instance = MembershipTracker()
+    return membership_tracker_instance
+
+
+# ==========================================
+# --- أحداث العضوية ---
+# ==========================================
+
+@router.my_chat_member()
+async def on_my_chat_member(update: types.ChatMemberUpdated, bot: Bot):
+    """تغيّر حالة البوت في محادثة (إضافة، رفع/تنزيل إشراف، طرد)"""
+    from bot_pool import get_bot_pool
+    
+    bot_pool = get_bot_pool(bot)
+    await bot_pool.load()
+    if bot_pool.owner_of(update.chat.id):
+        # القناة تابعة لبوت آخر من المجمع: حالة البوت الرئيسي فيها لا تؤثر على النشر
+        return
+    get_membership_tracker().observe(update.chat.id, update.new_chat_member, update.chat.type)
+    logger.debug(
+        f"📡 حالة البوت في {update.chat.id}: "
+        f"{update.old_chat_member.status} → {update.new_chat_member.status}"
+    )
+
+
+# ==========================================
+# --- فحص المطابقة الاحتياطي ---
+# ==========================================
+
+async def reconcile_channels(
+    bot: Bot,
+    interval: float = PerformanceConfig.CHANNEL_RECONCILE_INTERVAL,
+    stale_after: float = PerformanceConfig.CHANNEL_RECONCILE_STALE_AFTER,
+    rate: float = PerformanceConfig.CHANNEL_RECONCILE_RATE
+):
+    """
+    فحص القنوات التي لم يصل عنها حدث أو فحص منذ stale_after فقط، بمعدل محدود
+    (لالتقاط الأحداث الفائتة أثناء توقف البوت)
+    """
+    from bot_pool import get_bot_pool
+    
+    tracker = get_membership_tracker()
+    bot_pool = get_bot_pool(bot)
+    
+    while True:
+        try:
+            channel_ids = await asyncio.to_thread(
+                DatabaseManager.get_channels_to_reconcile, datetime.utcnow() - timedelta(seconds=stale_after)
+            )
+            await bot_pool.load()
+            removed = []
+            for channel_id in channel_ids:
+                try:
+                    # الفحص بالبوت المسؤول عن القناة
+                    owner = bot_pool.bot_for(channel_id)
+                    with bulk_lane():
+                        member = await owner.get_chat_member(channel_id, owner.id)
+                    tracker.observe(channel_id, member)
+                    if member.status in ("left", "kicked"):
+                        removed.append((channel_id, f"status={member.status}"))
+                except Exception as e:
+                    if classify_error(str(e)) == "unreachable":
+                        tracker.record(channel_id, "left", False, False)
+                        removed.append((channel_id, str(e)))
+                await asyncio.sleep(1 / rate)
+            
+            if removed:
+                # سجل واحد مجمع بدلاً من سطر لكل قناة
+                log_aggregated("WARNING", "⚠️ قنوات لم يعد البوت فيها", removed, len(channel_ids))
+            logger.info(f"🔍 مطابقة القنوات: تم فحص {len(channel_ids)} قناة بدون أحداث حديثة")
+        except Exception as e:
+            logger.error(f"❌ خطأ في مهمة مطابقة القنوات: {e}")
+        
+        await asyncio.sleep(interval)
@@ -0,0 +1,259 @@
+"""
+المقاييس الرقمية (Metrics) بصيغة Prometheus
+عدادات ومدرجات تكرارية خفيفة بدون أقفال (الزيادة مجرد عملية على قاموس)،
+مع خادم HTTP محلي يعرضها على /metrics.
+"""
+
+import bisect
+import time
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject
+from aiohttp import web
+from loguru import logger
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# ==========================================
+# --- أنواع المقاييس ---
+# ==========================================
+
+class Counter:
+    """عداد تراكمي"""
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+    
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def collect(self) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in self._values.items()]
+
+
+class Gauge:
+    """قيمة لحظية (يمكن ربطها بدالة تُقرأ عند العرض)"""
+    kind = "gauge"
+    
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._callbacks = {}
+    
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+    
+    def set_function(self, fn: Callable[[], float], *labels):
+        """ربط القيمة بدالة (مثل حجم طابور)"""
+        self._callbacks[labels] = fn
+    
+    def collect(self) -> list:
+        values = dict(self._values)
+        for labels, fn in self._callbacks.items():
+            try:
+                values[labels] = fn()
+            except Exception:
+                continue
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in values.items()]
+
+
+class Histogram:
+    """مدرج تكراري للأزمنة (بالثواني)"""
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+    
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            # [عدادات الفئات..., عدد القيم, المجموع]
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += 1
+        series[-1] += value
+    
+    def collect(self) -> list:
+        lines = []
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """سجل المقاييس"""
+    
+    def __init__(self):
+        self._metrics = []
+    
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HANDLER_LATENCY = REGISTRY.register(Histogram(
+    "adhkar_handler_duration_seconds", "Handler execution time", ("event", "handler")
+))
+HANDLER_ERRORS = REGISTRY.register(Counter(
+    "adhkar_handler_errors_total", "Handlers that raised an exception", ("event", "handler")
+))
+BOT_API_LATENCY = REGISTRY.register(Histogram(
+    "adhkar_bot_api_duration_seconds", "Bot API request latency", ("method",)
+))
+BOT_API_CALLS = REGISTRY.register(Counter(
+    "adhkar_bot_api_requests_total", "Bot API requests by outcome", ("method", "outcome")
+))
+DB_QUERY_LATENCY = REGISTRY.register(Histogram(
+    "adhkar_db_query_duration_seconds", "Database statement execution time", ("statement",)
+))
+POSTER_RUN_DURATION = REGISTRY.register(Histogram(
+    "adhkar_poster_run_duration_seconds", "Duration of one auto poster cycle",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800)
+))
+POSTER_SENDS = REGISTRY.register(Counter(
+    "adhkar_poster_sends_total", "Channel sends by the auto poster", ("outcome",)
+))
+RATE_LIMITED = REGISTRY.register(Counter(
+    "adhkar_rate_limited_updates_total", "Updates dropped by the per-user rate limiter", ("event",)
+))
+API_LANE_REQUESTS = REGISTRY.register(Counter(
+    "adhkar_api_lane_requests_total", "Bot API requests by lane and outcome", ("lane", "outcome")
+))
+API_LANE_WAIT = REGISTRY.register(Histogram(
+    "adhkar_api_lane_wait_seconds", "Time a request waited for its lane rate budget", ("lane",)
+))
+API_LANE_IN_FLIGHT = REGISTRY.register(Gauge(
+    "adhkar_api_lane_in_flight", "Bot API requests in flight by lane", ("lane",)
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "adhkar_queue_depth", "Items waiting in internal queues", ("queue",)
+))
+
+
+# ==========================================
+# --- أدوات القياس ---
+# ==========================================
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """قياس زمن كل معالج (Inner Middleware على الموجهات)"""
+    
+    def __init__(self, event_name: str):
+        self.event_name = event_name
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(self.event_name, name)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - started, self.event_name, name)
+
+
+class BotAPIMetricsMiddleware(BaseRequestMiddleware):
+    """قياس زمن ونتيجة طلبات Bot API حسب الطريقة"""
+    
+    async def __call__(self, make_request, bot, method):
+        name = getattr(method, "__api_method__", type(method).__name__)
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            BOT_API_LATENCY.observe(time.perf_counter() - started, name)
+            BOT_API_CALLS.inc(name, outcome)
+
+
+def instrument_routers(routers: list):
+    """إضافة قياس زمن المعالجات لكل الموجهات"""
+    for router in routers:
+        router.message.middleware(HandlerMetricsMiddleware("message"))
+        router.callback_query.middleware(HandlerMetricsMiddleware("callback_query"))
+
+
+def instrument_engine(engine):
+    """قياس زمن الاستعلامات (من مستمعي db_timing المشتركين)"""
+    from db_timing import on_query
+    
+    def observe(statement, parameters, duration):
+        verb = statement.lstrip().split(" ", 1)[0].upper()
+        DB_QUERY_LATENCY.observe(duration, verb)
+    
+    on_query(engine, observe)
+
+
+def track_queue(name: str, fn: Callable[[], float]):
+    """تسجيل طابور لعرض عمقه"""
+    QUEUE_DEPTH.set_function(fn, name)
+
+
+# ==========================================
+# --- خادم المقاييس ---
+# ==========================================
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """تشغيل خادم HTTP محلي يعرض /metrics"""
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+    
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"📈 المقاييس متاحة على http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,136 @@
+"""
+الوسائط (Middlewares) الخاصة بالبوت
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from config import BotConfig, SecurityConfig
+from metrics import RATE_LIMITED
+from loguru import logger
+
+
+# ==========================================
+# --- قياس زمن الإقلاع ---
+# ==========================================
+
+class StartupTimerMiddleware(BaseMiddleware):
+    """
+    قياس الزمن من بدء العملية حتى معالجة أول تحديث (time-to-first-update)
+    """
+    
+    def __init__(self, process_start: float):
+        self.process_start = process_start
+        self.first_update_seen = False
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not self.first_update_seen:
+            self.first_update_seen = True
+            elapsed = time.perf_counter() - self.process_start
+            logger.info(f"⏱️ زمن الوصول لأول تحديث: {elapsed:.3f} ثانية")
+        return await handler(event, data)
+
+
+# ==========================================
+# --- تحديد معدل الطلبات لكل مستخدم ---
+# ==========================================
+
+class RateLimitMiddleware(BaseMiddleware):
+    """
+    تحديد المعدل بدلو رموز (Token Bucket) لكل مستخدم في الذاكرة
+    التحديثات الزائدة تُسقط قبل أي معالج أو استعلام لقاعدة البيانات،
+    وضغطات الأزرار المسقطة يُرد عليها برد خفيف (مرة كل answer_interval لكل مستخدم) حتى لا يبقى مؤشر التحميل.
+    يُقيَّد فقط ما يرسله المستخدم مباشرة (الرسائل والأزرار)، أما تحديثات العضوية (my_chat_member) والبحث المضمن
+    فتمر دائماً: سلسلة منها متتالية طبيعية ولا يجوز فقدانها
+    """
+    
+    # أنواع التحديثات التي تخضع للتقييد
+    THROTTLED = frozenset({"message", "callback_query"})
+    
+    def __init__(
+        self,
+        rate: float = SecurityConfig.RATE_LIMIT,
+        burst: float = None,
+        idle_ttl: float = 300,
+        sweep_every: int = 1000,
+        answer_interval: float = 1.0
+    ):
+        self.rate = rate
+        self.burst = burst or rate
+        self.idle_ttl = idle_ttl
+        self.sweep_every = sweep_every
+        self.exempt = set(BotConfig.ADMINS_ID)
+        # user_id -> [الرموز المتاحة، آخر تحديث]
+        self._buckets = {}
+        self._calls = 0
+        self.dropped = 0
+        self.answer_interval = answer_interval
+        # user_id -> آخر رد على ضغطة زر مسقطة
+        self._answered = {}
+        self._answers = set()
+    
+    def _allow(self, user_id: int, now: float) -> bool:
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            self._buckets[user_id] = [self.burst - 1, now]
+            return True
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return True
+        bucket[0] = tokens
+        return False
+    
+    def _sweep(self, now: float):
+        """حذف الدلاء الخاملة (بشكل كسول) لإبقاء الذاكرة محدودة"""
+        idle = [uid for uid, (_, last) in self._buckets.items() if now - last > self.idle_ttl]
+        for uid in idle:
+            del self._buckets[uid]
+        self._answered = {uid: last for uid, last in self._answered.items() if now - last <= self.idle_ttl}
+    
+    def _answer_dropped(self, callback, user_id: int, now: float):
+        """رد خفيف على ضغطة زر مسقطة دون انتظاره"""
+        if now - self._answered.get(user_id, float("-inf")) < self.answer_interval:
+            return
+        self._answered[user_id] = now
+        task = asyncio.ensure_future(callback.answer("⏳ طلبات كثيرة، انتظر قليلاً..."))
+        self._answers.add(task)
+        task.add_done_callback(self._answer_done)
+    
+    def _answer_done(self, task: asyncio.Task):
+        self._answers.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"تعذر الرد على ضغطة زر مسقطة: {task.exception()}")
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None or user.id in self.exempt or getattr(event, "event_type", None) not in self.THROTTLED:
+            return await handler(event, data)
+        
+        now = time.monotonic()
+        self._calls += 1
+        if self._calls % self.sweep_every == 0:
+            self._sweep(now)
+        
+        if not self._allow(user.id, now):
+            self.dropped += 1
+            RATE_LIMITED.inc(event.event_type)
+            callback = getattr(event, "callback_query", None)
+            if callback is not None:
+                self._answer_dropped(callback, user.id, now)
+            return None
+        return await handler(event, data)
+
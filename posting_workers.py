@@ -0,0 +1,221 @@
+"""
+عمال النشر متعددو العمليات (Multi-process Posting Workers)
+توزيع القنوات النشطة على N عملية باستخدام التجزئة المتسقة (Consistent Hashing):
+المنسق (AutoPoster) يقرر ما يجب نشره، والعمال ينفذون الإرسال ويعيدون النتائج.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import itertools
+import multiprocessing
+import threading
+from loguru import logger
+
+
+# ==========================================
+# --- التجزئة المتسقة ---
+# ==========================================
+
+class ConsistentHashRing:
+    """حلقة تجزئة متسقة مع عقد افتراضية لتوزيع متوازن"""
+    
+    def __init__(self, nodes: int, replicas: int = 128):
+        self.nodes = nodes
+        self._ring = []
+        for node in range(nodes):
+            for replica in range(replicas):
+                self._ring.append((self._hash(f"worker-{node}#{replica}"), node))
+        self._ring.sort()
+        self._keys = [h for h, _ in self._ring]
+    
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+    
+    def node_for(self, key: str) -> int:
+        """العامل المسؤول عن مفتاح معين"""
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._ring[index][1]
+    
+    def partition(self, keys: list) -> dict:
+        """تقسيم المفاتيح على العمال"""
+        shards = {}
+        for key in keys:
+            shards.setdefault(self.node_for(key), []).append(key)
+        return shards
+
+
+# ==========================================
+# --- عملية العامل ---
+# ==========================================
+
+def _worker_main(worker_id: int, token: str, api_server: str, rate_limit: float, jobs, results):
+    """نقطة دخول عملية العامل: حلقة أحداث خاصة وجلسة بوت خاصة"""
+    from logging_setup import setup_worker_logging
+    setup_worker_logging()
+    asyncio.run(_worker_loop(worker_id, token, api_server, rate_limit, jobs, results))
+
+
+async def _worker_loop(worker_id: int, token: str, api_server: str, rate_limit: float, jobs, results):
+    from bot_session import bulk_lane, create_bot
+    from auto_poster import deliver_to_channels
+    
+    # كل طلبات العامل جماعية: حصته جزء من حصة المسار الجماعي بالكامل
+    bot = create_bot(token, api_server=api_server, rate_limit=rate_limit, interactive_share=0.0)
+    loop = asyncio.get_running_loop()
+    logger.info(f"👷 بدأ عامل النشر {worker_id}")
+    
+    try:
+        while True:
+            job = await loop.run_in_executor(None, jobs.get)
+            if job is None:
+                break
+            job_id, content, channel_ids = job
+            try:
+                with bulk_lane():
+                    outcomes = await deliver_to_channels(bot, channel_ids, content)
+            except Exception as e:
+                logger.error(f"❌ خطأ في عامل النشر {worker_id}: {e}")
+                outcomes = None
+            results.put((job_id, worker_id, outcomes))
+    finally:
+        await bot.session.close()
+
+
+# ==========================================
+# --- مجمع العمال (في المنسق) ---
+# ==========================================
+
+class PostingWorkerPool:
+    """إدارة عمليات النشر وتوزيع المهام عليها وجمع النتائج"""
+    
+    def __init__(
+        self,
+        worker_count: int,
+        token: str,
+        api_server: str = "",
+        job_timeout: float = 900,
+        rate_limit: float = 0.0
+    ):
+        self.worker_count = worker_count
+        self.token = token
+        self.api_server = api_server
+        self.job_timeout = job_timeout
+        # حد الطلبات الكلي للعمال (حصة المسار الجماعي) مقسماً عليهم، 0 = بدون حد
+        self.rate_limit = rate_limit / worker_count
+        self.ring = ConsistentHashRing(worker_count)
+        
+        self._ctx = multiprocessing.get_context("spawn")
+        self._processes = {}
+        self._job_queues = {}
+        self._results = None
+        self._pending = {}
+        self._job_ids = itertools.count(1)
+        self._collector = None
+        self._loop = None
+    
+    @property
+    def is_running(self) -> bool:
+        return self._results is not None
+    
+    def start(self):
+        """تشغيل العمليات وخيط جمع النتائج"""
+        if self.is_running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._results = self._ctx.Queue()
+        for worker_id in range(self.worker_count):
+            self._spawn(worker_id)
+        self._collector = threading.Thread(target=self._collect, name="posting-results", daemon=True)
+        self._collector.start()
+        logger.info(f"✅ تم تشغيل {self.worker_count} عامل نشر")
+    
+    def _spawn(self, worker_id: int):
+        jobs = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.token, self.api_server, self.rate_limit, jobs, self._results),
+            name=f"posting-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self._job_queues[worker_id] = jobs
+        self._processes[worker_id] = process
+    
+    def _collect(self):
+        """خيط يقرأ النتائج من العمال ويسلمها لحلقة الأحداث"""
+        while True:
+            try:
+                item = self._results.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            job_id, worker_id, outcomes = item
+            future = self._pending.pop(job_id, None)
+            if future is not None:
+                self._loop.call_soon_threadsafe(_set_result, future, outcomes)
+    
+    def _ensure_alive(self):
+        """إعادة تشغيل أي عامل توقف بشكل غير متوقع"""
+        for worker_id, process in list(self._processes.items()):
+            if not process.is_alive():
+                logger.warning(f"⚠️ عامل النشر {worker_id} متوقف، جاري إعادة تشغيله")
+                self._spawn(worker_id)
+    
+    async def fan_out(self, content, channel_ids: list) -> list:
+        """
+        توزيع الإرسال على العمال حسب التجزئة المتسقة وجمع النتائج
+        content: نص HTML أو MediaPost بمعرف ملف (قابل للنقل بين العمليات)
+        """
+        from auto_poster import SendOutcome
+        
+        self._ensure_alive()
+        shards = self.ring.partition(channel_ids)
+        futures = {}
+        for worker_id, shard in shards.items():
+            job_id = next(self._job_ids)
+            future = self._loop.create_future()
+            self._pending[job_id] = future
+            futures[job_id] = (future, shard)
+            self._job_queues[worker_id].put((job_id, content, shard))
+        
+        # مهلة واحدة لكل الأجزاء معاً (عامل عالق لا يؤخر انتظار بقية العمال)
+        if futures:
+            await asyncio.wait([future for future, _ in futures.values()], timeout=self.job_timeout)
+        outcomes = []
+        for job_id, (future, shard) in futures.items():
+            if future.done():
+                result = future.result()
+            else:
+                self._pending.pop(job_id, None)
+                future.cancel()
+                result = None
+            if result is None:
+                logger.error(f"❌ فشل عامل نشر في معالجة {len(shard)} قناة")
+                result = [SendOutcome(channel_id, False, error="worker_failed") for channel_id in shard]
+            outcomes.extend(result)
+        return outcomes
+    
+    async def stop(self):
+        """إيقاف العمال بعد إنهاء المهام الجارية"""
+        if not self.is_running:
+            return
+        for jobs in self._job_queues.values():
+            jobs.put(None)
+        loop = asyncio.get_running_loop()
+        for process in self._processes.values():
+            await loop.run_in_executor(None, process.join, 10)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        self._results = None
+        self._processes.clear()
+        self._job_queues.clear()
+        logger.info("⏸️ تم إيقاف عمال النشر")
+
+
+def _set_result(future: asyncio.Future, result):
+    if not future.done():
+        future.set_result(result)
@@ -0,0 +1,74 @@
+"""
+تصنيف أخطاء الإرسال وتتبع المحادثات غير القابلة للوصول
+الخطأ الدائم (حظر البوت، طرده من القناة، حذف الحساب...) يعلّم المستخدم is_reachable = False
+أو يعطّل القناة فوراً عبر كاتب دفعات، فتتخطاها استعلامات البث والنشر التالية
+بدلاً من إعادة المحاولة في كل مرة حتى يكتشفها الفحص الدوري.
+"""
+
+from typing import Optional
+from batch_writer import BatchWriter
+from database import DatabaseManager
+
+# أخطاء دائمة: المحادثة لم تعد تقبل رسائل من البوت
+UNREACHABLE_ERRORS = (
+    "bot was blocked by the user",
+    "user is deactivated",
+    "bot was kicked",
+    "bot is not a member",
+    "chat not found",
+    "bot can't initiate conversation",
+    "bot can't send messages to bots",
+    "need administrator rights",
+    "chat_write_forbidden",
+    "peer_id_invalid",
+)
+
+# أخطاء مؤقتة: لا تغير حالة المحادثة
+RATE_LIMIT_ERRORS = ("too many requests", "retry after")
+
+
+def classify_error(error: Optional[str]) -> str:
+    """تصنيف نص خطأ الإرسال: ok، unreachable، rate_limited، transient"""
+    if not error:
+        return "ok"
+    text = error.lower()
+    if any(marker in text for marker in RATE_LIMIT_ERRORS):
+        return "rate_limited"
+    if any(marker in text for marker in UNREACHABLE_ERRORS):
+        return "unreachable"
+    return "transient"
+
+
+class ReachabilityTracker:
+    """تجميع المحادثات غير القابلة للوصول وكتابتها على دفعات"""
+    
+    def __init__(self, flush_interval: float = 2.0):
+        self._writer = BatchWriter(DatabaseManager.mark_unreachable, "reachability", flush_interval=flush_interval)
+    
+    def observe(self, kind: str, outcomes: list) -> int:
+        """
+        فحص نتائج دورة إرسال (قائمة SendOutcome)
+        kind: "user" أو "channel" — يُرجع عدد المحادثات التي عُلمت كغير قابلة للوصول
+        """
+        marked = 0
+        for outcome in outcomes:
+            if not outcome.ok and classify_error(outcome.error) == "unreachable":
+                self._writer.put((kind, outcome.channel_id), (kind, outcome.channel_id))
+                marked += 1
+        return marked
+    
+    async def close(self):
+        """كتابة ما تبقى"""
+        await self._writer.close()
+
+
+# إنشاء مثيل من النظام
+reachability_tracker_instance = None
+
+
+def get_reachability_tracker() -> ReachabilityTracker:
+    """الحصول على متتبع المحادثات غير القابلة للوصول"""
+    global reachability_tracker_instance
+    if reachability_tracker_instance is None:
+        reachability_tracker_instance = ReachabilityTracker()
+    return reachability_tracker_instance
@@ -0,0 +1,259 @@
+"""
+فهرس بحث في الذاكرة لملفات الأذكار (للبحث المضمن @bot)
+- التطبيع: حذف التشكيل وعلامات المصحف والتطويل، وتوحيد أشكال الألف والياء والتاء المربوطة
+- الكلمات: قاموس كلمة (بأداة التعريف وبدونها) -> الأذكار، مع قائمة كلمات مرتبة لمطابقة البادئة (الكلمة الأخيرة أثناء الكتابة)
+- المقاطع الثلاثية لكلمات القاموس: بديل عند عدم وجود تطابق (أخطاء الكتابة)، كل كلمة تُستبدل بأقرب كلمات القاموس حرفياً
+أذكار الوسائط تظهر بتعليقها فقط كنتيجة نصية، ولا يُكشف سطر الوسائط (مسار الملف) في النتائج.
+الصفحات المبنية تُحفظ في ذاكرة LRU، وصفحات الاستعلام الفارغ والكلمات الأكثر شيوعاً تُحسب مسبقاً عند البناء.
+"""
+
+import asyncio
+import bisect
+import os
+import re
+from array import array
+from collections import Counter
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from aiogram.types import InlineQueryResultArticle, InputTextMessageContent
+from bot_utils import format_adhkar_message, load_adhkars_from_file
+from config import AdhkarConfig
+from database import DatabaseManager
+from media_cache import parse_media_entry
+from loguru import logger
+
+# التشكيل وعلامات الوقف والمصحف والتطويل
+_MARKS = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+_LETTERS = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ٲ": "ا", "ٳ": "ا",
+    "ى": "ي", "ی": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه", "ک": "ك",
+})
+_NON_WORD = re.compile(r"[^\w]+")
+# أداة التعريف وما يسبقها من حروف متصلة (الكلمة تُفهرس بها وبدونها)
+_ARTICLES = ("وال", "فال", "بال", "كال", "ال", "لل")
+
+
+def normalize_text(text: str) -> str:
+    """تطبيع نص للبحث: بدون تشكيل، بأشكال حروف موحدة، وكلمات مفصولة بمسافة واحدة"""
+    text = _MARKS.sub("", text).translate(_LETTERS).lower()
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def strip_article(word: str) -> str:
+    """حذف أداة التعريف المتصلة من بداية كلمة مطبعة (الرحمن -> رحمن)"""
+    for article in _ARTICLES:
+        if word.startswith(article) and len(word) - len(article) >= 2:
+            return word[len(article):]
+    return word
+
+
+def file_version(path: str) -> Optional[tuple]:
+    """نسخة الملف (وقت التعديل والحجم) أو None إذا لم يكن موجوداً"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def trigrams(word: str) -> set:
+    """المقاطع الثلاثية لكلمة مطبعة (محاطة بمسافتين حتى تُحتسب بدايتها ونهايتها)"""
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AdhkarIndex:
+    """فهرس أذكار ملفات الفئات (يُبنى مرة واحدة ويُعاد بناؤه عند تغيّر أحد الملفات)"""
+    
+    def __init__(self, sources: Dict[str, list], versions: Dict[str, Optional[tuple]] = None):
+        self.sources = sources
+        # المسار -> نسخة الملف التي بُني منها الفهرس (لاكتشاف تغيّره)
+        self.versions = versions or {path: file_version(path) for path in sources}
+        seen = set()
+        self.texts: List[str] = []
+        for adhkars in sources.values():
+            for text in adhkars:
+                # أذكار الوسائط يُفهرس تعليقها فقط (سطر الوسائط يحوي مسار الملف على الخادم)، وبلا تعليق لا تُفهرس
+                media = parse_media_entry(text)
+                if media is not None:
+                    text = media.caption
+                if text and text not in seen:
+                    seen.add(text)
+                    self.texts.append(text)
+        self.normalized = [normalize_text(text) for text in self.texts]
+        
+        postings: Dict[str, array] = {}
+        for entry_id, text in enumerate(self.normalized):
+            words = set(text.split())
+            words.update([strip_article(word) for word in words])
+            for word in words:
+                postings.setdefault(word, array("I")).append(entry_id)
+        self.words = postings
+        self.vocabulary = sorted(postings)
+        
+        # مقطع ثلاثي -> أرقام كلمات القاموس التي تحتويه
+        grams: Dict[str, array] = {}
+        for word_id, word in enumerate(self.vocabulary):
+            for gram in trigrams(word):
+                grams.setdefault(gram, array("I")).append(word_id)
+        self.grams = grams
+        # الصفحات المحسوبة مسبقاً ثابتة، وباقي الصفحات في ذاكرة LRU
+        self._pinned: Dict[str, Tuple[tuple, str]] = {}
+        self._cached_page = lru_cache(maxsize=AdhkarConfig.INLINE_RESULT_CACHE_SIZE)(self._build_page)
+    
+    def is_stale(self) -> bool:
+        """تغيّر أحد الملفات منذ البناء"""
+        return any(file_version(path) != version for path, version in self.versions.items())
+    
+    # ==================== البحث ====================
+    
+    def _prefix_matches(self, prefix: str) -> set:
+        """الأذكار التي تحتوي كلمة تبدأ بـ prefix"""
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\uffff", start)
+        return set().union(*(self.words[word] for word in self.vocabulary[start:end]))
+    
+    def search(self, query: str) -> List[int]:
+        """
+        معرفات الأذكار المطابقة لاستعلام مطبع بالترتيب:
+        كل الكلمات موجودة (الأخيرة كبادئة) مع تقديم ما يحتوي العبارة كاملة، وإلا أقرب تطابق بالمقاطع الثلاثية
+        """
+        if not query:
+            return list(range(len(self.texts)))
+        *words, last = query.split()
+        matches = None
+        for word in sorted(words, key=lambda word: len(self.words.get(word, ()))):
+            posting = self.words.get(word)
+            if posting is None:
+                matches = set()
+                break
+            matches = set(posting) if matches is None else matches.intersection(posting)
+            if not matches:
+                break
+        if matches is None or matches:
+            prefixed = self._prefix_matches(last)
+            matches = prefixed if matches is None else matches & prefixed
+        if matches:
+            return sorted(matches, key=lambda entry_id: (query not in self.normalized[entry_id], entry_id))
+        return self._fuzzy(query)
+    
+    def similar_words(self, word: str) -> Dict[str, float]:
+        """
+        كلمات القاموس القريبة من word: المرشحون الأكثر اشتراكاً معها في المقاطع الثلاثية،
+        ثم نسبة التشابه الحرفي (difflib) لكل مرشح
+        """
+        shared = Counter()
+        for gram in trigrams(word):
+            shared.update(self.grams.get(gram, ()))
+        similar = {}
+        for word_id, _ in shared.most_common(AdhkarConfig.INLINE_FUZZY_CANDIDATES):
+            candidate = self.vocabulary[word_id]
+            score = SequenceMatcher(None, word, candidate).ratio()
+            if score >= AdhkarConfig.INLINE_MIN_SIMILARITY:
+                similar[candidate] = score
+        return similar
+    
+    def _fuzzy(self, query: str) -> List[int]:
+        """الأذكار التي تحتوي كلمة قريبة من كل كلمة في الاستعلام، الأقرب أولاً"""
+        scores = None
+        for word in query.split():
+            # أفضل تشابه لكل ذكر مع هذه الكلمة
+            best = {}
+            for similar, score in self.similar_words(strip_article(word)).items():
+                for entry_id in self.words[similar]:
+                    if score > best.get(entry_id, 0.0):
+                        best[entry_id] = score
+            if scores is None:
+                scores = best
+            else:
+                scores = {entry_id: score + best[entry_id] for entry_id, score in scores.items() if entry_id in best}
+            if not scores:
+                return []
+        return sorted(scores, key=lambda entry_id: (-scores[entry_id], entry_id))
+    
+    # ==================== نتائج تيليجرام ====================
+    
+    def _result(self, entry_id: int) -> InlineQueryResultArticle:
+        text = self.texts[entry_id]
+        title, _, rest = text.partition("\n")
+        return InlineQueryResultArticle(
+            id=str(entry_id),
+            title=title[:100],
+            description=(rest or title[100:])[:200] or None,
+            input_message_content=InputTextMessageContent(message_text=format_adhkar_message(text)[:4096]),
+        )
+    
+    def page(self, query: str, offset: int = 0) -> Tuple[tuple, str]:
+        """صفحة نتائج لاستعلام مطبع: (النتائج، next_offset)"""
+        if not offset and query in self._pinned:
+            return self._pinned[query]
+        return self._cached_page(query, offset)
+    
+    def _build_page(self, query: str, offset: int) -> Tuple[tuple, str]:
+        size = AdhkarConfig.INLINE_RESULTS_PER_PAGE
+        matches = self.search(query)
+        results = tuple(self._result(entry_id) for entry_id in matches[offset:offset + size])
+        next_offset = str(offset + size) if offset + size < len(matches) else ""
+        return results, next_offset
+    
+    def precompute(
+        self,
+        words: int = AdhkarConfig.INLINE_PRECOMPUTE_WORDS,
+        prefix_length: int = AdhkarConfig.INLINE_PRECOMPUTE_PREFIX_LENGTH
+    ) -> int:
+        """حساب الصفحة الأولى مسبقاً للاستعلام الفارغ والبادئات القصيرة والكلمات الأكثر تكراراً"""
+        queries = {""}
+        queries.update(word[:length] for word in self.vocabulary for length in range(1, prefix_length + 1))
+        queries.update(sorted(self.words, key=lambda word: len(self.words[word]), reverse=True)[:words])
+        for query in queries:
+            self._pinned[query] = self._build_page(query, 0)
+        return len(queries)
+
+
+# ==========================================
+# --- الفهرس المشترك ---
+# ==========================================
+
+_index: Optional[AdhkarIndex] = None
+_building: Optional[asyncio.Lock] = None
+# تغيّرت الفئات (ملف فئة جديد أو معدل) فتُعاد قراءة قائمة الملفات عند البناء التالي
+_categories_changed = False
+
+
+def _on_categories_change():
+    global _categories_changed
+    _categories_changed = True
+
+
+DatabaseManager.on_change("categories", _on_categories_change)
+
+
+def build_index(file_paths: list = None) -> AdhkarIndex:
+    """بناء الفهرس من ملفات الفئات (عملية متزامنة تُستدعى في خيط منفصل)"""
+    global _index, _categories_changed
+    if file_paths is None:
+        _categories_changed = False
+        file_paths = [category.file_path for category in DatabaseManager.get_categories() if category.file_path]
+    # النسخ تُقرأ قبل المحتوى حتى يُكتشف أي تعديل يحدث أثناء البناء
+    versions = {path: file_version(path) for path in file_paths}
+    index = AdhkarIndex({path: load_adhkars_from_file(path) for path in file_paths}, versions)
+    precomputed = index.precompute()
+    _index = index
+    logger.info(f"🔎 تم بناء فهرس البحث: {len(index.texts)} ذكر، {len(index.vocabulary)} كلمة ({precomputed} استعلام محسوب مسبقاً)")
+    return index
+
+
+async def get_index() -> AdhkarIndex:
+    """الفهرس الحالي (يُبنى أو يُعاد بناؤه في خيط منفصل عند تغيّر الملفات)"""
+    global _building
+    if _index is not None and not _categories_changed and not _index.is_stale():
+        return _index
+    if _building is None:
+        _building = asyncio.Lock()
+    async with _building:
+        if _index is None or _categories_changed:
+            await asyncio.to_thread(build_index)
+        elif _index.is_stale():
+            await asyncio.to_thread(build_index, list(_index.sources))
+    return _index
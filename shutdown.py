@@ -0,0 +1,113 @@
+"""
+إيقاف البوت بشكل منظم خلال مهلة محددة
+الخطوات تُنفذ على مراحل بالترتيب:
+1. intake: إيقاف استقبال عمل جديد (الجدولة، مطابقة القنوات)
+2. drain: انتظار الإرسال الجاري أو حفظه ليُستأنف بعد إعادة التشغيل (النشر والبث)
+3. flush: كتابة طوابير قاعدة البيانات المعلقة
+4. close: إغلاق جلسة البوت والمقاييس
+كل خطوة تأخذ ما تبقى من مهلة مرحلتها (مرحلة drain لا تستهلك الوقت المحجوز للكتابة)،
+والخطوة التي تتجاوزها تُلغى وتُسجل في التقرير ثم يكمل الإيقاف، وفي النهاية يُبلغ عن العمل المؤجل.
+"""
+
+import asyncio
+import inspect
+import time
+from typing import Callable, NamedTuple
+from batch_writer import BatchWriter
+from config import ShutdownConfig
+from loguru import logger
+
+PHASES = ("intake", "drain", "flush", "close")
+
+
+class ShutdownStep(NamedTuple):
+    """خطوة إيقاف: fn تُستدعى بدون معاملات، أو بالمهلة المتبقية إذا كانت bounded"""
+    phase: str
+    name: str
+    fn: Callable
+    bounded: bool
+
+
+async def cancel_task(task: asyncio.Task):
+    """إلغاء مهمة خلفية وانتظار انتهائها"""
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+class ShutdownCoordinator:
+    """تنفيذ خطوات الإيقاف بالترتيب ضمن مهلة واحدة مع تقرير بما تأجل"""
+    
+    def __init__(self, deadline: float = ShutdownConfig.DEADLINE, flush_reserve: float = ShutdownConfig.FLUSH_RESERVE):
+        self.deadline = deadline
+        self.flush_reserve = min(flush_reserve, deadline)
+        self._steps = []
+        self._ends_at = None
+        # اسم الخطوة -> (الحالة، المدة بالثواني)
+        self.results = {}
+        # اسم الخطوة أو الكاتب -> عدد العناصر المؤجلة
+        self.deferred = {}
+    
+    def add(self, phase: str, name: str, fn: Callable, bounded: bool = False):
+        """
+        تسجيل خطوة إيقاف (دالة عادية أو غير متزامنة)
+        bounded: الخطوة تلتزم بالمهلة بنفسها (تستقبلها كمعامل) بدلاً من إلغائها عند انتهائها،
+        ويُعتبر العدد الذي تُرجعه عملاً مؤجلاً
+        """
+        if phase not in PHASES:
+            raise ValueError(f"مرحلة غير معروفة: {phase}")
+        self._steps.append(ShutdownStep(phase, name, fn, bounded))
+    
+    def remaining(self, phase: str) -> float:
+        """الوقت المتبقي لمرحلة (drain تنتهي قبل المهلة بالوقت المحجوز للكتابة)"""
+        ends_at = self._ends_at - (self.flush_reserve if phase in ("intake", "drain") else 0.0)
+        return max(0.0, ends_at - time.monotonic())
+    
+    async def run(self) -> dict:
+        """تنفيذ كل الخطوات وإرجاع العمل المؤجل"""
+        started = time.monotonic()
+        self._ends_at = started + self.deadline
+        for phase in PHASES:
+            for step in self._steps:
+                if step.phase == phase:
+                    await self._run_step(step)
+        
+        # عناصر بقيت في طوابير الكتابة (خطوة تجاوزت المهلة أو كاتب لم يُغلق)
+        for writer in BatchWriter.live():
+            if writer.pending:
+                self.deferred[f"writer:{writer.name}"] = writer.pending
+        self._report(time.monotonic() - started)
+        return self.deferred
+    
+    async def _run_step(self, step: ShutdownStep):
+        timeout = self.remaining(step.phase)
+        started = time.monotonic()
+        try:
+            if step.bounded:
+                result = step.fn(timeout)
+                if inspect.isawaitable(result):
+                    result = await result
+            else:
+                result = step.fn()
+                if inspect.isawaitable(result):
+                    result = await asyncio.wait_for(result, timeout)
+            status = "ok"
+            if step.bounded and result:
+                self.deferred[step.name] = result
+        except asyncio.TimeoutError:
+            status = "timeout"
+        except Exception as e:
+            status = "error"
+            logger.error(f"❌ خطأ في خطوة الإيقاف {step.name}: {e}")
+        self.results[step.name] = (status, time.monotonic() - started)
+    
+    def _report(self, elapsed: float):
+        failed = [f"{name} ({status})" for name, (status, _) in self.results.items() if status != "ok"]
+        slowest = sorted(self.results.items(), key=lambda item: item[1][1], reverse=True)[:3]
+        logger.info(
+            f"🛑 الإيقاف: {len(self.results)} خطوة خلال {elapsed:.2f} ث من {self.deadline:.0f} ث"
+            f" (الأبطأ: {', '.join(f'{name} {duration:.2f} ث' for name, (_, duration) in slowest)})"
+        )
+        if failed:
+            logger.warning(f"⚠️ خطوات إيقاف لم تكتمل: {', '.join(failed)}")
+        if self.deferred:
+            logger.warning(f"⏳ عمل مؤجل: {', '.join(f'{name}={count}' for name, count in self.deferred.items())}")
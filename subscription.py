@@ -0,0 +1,204 @@
+"""
+بوابة الاشتراك الإجباري في قناة التحقق
+نتيجة get_chat_member تُخزن لكل مستخدم في الذاكرة بمدة صلاحية للمشترك وأخرى لغير المشترك،
+وتُحدّث في الخلفية عند انتهائها (مع استخدام القيمة القديمة مؤقتاً)،
+وتُحفظ في users.is_subscribed على دفعات ليبدأ البوت بعد إعادة التشغيل بذاكرة جاهزة.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from aiogram import BaseMiddleware, Bot
+from aiogram.enums import ChatMemberStatus
+from aiogram.types import CallbackQuery, Message, TelegramObject
+from batch_writer import BatchWriter
+from config import BotConfig, SecurityConfig
+from database import DatabaseManager
+from logging_setup import log_throttled
+from loguru import logger
+
+SUBSCRIBED_STATUSES = {
+    ChatMemberStatus.CREATOR,
+    ChatMemberStatus.ADMINISTRATOR,
+    ChatMemberStatus.MEMBER,
+}
+
+# زر "تحقق" في لوحة الاشتراك
+RECHECK_CALLBACK = "main_menu"
+
+
+class SubscriptionMiddleware(BaseMiddleware):
+    """
+    Outer Middleware على الرسائل والأزرار في المحادثات الخاصة
+    - عند وجود نتيجة صالحة في الذاكرة: قرار فوري بدون أي استدعاء
+    - عند انتهاء الصلاحية: القرار بالقيمة القديمة + تحديث في الخلفية
+    - عند عدم وجود نتيجة: استدعاء get_chat_member واحد (مع دمج الطلبات المتزامنة)
+    """
+    
+    def __init__(
+        self,
+        positive_ttl: float = SecurityConfig.SUBSCRIPTION_POSITIVE_TTL,
+        negative_ttl: float = SecurityConfig.SUBSCRIPTION_NEGATIVE_TTL,
+        channel_ttl: float = SecurityConfig.SUBSCRIPTION_CHANNEL_TTL
+    ):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.channel_ttl = channel_ttl
+        self.exempt = set(BotConfig.ADMINS_ID)
+        # user_id -> (مشترك؟, وقت انتهاء الصلاحية)
+        self._cache = {}
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self._misses = 0
+        self._channel: Optional[str] = None
+        self._channel_expires = 0.0
+        self._channel_loading: Optional[asyncio.Future] = None
+        self._warm_up_task: Optional[asyncio.Future] = None
+        self._writer = BatchWriter(DatabaseManager.save_subscriptions, "subscriptions", flush_interval=5.0)
+        DatabaseManager.on_change("config", self.invalidate_channel)
+    
+    # ==================== قناة التحقق ====================
+    
+    async def _load_channel(self):
+        try:
+            channel = await asyncio.to_thread(DatabaseManager.get_config, "verification_channel")
+            if channel != self._channel:
+                if self._channel is not None:
+                    # تغيرت القناة: النتائج السابقة لم تعد صالحة
+                    self._cache.clear()
+                self._channel = channel
+            self._channel_expires = time.monotonic() + self.channel_ttl
+        finally:
+            self._channel_loading = None
+    
+    async def _get_channel(self, now: float) -> Optional[str]:
+        loading = self._channel_loading
+        if loading is None and now >= self._channel_expires:
+            loading = self._channel_loading = asyncio.ensure_future(self._load_channel())
+        if loading is not None:
+            await asyncio.shield(loading)
+        return self._channel or None
+    
+    def invalidate_channel(self):
+        """إعادة قراءة قناة التحقق عند أول تحديث قادم"""
+        self._channel_expires = 0.0
+    
+    # ==================== الذاكرة المؤقتة ====================
+    
+    async def _warm_up(self):
+        """تحميل المشتركين المحفوظين كنتائج منتهية الصلاحية (تُستخدم فوراً وتُحدّث في الخلفية)"""
+        try:
+            user_ids = await asyncio.to_thread(DatabaseManager.get_subscribed_user_ids)
+        except Exception as e:
+            logger.error(f"❌ خطأ في تحميل حالات الاشتراك: {e}")
+            return
+        for user_id in user_ids:
+            self._cache.setdefault(user_id, (True, 0.0))
+        if user_ids:
+            logger.info(f"🔐 تم تحميل {len(user_ids)} مشترك من قاعدة البيانات")
+    
+    def _store(self, user_id: int, subscribed: bool, now: float):
+        previous = self._cache.get(user_id)
+        ttl = self.positive_ttl if subscribed else self.negative_ttl
+        self._cache[user_id] = (subscribed, now + ttl)
+        if previous is None or previous[0] != subscribed:
+            self._writer.put(user_id, (user_id, subscribed))
+    
+    def _sweep(self, now: float):
+        """حذف غير المشتركين المنتهية صلاحيتهم (المشتركون يبقون لأنهم بيانات التحميل المسبق)"""
+        expired = [uid for uid, (subscribed, expires) in self._cache.items() if not subscribed and expires < now]
+        for uid in expired:
+            del self._cache[uid]
+    
+    # ==================== التحقق عبر Bot API ====================
+    
+    async def _fetch(self, bot: Bot, channel: str, user_id: int) -> bool:
+        try:
+            member = await bot.get_chat_member(channel, user_id)
+            subscribed = member.status in SUBSCRIBED_STATUSES or getattr(member, "is_member", False)
+        except Exception as e:
+            # تعذر التحقق (البوت ليس مشرفاً في القناة مثلاً): لا نمنع المستخدم
+            log_throttled("WARNING", "subscription_check", f"⚠️ تعذر التحقق من اشتراك {user_id} في {channel}: {e}")
+            self._cache[user_id] = (True, time.monotonic() + self.negative_ttl)
+            return True
+        self._store(user_id, subscribed, time.monotonic())
+        return subscribed
+    
+    def _start_fetch(self, bot: Bot, channel: str, user_id: int) -> asyncio.Future:
+        """بدء تحقق واحد لكل مستخدم (الطلبات المتزامنة تنتظر نفس النتيجة)"""
+        future = self._inflight.get(user_id)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(bot, channel, user_id))
+            self._inflight[user_id] = future
+            future.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+        return future
+    
+    async def is_subscribed(self, bot: Bot, channel: str, user_id: int, force: bool = False) -> bool:
+        now = time.monotonic()
+        cached = self._cache.get(user_id)
+        if cached is None or (force and not cached[0]):
+            self._misses += 1
+            if self._misses % 1000 == 0:
+                self._sweep(now)
+            return await asyncio.shield(self._start_fetch(bot, channel, user_id))
+        subscribed, expires = cached
+        if now >= expires:
+            # القيمة القديمة تُستخدم الآن والتحديث يتم في الخلفية
+            self._start_fetch(bot, channel, user_id)
+        return subscribed
+    
+    # ==================== البوابة ====================
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        chat = data.get("event_chat")
+        if user is None or user.id in self.exempt or chat is None or chat.type != "private":
+            return await handler(event, data)
+        
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.ensure_future(self._warm_up())
+        if not self._warm_up_task.done():
+            await asyncio.shield(self._warm_up_task)
+        channel = await self._get_channel(time.monotonic())
+        if not channel:
+            return await handler(event, data)
+        
+        force = isinstance(event, CallbackQuery) and event.data == RECHECK_CALLBACK
+        if await self.is_subscribed(data["bot"], channel, user.id, force=force):
+            return await handler(event, data)
+        
+        await self._reject(event, channel)
+        return None
+    
+    @staticmethod
+    async def _reject(event: TelegramObject, channel: str):
+        from keyboards import get_subscription_keyboard
+        
+        text = "⚠️ يجب الاشتراك في قناة البوت أولاً لاستخدامه"
+        try:
+            if isinstance(event, CallbackQuery):
+                await event.answer(text, show_alert=True)
+            elif isinstance(event, Message):
+                await event.answer(text, reply_markup=get_subscription_keyboard(channel))
+        except Exception as e:
+            logger.error(f"❌ خطأ في إرسال رسالة الاشتراك: {e}")
+    
+    async def close(self):
+        """كتابة حالات الاشتراك المعلقة"""
+        await self._writer.close()
+
+
+_gate: Optional[SubscriptionMiddleware] = None
+
+
+def get_subscription_gate() -> SubscriptionMiddleware:
+    """الحصول على بوابة الاشتراك (نسخة واحدة)"""
+    global _gate
+    if _gate is None:
+        _gate = SubscriptionMiddleware()
+    return _gate
+
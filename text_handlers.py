@@ -9,13 +9,16 @@ from aiogram.fsm.state import State, StatesGroup
 from database import DatabaseManager
 from keyboards import (
     get_main_keyboard, get_cancel_keyboard, get_back_keyboard,
-    get_verification_menu_keyboard
+    get_verification_menu_keyboard, get_broadcast_job_keyboard
 )
 from bot_utils import (
     is_valid_time_format, is_valid_interval, is_valid_user_id,
-    is_valid_channel_id, get_error_message, get_success_message,
+    is_valid_channel_id, get_error_message, get_success_message, format_broadcast_job,
     load_adhkars_from_file  # تأكد من وجود هذا الاستيراد
 )
+from bot_pool import get_bot_pool
+from broadcaster import get_broadcast_manager
+from user_context import UserContext
 from loguru import logger
 
 router = Router()
@@ -97,7 +100,7 @@ async def process_verification_channel(message: types.Message, state: FSMContext
         # إعادة إرسال قائمة التحقق لسهولة التعديل مرة أخرى
         markup = get_verification_menu_keyboard()
         await message.answer("🔧 قناة التحقق:", reply_markup=markup)
-        
+    
     except Exception as e:
         logger.error(f"❌ خطأ في تعيين قناة التحقق: {e}")
         await message.reply(
@@ -113,14 +116,14 @@ async def process_verification_channel(message: types.Message, state: FSMContext
 # ==========================================
 
 @router.message(AddChannelState.waiting_for_channel_id)
-async def process_add_channel(message: types.Message, state: FSMContext):
+async def process_add_channel(message: types.Message, state: FSMContext, user: UserContext):
     """
     معالجة إضافة قناة جديدة (تقبل ID أو Forwarded Message)
     وتتحقق من صلاحيات البوت قبل الإضافة
     """
     channel_id = None
     channel_title = "قناة بدون اسم"
-
+    
     # الحالة 1: إذا قام المستخدم بتوجيه رسالة من القناة (Forward)
     if message.forward_from_chat:
         chat = message.forward_from_chat
@@ -135,7 +138,7 @@ async def process_add_channel(message: types.Message, state: FSMContext):
         
         channel_id = str(chat.id)
         channel_title = chat.title or "قناة بدون اسم"
-
+    
     # الحالة 2: إذا قام المستخدم بإرسال نص (ID أو Username)
     elif message.text:
         text = message.text.strip()
@@ -160,13 +163,18 @@ async def process_add_channel(message: types.Message, state: FSMContext):
         return
     
     try:
+        # مع مجمع البوتات تُسند القناة للبوت المشرف فيها الأقل حملاً (وإلا البوت الرئيسي)
+        bot_pool = get_bot_pool(message.bot)
+        bot_index = (await bot_pool.find_admin(channel_id) or 0) if bot_pool.enabled else 0
+        channel_bot = bot_pool.get(bot_index)
+        
         # 1. جلب معلومات القناة
-        chat_info = await message.bot.get_chat(channel_id)
+        chat_info = await channel_bot.get_chat(channel_id)
         channel_title = chat_info.title
         
         # 2. التحقق مما إذا كان البوت مشرفاً في القناة
         try:
-            bot_member = await message.bot.get_chat_member(channel_id, message.bot.id)
+            bot_member = await channel_bot.get_chat_member(channel_id, channel_bot.id)
             
             if bot_member.status not in ["administrator", "creator"]:
                 await message.reply(
@@ -192,25 +200,21 @@ async def process_add_channel(message: types.Message, state: FSMContext):
         DatabaseManager.add_channel(
             str(chat_info.id),
             channel_title,
-            message.from_user.id
+            message.from_user.id,
+            bot_index
         )
         
         await message.reply(
             f"✅ تم إضافة القناة بنجاح!\n\n"
             f"📢 الاسم: {channel_title}\n"
             f"🆔 المعرف: {channel_id}",
-            reply_markup=get_main_keyboard(DatabaseManager.get_user_role(message.from_user.id))
+            reply_markup=get_main_keyboard(user.role)
         )
         
         # --- إضافة: إشعار المطور عند إضافة قناة جديدة ---
         try:
-            owner_id = None
             # نجلب ID المطور من قاعدة البيانات
-            all_users = DatabaseManager.get_all_users()
-            for user in all_users:
-                if user.role == "owner":
-                    owner_id = user.user_id
-                    break
+            owner_id = next((owner.user_id for owner in DatabaseManager.iter_users(roles=("owner",))), None)
             
             if owner_id:
                 await message.bot.send_message(
@@ -224,7 +228,7 @@ async def process_add_channel(message: types.Message, state: FSMContext):
         except Exception as e:
             logger.error(f"فشل إرسال الإشعار للمطور: {e}")
         # -----------------------------------------------------
-
+    
     except Exception as e:
         logger.error(f"❌ خطأ في إضافة القناة: {e}")
         await message.reply(
@@ -284,7 +288,7 @@ async def process_end_time(message: types.Message, state: FSMContext):
 
 
 @router.message(EditTimeState.waiting_for_interval)
-async def process_time_interval(message: types.Message, state: FSMContext):
+async def process_time_interval(message: types.Message, state: FSMContext, user: UserContext):
     """معالجة إدخال فترة التكرار"""
     interval_str = message.text.strip()
     
@@ -318,7 +322,7 @@ async def process_time_interval(message: types.Message, state: FSMContext):
     
     await message.reply(
         "✅ تم حفظ الإعدادات بنجاح!",
-        reply_markup=get_main_keyboard(DatabaseManager.get_user_role(message.from_user.id))
+        reply_markup=get_main_keyboard(user.role)
     )
     
     await state.clear()
@@ -329,7 +333,7 @@ async def process_time_interval(message: types.Message, state: FSMContext):
 # ==========================================
 
 @router.message(EditIntervalState.waiting_for_interval)
-async def process_edit_interval(message: types.Message, state: FSMContext):
+async def process_edit_interval(message: types.Message, state: FSMContext, user: UserContext):
     """معالجة تعديل فترة التكرار"""
     interval_str = message.text.strip()
     
@@ -357,7 +361,7 @@ async def process_edit_interval(message: types.Message, state: FSMContext):
     
     await message.reply(
         f"✅ تم تحديث فترة التكرار إلى {interval} دقيقة",
-        reply_markup=get_main_keyboard(DatabaseManager.get_user_role(message.from_user.id))
+        reply_markup=get_main_keyboard(user.role)
     )
     
     await state.clear()
@@ -369,61 +373,34 @@ async def process_edit_interval(message: types.Message, state: FSMContext):
 
 @router.message(BroadcastState.waiting_for_broadcast_channels)
 async def process_broadcast_channels(message: types.Message, state: FSMContext):
-    """معالجة البث للقنوات"""
-    broadcast_text = message.text or message.caption
-    
-    if not broadcast_text:
-        await message.reply("❌ الرسالة فارغة. يرجى إرسال نص البث.")
-        return
-    
-    channels = DatabaseManager.get_active_channels()
-    sent_count = 0
-    
-    for channel in channels:
-        try:
-            await message.bot.send_message(
-                int(channel.channel_id),
-                broadcast_text,
-                parse_mode="HTML"
-            )
-            sent_count += 1
-        except Exception as e:
-            logger.error(f"❌ خطأ في إرسال الرسالة للقناة {channel.channel_id}: {e}")
-    
-    await message.reply(
-        f"✅ تم إرسال الرسالة لـ {sent_count} قناة",
-        reply_markup=get_main_keyboard(DatabaseManager.get_user_role(message.from_user.id))
-    )
-    
-    await state.clear()
+    """معالجة البث للقنوات (مهمة بث تنسخ الرسالة كما هي مع الوسائط والتنسيق)"""
+    await start_broadcast_job(message, state, "channels")
 
 
 @router.message(BroadcastState.waiting_for_broadcast_private)
 async def process_broadcast_private(message: types.Message, state: FSMContext):
-    """معالجة البث للرسائل الخاصة"""
-    broadcast_text = message.text or message.caption
-    
-    if not broadcast_text:
-        await message.reply("❌ الرسالة فارغة. يرجى إرسال نص البث.")
-        return
-    
-    users = DatabaseManager.get_all_users()
-    sent_count = 0
-    
-    for user in users:
-        try:
-            await message.bot.send_message(
-                user.user_id,
-                broadcast_text,
-                parse_mode="HTML"
+    """معالجة البث للرسائل الخاصة (مهمة بث تنسخ الرسالة كما هي مع الوسائط والتنسيق)"""
+    await start_broadcast_job(message, state, "users")
+
+
+async def start_broadcast_job(message: types.Message, state: FSMContext, target: str):
+    """إنشاء مهمة البث وعرض أزرار التحكم بها"""
+    job_id = await get_broadcast_manager(message.bot).create(target, message)
+    job = DatabaseManager.get_broadcast_job(job_id)
+    
+    text = format_broadcast_job(job)
+    if target == "channels" and job.payload is None:
+        skipped = await get_bot_pool(message.bot).pool_channel_count()
+        if skipped:
+            text += (
+                f"\n\n⚠️ لا يمكن إعادة إرسال هذا النوع من الرسائل عبر بوتات المجمع، "
+                f"ستُتخطى قنواتها (<code>{skipped}</code> قناة)"
             )
-            sent_count += 1
-        except Exception as e:
-            logger.error(f"❌ خطأ في إرسال الرسالة للمستخدم {user.user_id}: {e}")
     
     await message.reply(
-        f"✅ تم إرسال الرسالة لـ {sent_count} مستخدم",
-        reply_markup=get_main_keyboard(DatabaseManager.get_user_role(message.from_user.id))
+        text,
+        reply_markup=get_broadcast_job_keyboard(job.id, job.status),
+        parse_mode="HTML"
     )
     
     await state.clear()
@@ -447,9 +424,9 @@ async def ignore_docs_in_add_channel(message: types.Message):
 
 
 @router.message(F.document)
-async def handle_file_upload(message: types.Message, state: FSMContext):
+async def handle_file_upload(message: types.Message, state: FSMContext, user: UserContext):
     """معالجة رفع الملفات"""
-    user_role = DatabaseManager.get_user_role(message.from_user.id)
+    user_role = user.role
     
     if user_role not in ["admin", "owner"]:
         await message.reply("❌ ليس لديك صلاحيات كافية.")
@@ -502,7 +479,7 @@ async def handle_file_upload(message: types.Message, state: FSMContext):
         )
         
         logger.info(f"✅ تم رفع ملف الأذكار: {target_file} ({adhkar_count} ذكر)")
-        
+    
     except Exception as e:
         logger.error(f"❌ خطأ في رفع الملف: {e}")
         await message.reply(
@@ -0,0 +1,136 @@
+"""
+عجلة توقيت هرمية (Hierarchical Timing Wheel)
+تحتفظ بمئات الآلاف من المؤقتات مع إضافة وإلغاء وانتهاء بزمن O(1):
+- كل مستوى يحتوي SLOTS خانة، والمستوى الأعلى يغطي مدة أكبر بـ SLOTS مرة
+- عند دوران مستوى أدنى، تُنقل مؤقتات الخانة الحالية من المستوى الأعلى للمستويات الأدنى
+- بالإعدادات الافتراضية (نبضة ثانية، 64 خانة، 4 مستويات) تغطي العجلة ~194 يوماً
+"""
+
+import math
+import time
+from typing import Any, Hashable, List, Tuple
+
+
+class TimingWheel:
+    """عجلة توقيت بمفاتيح (إعادة جدولة المفتاح تلغي موعده السابق)"""
+    
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4, start: float = None):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._spans = [slots ** level for level in range(levels + 1)]
+        # كل خانة: مفتاح -> (رقم نبضة الانتهاء، البيانات)
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._current = int((time.time() if start is None else start) // tick)
+        # مفتاح -> (الخانة التي يوجد فيها، المستوى) للإلغاء المباشر
+        self._where = {}
+        # عدد المؤقتات في كل مستوى (لتخطي الفترات الفارغة دفعة واحدة)
+        self._counts = [0] * levels
+        # المؤقتات المستحقة فوراً، والأبعد من مدى العجلة
+        self._due = {}
+        self._overflow = {}
+    
+    def __len__(self) -> int:
+        return len(self._where)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+    
+    def _place(self, key: Hashable, expires: int, payload: Any):
+        level = None
+        if expires <= self._current:
+            bucket = self._due
+        else:
+            # أدنى مستوى تتطابق فيه الخانات الأعلى مع النبضة الحالية
+            for level in range(self.levels):
+                span = self._spans[level + 1]
+                if expires // span == self._current // span:
+                    slot = (expires // self._spans[level]) % self.slots
+                    bucket = self._wheels[level][slot]
+                    self._counts[level] += 1
+                    break
+            else:
+                level = None
+                bucket = self._overflow
+        bucket[key] = (expires, payload)
+        self._where[key] = (bucket, level)
+    
+    def schedule(self, key: Hashable, when: float, payload: Any = None):
+        """جدولة مفتاح في وقت محدد (ثوانٍ منذ epoch)"""
+        self.cancel(key)
+        self._place(key, math.ceil(when / self.tick), payload)
+    
+    def cancel(self, key: Hashable) -> bool:
+        """إلغاء مؤقت (إن وُجد)"""
+        location = self._where.pop(key, None)
+        if location is None:
+            return False
+        bucket, level = location
+        del bucket[key]
+        if level is not None:
+            self._counts[level] -= 1
+        return True
+    
+    def when(self, key: Hashable) -> float:
+        """وقت انتهاء مؤقت (أو None)"""
+        location = self._where.get(key)
+        return location[0][key][0] * self.tick if location is not None else None
+    
+    def _cascade(self, level: int):
+        """نقل مؤقتات الخانة الحالية من مستوى أعلى إلى المستويات الأدنى"""
+        slot = (self._current // self._spans[level]) % self.slots
+        bucket = self._wheels[level][slot]
+        if not bucket:
+            return
+        self._wheels[level][slot] = {}
+        self._counts[level] -= len(bucket)
+        for key, (expires, payload) in bucket.items():
+            self._place(key, expires, payload)
+    
+    def advance(self, now: float = None) -> List[Tuple[Hashable, Any]]:
+        """تقديم العجلة حتى الوقت الحالي وإرجاع المؤقتات المنتهية [(مفتاح، بيانات)]"""
+        target = int((time.time() if now is None else now) // self.tick)
+        expired = []
+        if self._due:
+            expired.extend(self._pop(self._due))
+            self._due = {}
+        while self._current < target:
+            self._skip_empty(target)
+            self._current += 1
+            if self._current % self._spans[self.levels] == 0 and self._overflow:
+                overflow, self._overflow = self._overflow, {}
+                for key, (expires, payload) in overflow.items():
+                    self._place(key, expires, payload)
+            # التنقل من الأعلى للأدنى حتى تصل المؤقتات لمستواها الصحيح
+            for level in range(self.levels - 1, 0, -1):
+                if self._current % self._spans[level] == 0:
+                    self._cascade(level)
+            slot = self._current % self.slots
+            bucket = self._wheels[0][slot]
+            if bucket:
+                self._wheels[0][slot] = {}
+                self._counts[0] -= len(bucket)
+                expired.extend(self._pop(bucket))
+            if self._due:
+                expired.extend(self._pop(self._due))
+                self._due = {}
+        return expired
+    
+    def _skip_empty(self, target: int):
+        """القفز مباشرة لآخر نبضة قبل أول حدث ممكن إذا كانت المستويات الدنيا فارغة"""
+        if self._counts[0]:
+            return
+        level = 1
+        while level < self.levels and not self._counts[level]:
+            level += 1
+        if level == self.levels and not self._overflow:
+            self._current = target - 1
+            return
+        span = self._spans[level]
+        self._current = min(target, (self._current // span + 1) * span) - 1
+    
+    def _pop(self, bucket: dict) -> list:
+        where = self._where
+        for key in bucket:
+            del where[key]
+        return [(key, payload) for key, (_, payload) in bucket.items()]
@@ -0,0 +1,113 @@
+"""
+سياق المستخدم لكل تحديث
+وسيط خارجي يحمّل المستخدم (أو ينشئه) مرة واحدة ويمرره للمعالجات ولوحات المفاتيح باسم user،
+فلا تحتاج المعالجات لأي استعلام إضافي عن المستخدم أو دوره.
+- المستخدمون المعروفون يُقرؤون من ذاكرة LRU (تُفرغ عند تغيير الأدوار)
+- وقت آخر تفاعل يُكتب على دفعات في الخلفية
+"""
+
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from batch_writer import BatchWriter
+from config import PerformanceConfig
+from database import DatabaseManager
+
+
+class UserContext:
+    """بيانات المستخدم الخفيفة المتاحة للمعالجات"""
+    __slots__ = ("user_id", "first_name", "username", "role", "is_new")
+    
+    def __init__(self, user_id: int, first_name: str, username: Optional[str], role: str, is_new: bool = False):
+        self.user_id = user_id
+        self.first_name = first_name
+        self.username = username
+        self.role = role
+        self.is_new = is_new
+    
+    @classmethod
+    def guest(cls, from_user=None) -> "UserContext":
+        """سياق بدور user لمرسل ليس مستخدماً حقيقياً (بوت، مشرف مجهول، قناة، أو بدون مرسل) دون تسجيله"""
+        if from_user is None:
+            return cls(0, "", None, "user")
+        return cls(from_user.id, from_user.first_name, from_user.username, "user")
+    
+    @property
+    def is_admin(self) -> bool:
+        return self.role in ("admin", "owner")
+    
+    @property
+    def is_owner(self) -> bool:
+        return self.role == "owner"
+
+
+class UserContextMiddleware(BaseMiddleware):
+    """تحميل المستخدم مرة واحدة لكل تحديث وحقنه في data["user"]"""
+    
+    def __init__(self, capacity: int = PerformanceConfig.USER_CONTEXT_CACHE_SIZE, flush_interval: float = 5.0):
+        self.capacity = capacity
+        # user_id -> الدور
+        self._roles = OrderedDict()
+        # يزيد مع كل تغيير للأدوار، حتى لا يُحفظ دور قُرئ قبل التغيير
+        self._generation = 0
+        self._writer = BatchWriter(DatabaseManager.touch_users, "user_interactions", flush_interval=flush_interval)
+        DatabaseManager.on_change("roles", self.invalidate)
+    
+    def invalidate(self):
+        """تفريغ الأدوار المحفوظة بعد تغييرها"""
+        self._generation += 1
+        self._roles.clear()
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user = data.get("event_from_user")
+        if from_user is None or from_user.is_bot:
+            # المعالجات تتوقع user دائماً: سياق بدور user دون تسجيل المرسل
+            data["user"] = UserContext.guest(from_user)
+        else:
+            data["user"] = await self.resolve(from_user.id, from_user.first_name, from_user.username)
+        return await handler(event, data)
+    
+    async def resolve(self, user_id: int, first_name: str, username: Optional[str] = None) -> UserContext:
+        role = self._roles.get(user_id)
+        is_new = False
+        if role is None:
+            generation = None
+            while generation != self._generation:
+                generation = self._generation
+                role, created = await asyncio.to_thread(
+                    DatabaseManager.load_or_create_user, user_id, first_name, username
+                )
+                is_new = is_new or created
+            # الأدوار لم تتغير أثناء القراءة (وإلا أُعيدت القراءة)
+            self._roles[user_id] = role
+            if len(self._roles) > self.capacity:
+                self._roles.popitem(last=False)
+        else:
+            self._roles.move_to_end(user_id)
+        if not is_new:
+            self._writer.put(user_id, (user_id, first_name, username, datetime.utcnow()))
+        return UserContext(user_id, first_name, username, role, is_new)
+    
+    async def close(self):
+        """كتابة أوقات التفاعل المعلقة"""
+        await self._writer.close()
+
+
+# إنشاء مثيل من النظام
+user_context_instance = None
+
+
+def get_user_context_middleware() -> UserContextMiddleware:
+    """الحصول على وسيط سياق المستخدم"""
+    global user_context_instance
+    if user_context_instance is None:
+        user_context_instance = UserContextMiddleware()
+    return user_context_instance
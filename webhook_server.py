@@ -0,0 +1,100 @@
+"""
+خادم الـ Webhook المدمج (بديل عن Long Polling)
+يستقبل التحديثات عبر aiohttp ويرد فوراً بـ 200، ثم يعالجها من طابور محدود الحجم
+"""
+
+import asyncio
+import hmac
+import json
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+from loguru import logger
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """خادم Webhook مع طابور محدود ومعالجات متزامنة"""
+    
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        path: str = "/webhook",
+        secret: str = "",
+        queue_size: int = 1000,
+        workers: int = 16,
+        **workflow_data
+    ):
+        self.dp = dp
+        self.bot = bot
+        self.path = path
+        self.secret = secret
+        self.workers = workers
+        self.workflow_data = workflow_data
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._tasks = []
+        self._runner = None
+        self.rejected = 0
+    
+    # ==================== استقبال الطلبات ====================
+    
+    async def handle(self, request: web.Request) -> web.Response:
+        """التحقق من الرمز السري ووضع التحديث في الطابور والرد فوراً"""
+        if self.secret:
+            token = request.headers.get(SECRET_HEADER, "")
+            if not hmac.compare_digest(token, self.secret):
+                return web.Response(status=401)
+        
+        body = await request.read()
+        try:
+            self.queue.put_nowait(body)
+        except asyncio.QueueFull:
+            # الطابور ممتلئ: نطلب من تيليجرام إعادة المحاولة لاحقاً بدلاً من فقد التحديث
+            self.rejected += 1
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        return web.Response(status=200)
+    
+    # ==================== معالجة الطابور ====================
+    
+    async def _worker(self):
+        while True:
+            body = await self.queue.get()
+            try:
+                update = json.loads(body)
+                await self.dp.feed_raw_update(self.bot, update, **self.workflow_data)
+            except Exception as e:
+                logger.error(f"❌ خطأ في معالجة تحديث الـ Webhook: {e}")
+            finally:
+                self.queue.task_done()
+    
+    # ==================== التشغيل والإيقاف ====================
+    
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        return app
+    
+    async def start(self, host: str, port: int) -> str:
+        """تشغيل الخادم والمعالجات (يعيد العنوان المحلي)"""
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        actual_port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"🌐 خادم الـ Webhook يعمل على {host}:{actual_port}{self.path}")
+        return f"http://{host}:{actual_port}{self.path}"
+    
+    async def stop(self, timeout: float = 10):
+        """إيقاف استقبال الطلبات ثم إنهاء ما تبقى في الطابور"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ تم إيقاف الـ Webhook مع {self.queue.qsize()} تحديث غير معالج")
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []